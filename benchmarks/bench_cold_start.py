@@ -0,0 +1,56 @@
+"""
+Cold-start time of a worker: importing core.server (what uvicorn does before it
+can accept connections) and the background warm-up that follows.
+
+`--eager` also imports the model libraries and langchain_groq up front, which is
+what app import cost before they were made lazy.
+
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+_PROBE = """
+import json, time
+start = time.perf_counter()
+import core.server
+imported = time.perf_counter() - start
+if {eager}:
+    import modules.models.Arima, modules.models.Prophet, modules.models.XG_boost, langchain_groq
+    imported = time.perf_counter() - start
+from core.warmup import warm_up, WARMUP_STATE
+warm_start = time.perf_counter()
+warm_up()
+print(json.dumps({{"import": imported, "warm_up": time.perf_counter() - warm_start, "steps": WARMUP_STATE["steps"]}}))
+"""
+
+
+def run_once(eager: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(eager=eager)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--eager", action="store_true", help="Import model libraries at app import, as before")
+    args = parser.parse_args()
+
+    results = [run_once(args.eager) for _ in range(args.runs)]
+    imports = [r["import"] for r in results]
+    warm_ups = [r["warm_up"] for r in results]
+
+    print(f"runs:                    {args.runs} ({'eager' if args.eager else 'lazy'} imports)")
+    print(f"import core.server:      median {statistics.median(imports):.3f} s, max {max(imports):.3f} s")
+    print(f"background warm-up:      median {statistics.median(warm_ups):.3f} s")
+    print(f"last warm-up steps:      {results[-1]['steps']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Load test of the real ASGI app against seeded local data and a stub LLM.
+
+Seeds a Northwind-shaped SQLite database (customers, products, orders,
+order_details) and the matching sales snapshot from `--seed`, starts the app
+in-process with data_source=snapshot, database_url pointing at the SQLite file
+and llm_provider=stub, then sends `--requests` requests (or runs for
+`--duration` seconds) from `--concurrency` concurrent clients. Forecast,
+data_agg, data_analysis and log requests are mixed by `--mix`; names, models,
+frequencies and horizons are drawn at random so both cached and fresh
+forecasts are served.
+
+    python -m benchmarks.bench_load --concurrency 8 --requests 300 --models arima,xgboost
+    python -m benchmarks.bench_load --duration 60 --json load.json
+    python -m benchmarks.bench_load --json load.json --baseline previous.json   # exit 1 on a regression
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+FORECAST = "/api/v1/data_forecast/sales"
+
+CITIES = [
+    "London", "Berlin", "Madrid", "Paris", "Seattle", "Sao Paulo", "Buenos Aires", "Graz",
+    "Lyon", "Montreal", "Portland", "Bergamo", "Cork", "Helsinki", "Warszawa", "Lisboa",
+]
+
+
+def seed_data(directory: str, args) -> dict:
+    """Write the seeded SQLite database and snapshot; returns the names requests are drawn from"""
+    from sqlalchemy import create_engine
+    from modules.ORM.models import Base
+    from modules.data.snapshot import write_snapshot
+
+    rng = np.random.default_rng(args.seed)
+    cities = CITIES[:args.cities]
+    customers = pd.DataFrame({
+        "customer_id": [f"C{i:04d}" for i in range(args.customers)],
+        "company_name": [f"Customer {i:03d}" for i in range(args.customers)],
+        "city": [cities[i % len(cities)] for i in range(args.customers)],
+    })
+    products = pd.DataFrame({
+        "product_id": np.arange(1, args.products + 1),
+        "product_name": [f"Product {i:03d}" for i in range(args.products)],
+        "unit_price": rng.uniform(5, 80, args.products).round(2),
+    })
+
+    # Orders per day follow a yearly cycle around --orders-per-day
+    days = pd.date_range("2021-01-01", periods=args.days, freq="D")
+    season = 1 + 0.3 * np.sin(2 * np.pi * days.dayofyear / 365.25)
+    per_day = rng.poisson(args.orders_per_day * season)
+    order_dates = np.repeat(days.values, per_day) + pd.to_timedelta(rng.integers(8 * 3600, 18 * 3600, per_day.sum()), unit="s").values
+    orders = pd.DataFrame({
+        "order_id": np.arange(10_000, 10_000 + len(order_dates)),
+        "customer_id": customers["customer_id"].values[rng.integers(0, args.customers, len(order_dates))],
+        "order_date": order_dates,
+    })
+
+    # 1-4 distinct products per order
+    lines = rng.integers(1, 5, len(orders))
+    first = np.repeat(rng.integers(0, args.products, len(orders)), lines)
+    offset = np.arange(lines.sum()) - np.repeat(np.cumsum(lines) - lines, lines)
+    product_ids = products["product_id"].values[(first + offset) % args.products]
+    order_details = pd.DataFrame({
+        "order_id": np.repeat(orders["order_id"].values, lines),
+        "product_id": product_ids,
+        "unit_price": products.set_index("product_id")["unit_price"].loc[product_ids].values,
+        "quantity": rng.integers(1, 41, lines.sum()),
+        "discount": rng.choice([0.0, 0.0, 0.0, 0.05, 0.1], lines.sum()),
+    })
+
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'northwind.sqlite3')}")
+    Base.metadata.create_all(engine)
+    customers.to_sql("customers", engine, if_exists="append", index=False)
+    products.to_sql("products", engine, if_exists="append", index=False)
+    orders.to_sql("orders", engine, if_exists="append", index=False)
+    order_details.to_sql("order_details", engine, if_exists="append", index=False)
+    engine.dispose()
+
+    # The same rows as DAILY_SALES_FACTS would read from Postgres
+    facts = (
+        order_details.merge(orders, on="order_id")
+        .merge(customers, on="customer_id", how="left")
+        .merge(products[["product_id", "product_name"]], on="product_id")
+        .assign(
+            sales_day=lambda df: df["order_date"].dt.floor("D"),
+            total_sales=lambda df: df["unit_price"] * df["quantity"] * (1 - df["discount"]),
+        )
+        .groupby(["sales_day", "customer_id", "company_name", "city", "product_id", "product_name"], as_index=False)["total_sales"]
+        .sum()
+    )
+    write_snapshot(os.path.join(directory, "snapshot"), facts, products[["product_id", "product_name"]], customers)
+    print(f"Seeded {len(orders)} orders ({len(order_details)} lines) over {args.days} days for {args.products} products, "
+          f"{args.customers} customers in {len(cities)} cities")
+    return {
+        "product": list(products["product_name"]),
+        "customer": list(customers["company_name"]),
+        "city": cities,
+    }
+
+
+def configure(directory: str, args):
+    """Point the app at the seeded data and the stub LLM; must run before config is imported"""
+    os.environ.update({
+        "data_source": "snapshot",
+        "snapshot_path": os.path.join(directory, "snapshot"),
+        "database_url": f"sqlite:///{os.path.join(directory, 'northwind.sqlite3')}",
+        "shared_cache_path": os.path.join(directory, "shared_cache.sqlite3"),
+        "llm_provider": "stub",
+        "llm_stub_latency_ms": str(args.llm_latency_ms),
+        "precompute_interval_seconds": "0",
+        "sales_views_enabled": "false",
+    })
+    # Required by config but unused against the seeded data
+    for name, value in {
+        "database_user": "load", "database_password": "load", "database_host": "localhost",
+        "database_port": "5432", "database_name": "load", "groq_api_key": "stub", "model_name": "stub",
+    }.items():
+        os.environ.setdefault(name, value)
+
+
+class RequestMix:
+    """Draws (endpoint, model, url, params) from the weighted endpoint mix"""
+
+    def __init__(self, names: dict, args):
+        self.names = names
+        self.models = args.models
+        self.frequencies = args.frequencies
+        self.rng = random.Random(args.seed)
+        self.endpoints, self.weights = zip(*args.mix.items())
+
+    def _forecast_params(self) -> tuple[str, dict]:
+        model = self.rng.choice(self.models)
+        return model, {
+            "model": model,
+            "frequency": self.rng.choice(self.frequencies),
+            "periods_ahead": self.rng.randint(1, 6),
+        }
+
+    def next(self) -> tuple[str, str, str, dict]:
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        if endpoint == "product":
+            model, params = self._forecast_params()
+            return endpoint, model, f"{FORECAST}/product_sales_forecast", {**params, "product_name": self.rng.choice(self.names["product"])}
+        if endpoint == "customer":
+            model, params = self._forecast_params()
+            params["customer_name"] = self.rng.choice(self.names["customer"])
+            if self.rng.random() < 0.3:
+                params["product_name"] = self.rng.choice(self.names["product"])
+            return endpoint, model, f"{FORECAST}/customer_sales_forecast", params
+        if endpoint == "city":
+            model, params = self._forecast_params()
+            return endpoint, model, f"{FORECAST}/city_wise_forecast", {**params, "city_name": self.rng.choice(self.names["city"])}
+        if endpoint == "hierarchy":
+            model, params = self._forecast_params()
+            return endpoint, model, f"{FORECAST}/hierarchical_forecast", {**params, "city_name": self.rng.choice(self.names["city"])}
+        if endpoint == "data_agg":
+            params = {"product_name": self.rng.choice(self.names["product"])} if self.rng.random() < 0.5 else {}
+            return endpoint, "-", "/api/v1/data_agg/monthly_sales/product_wise", params
+        if endpoint == "data_analysis":
+            # The tables the snapshot holds (see SNAPSHOT_TABLES)
+            table = self.rng.choice(["daily_sales", "products", "customers"])
+            return endpoint, "-", "/api/v1/data_analysis/table_stats", {"table_name": table}
+        return endpoint, "-", "/api/v1/logs/data", {"tail": "true", "limit": 200}
+
+
+async def drive(app, mix: RequestMix, args) -> tuple[list[tuple], float, dict]:
+    """Run the load against the app; returns (endpoint, model, status, seconds) per request, the wall time and the app's stats"""
+    import httpx
+    from core.warmup import WARMUP_STATE
+
+    results = []
+    async with app.router.lifespan_context(app):
+        while WARMUP_STATE["finished_at"] is None:
+            await asyncio.sleep(0.2)
+        if WARMUP_STATE["errors"]:
+            print(f"Warm-up errors: {WARMUP_STATE['errors']}")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            remaining = args.requests
+            stop_at = time.perf_counter() + args.duration if args.duration else None
+
+            async def client_loop():
+                nonlocal remaining
+                while True:
+                    if stop_at is not None:
+                        if time.perf_counter() >= stop_at:
+                            return
+                    elif remaining <= 0:
+                        return
+                    remaining -= 1
+                    endpoint, model, url, params = mix.next()
+                    start = time.perf_counter()
+                    try:
+                        status = (await client.get(url, params=params)).status_code
+                    except Exception:
+                        status = None
+                    results.append((endpoint, model, status, time.perf_counter() - start))
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+            wall = time.perf_counter() - start
+            stats = (await client.get("/api/v1/data_forecast/stats")).json()
+    return results, wall, stats
+
+
+def summarize(results: list[tuple], wall: float) -> dict:
+    df = pd.DataFrame(results, columns=["endpoint", "model", "status", "seconds"])
+    df["error"] = df["status"].isna() | (df["status"] >= 400)
+
+    def group(rows: pd.DataFrame) -> dict:
+        latency_ms = rows["seconds"].to_numpy() * 1000
+        failed = rows.loc[rows["error"], "status"].fillna(0).astype(int)
+        return {
+            "requests": len(rows),
+            "requests_per_second": round(len(rows) / wall, 2),
+            "error_rate": round(float(rows["error"].mean()), 4),
+            "errors": {("no response" if status == 0 else str(status)): int(count) for status, count in failed.value_counts().items()},
+            "p50_ms": round(float(np.percentile(latency_ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(latency_ms, 95)), 1),
+            "p99_ms": round(float(np.percentile(latency_ms, 99)), 1),
+        }
+
+    return {
+        "wall_seconds": round(wall, 2),
+        "total": group(df),
+        "groups": {f"{endpoint} [{model}]": group(rows) for (endpoint, model), rows in df.groupby(["endpoint", "model"])},
+    }
+
+
+def print_report(summary: dict, args):
+    print(f"\n{summary['total']['requests']} requests in {summary['wall_seconds']} s from {args.concurrency} clients "
+          f"({os.cpu_count()} cores, LLM stub {args.llm_latency_ms:g} ms)\n")
+    print(f"{'endpoint [model]':28s} {'reqs':>6s} {'req/s':>8s} {'errors':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+    for name, row in [*summary["groups"].items(), ("total", summary["total"])]:
+        errors = ", ".join(f"{status} x{count}" for status, count in row["errors"].items())
+        print(
+            f"{name:28s} {row['requests']:6d} {row['requests_per_second']:8.2f} {row['error_rate']:7.1%} "
+            f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f} {row['p99_ms']:9.1f}" + (f"   {errors}" if errors else "")
+        )
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change against a previous run; False when throughput fell or the error rate rose by more than `tolerance`"""
+    now, before = summary["total"], baseline["total"]
+    change = now["requests_per_second"] / before["requests_per_second"] - 1 if before["requests_per_second"] else 0.0
+    print(f"\nThroughput {before['requests_per_second']:.2f} -> {now['requests_per_second']:.2f} req/s ({change:+.1%}), "
+          f"p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms, errors {before['error_rate']:.1%} -> {now['error_rate']:.1%}")
+    ok = change >= -tolerance and now["error_rate"] <= before["error_rate"] + tolerance
+    if not ok:
+        print(f"Regression beyond the {tolerance:.0%} tolerance")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the app against seeded local data and a stub LLM")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests to send (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead of a request count")
+    parser.add_argument("--mix", default="product=3,customer=2,city=2,hierarchy=0,data_agg=1,data_analysis=1,logs=1",
+                        help="Relative weights of product, customer, city, hierarchy, data_agg, data_analysis and logs requests")
+    parser.add_argument("--models", default="arima,xgboost", help="Comma separated forecast models to draw from")
+    parser.add_argument("--frequencies", default="monthly,weekly", help="Comma separated forecast frequencies to draw from")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="Latency of each stub LLM call")
+    parser.add_argument("--seed", type=int, default=7, help="Seed of the data and the request sequence")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--customers", type=int, default=40)
+    parser.add_argument("--cities", type=int, default=8, choices=range(1, len(CITIES) + 1), metavar=f"1-{len(CITIES)}")
+    parser.add_argument("--days", type=int, default=3 * 365, help="Days of order history")
+    parser.add_argument("--orders-per-day", type=float, default=4)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results of a previous run (--json) to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed throughput drop / error rate rise against the baseline")
+    args = parser.parse_args()
+    args.models = [m.strip() for m in args.models.split(",") if m.strip()]
+    args.frequencies = [f.strip() for f in args.frequencies.split(",") if f.strip()]
+    args.mix = {name.strip(): float(weight) for name, weight in (pair.split("=") for pair in args.mix.split(",") if pair.strip())}
+    args.mix = {name: weight for name, weight in args.mix.items() if weight > 0}
+
+    directory = tempfile.mkdtemp(prefix="bench_load_")
+    configure(directory, args)
+    names = seed_data(directory, args)
+
+    from core.server import app
+    results, wall, stats = asyncio.run(drive(app, RequestMix(names, args), args))
+    summary = summarize(results, wall)
+    print_report(summary, args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")}, **summary, "app_stats": stats}, f, indent=2, default=str)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(summary, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Per-call overhead of LOG.info on the request path.
+
+Compares the previous setup (synchronous stdout + file handlers, a LogRecord built
+per format call and json.dumps) with the queue-based pipeline used by core.logger.
+
+    python -m benchmarks.bench_logging --calls 20000
+"""
+import os
+import json
+import queue
+import logging
+import argparse
+import tempfile
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from core.logger.log_handler import JsonFormatter, ContextLogFilter, set_log_context
+
+
+class LegacyJsonFormatter(logging.Formatter):
+    """The formatter as it was before the queue pipeline, kept here for comparison"""
+
+    def format(self, record):
+        log_record = {
+            "level": record.levelname,
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%SZ"),
+            "msg": record.getMessage(),
+            "module": record.module,
+        }
+        standard_attrs = logging.LogRecord(None, None, "", 0, "", (), None).__dict__
+        log_record.update({k: v for k, v in record.__dict__.items() if k not in standard_attrs})
+        return json.dumps(log_record, ensure_ascii=False)
+
+
+def _handlers(directory: str, formatter: logging.Formatter) -> list[logging.Handler]:
+    console = logging.StreamHandler(open(os.devnull, "w"))
+    file = logging.FileHandler(os.path.join(directory, "bench.log"), encoding="utf-8")
+    for handler in (console, file):
+        handler.setFormatter(formatter)
+    return [console, file]
+
+
+def _time_calls(logger: logging.Logger, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.info(f"GET - /api/v1/data_forecast/sales/product_sales_forecast - {i * 0.001:.2f} s", extra={"model_type": "arima"})
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_sync(directory: str, calls: int) -> float:
+    logger = logging.getLogger("bench.sync")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    for handler in _handlers(directory, LegacyJsonFormatter()):
+        handler.addFilter(ContextLogFilter())
+        logger.addHandler(handler)
+    return _time_calls(logger, calls)
+
+
+def bench_queue(directory: str, calls: int) -> tuple[float, float]:
+    logger = logging.getLogger("bench.queue")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextLogFilter())
+    logger.addHandler(queue_handler)
+    listener = QueueListener(log_queue, *_handlers(directory, JsonFormatter()), respect_handler_level=True)
+    listener.start()
+
+    per_call = _time_calls(logger, calls)
+    start = time.perf_counter()
+    listener.stop()  # Wait for the background thread to drain the queue
+    drain = time.perf_counter() - start
+    return per_call, drain
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--calls", type=int, default=20000, help="Log calls per run")
+    args = parser.parse_args()
+
+    set_log_context(request_id="bench-request")
+    with tempfile.TemporaryDirectory() as sync_dir, tempfile.TemporaryDirectory() as queue_dir:
+        sync_us = bench_sync(sync_dir, args.calls)
+        queue_us, drain_s = bench_queue(queue_dir, args.calls)
+
+    print(f"calls per run:              {args.calls}")
+    print(f"sync handlers (before):     {sync_us:8.2f} us/call")
+    print(f"queue pipeline (after):     {queue_us:8.2f} us/call  (background drain {drain_s:.2f} s)")
+    print(f"speed-up on caller thread:  {sync_us / queue_us:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
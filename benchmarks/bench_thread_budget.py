@@ -0,0 +1,92 @@
+"""
+Throughput of concurrent model fits with and without the CPU thread budget.
+
+Starts `--workers` processes at once, as uvicorn would, each running
+`--concurrency` fits at a time on fresh random series (so the model cache never
+hits). `unbounded` leaves every library at its default of one thread per core
+(cpu_threads=0); `budgeted` applies the budget computed for that many workers.
+
+    python -m benchmarks.bench_thread_budget --workers 4 --concurrency 4 --fits 16 --model xgboost
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+_PROBE = """
+import json, time
+from core.utils.thread_budget import apply_thread_budget, thread_budget_stats
+apply_thread_budget()
+
+import numpy as np, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from modules.models.pipeline import generate_forecast
+from modules.models.modelSchema import ModelType, ForecastFrequency
+
+rng = np.random.default_rng()
+index = pd.date_range("2020-01-01", periods={points}, freq="D")
+
+def fit(_):
+    ts = pd.Series(rng.gamma(2.0, 50.0, len(index)).cumsum() / 10, index=index)
+    start = time.perf_counter()
+    generate_forecast(ts, 7, ModelType("{model}"), ForecastFrequency.DAILY)
+    return time.perf_counter() - start
+
+fit(None)  # Import and warm the model library outside the timed window
+started = time.time()
+with ThreadPoolExecutor({concurrency}) as pool:
+    latencies = list(pool.map(fit, range({fits})))
+print(json.dumps({{"started": started, "finished": time.time(), "latencies": latencies, "budget": thread_budget_stats()}}))
+"""
+
+
+def run(mode: str, args) -> dict:
+    env = dict(os.environ)
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS"):
+        env.pop(var, None)
+    env["cpu_threads"] = "0" if mode == "unbounded" else str(os.cpu_count() or 1)
+    env["web_workers"] = str(args.workers)
+    env["shared_cache_path"] = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+
+    probe = _PROBE.format(points=args.points, model=args.model, concurrency=args.concurrency, fits=args.fits)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", probe], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+        for _ in range(args.workers)
+    ]
+    results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+
+    wall = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    latencies = sorted(latency for r in results for latency in r["latencies"])
+    return {
+        "fits_per_second": len(latencies) / wall,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "budget": results[0]["budget"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent fit throughput with and without the thread budget")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes started at once")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent fits per worker")
+    parser.add_argument("--fits", type=int, default=16, help="Fits per worker")
+    parser.add_argument("--model", default="xgboost", choices=["arima", "prophet", "xgboost"])
+    parser.add_argument("--points", type=int, default=730, help="Daily history length of each series")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.workers} workers x {args.concurrency} concurrent {args.model} fits")
+    for mode in ("unbounded", "budgeted"):
+        result = run(mode, args)
+        budget = result["budget"]
+        print(
+            f"{mode:10s} {result['fits_per_second']:7.2f} fits/s   p50 {result['p50']:.3f} s   p95 {result['p95']:.3f} s"
+            f"   (BLAS threads/fit {budget['fit_threads'] if budget['enabled'] else 'default'},"
+            f" XGBoost n_jobs {budget['xgboost_threads'] if budget['enabled'] else 'default'})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 import tomllib
 from os import getenv
 from typing import Optional
@@ -13,6 +14,12 @@ with open("pyproject.toml", "rb") as f:
     description = toml_object.get("description")
     version = toml_object.get("version")
 
+# Cores this host gives the app and the uvicorn workers sharing them (main.py
+# exports web_workers to its workers); cpu_threads=0 leaves thread counts to the libraries
+cpu_threads = int(getenv("cpu_threads", str(os.cpu_count() or 1)))
+web_workers = max(1, int(getenv("web_workers", "1")))
+worker_threads = max(1, (cpu_threads or os.cpu_count() or 1) // web_workers)
+
 class ConfigClass(BaseModel):
     app_name: str
     description: str
@@ -24,8 +31,65 @@ class ConfigClass(BaseModel):
     database_host:str
     database_port:int
     database_name:str
+    database_url:Optional[str]
     groq_api_key:str
     model_name:str
+    llm_provider:str
+    llm_stub_latency_ms:float
+    llm_compact_payload:bool
+    llm_payload_max_tokens:int
+    llm_stub_failure_rate:float
+    llm_max_concurrency:int
+    llm_batch_requests_per_minute:int
+    llm_batch_tokens_per_minute:int
+    llm_batch_max_tokens:int
+    llm_batch_max_items:int
+    llm_max_retries:int
+    llm_retry_backoff_seconds:float
+
+    log_request_sample_rate:float
+    entity_index_refresh_seconds:float
+
+    forecast_store_ttl_seconds:float
+    precompute_interval_seconds:float
+    precompute_entities:list[str]
+    precompute_models:list[str]
+    precompute_frequencies:list[str]
+    precompute_periods_ahead:int
+    precompute_workers:int
+
+    cpu_threads:int
+    web_workers:int
+    process_pool_workers:int
+    hierarchy_max_nodes:int
+    auto_model_memory_seconds:float
+
+    shared_cache_path:str
+    shared_cache_max_bytes:int
+    fitted_model_ttl_seconds:float
+
+    fit_concurrency:dict[str, int]
+    admission_queue_size:int
+    admission_max_wait_seconds:float
+    max_periods_ahead:int
+
+    forecast_job_retention_seconds:float
+    feature_store_max_series:int
+    pipeline_memo_entries:int
+    pipeline_memo_ttl_seconds:float
+    sales_views_enabled:bool
+    sales_views_setup_on_startup:bool
+    sales_views_refresh_seconds:float
+    order_ingest_poll_seconds:float
+    order_ingest_batch_orders:int
+    order_ingest_buffer_rows:int
+    order_ingest_overlap_seconds:float
+    data_source:str
+    snapshot_path:str
+    profile_interval_ms:float
+    profile_sample_every:int
+    profile_slow_seconds:float
+    profile_max_files:int
 
 CONFIG = ConfigClass(
     app_name = name,
@@ -38,6 +102,101 @@ CONFIG = ConfigClass(
     database_host=getenv("database_host"),
     database_port=int(getenv("database_port")),
     database_name=getenv("database_name"),
+    # Full SQLAlchemy URL used instead of the database_* settings (e.g. the load test's seeded SQLite file)
+    database_url=getenv("database_url") or None,
     groq_api_key=getenv("groq_api_key"),
-    model_name=getenv("model_name")
+    model_name=getenv("model_name"),
+    # "groq", or "stub" for canned analyses after llm_stub_latency_ms (load tests, no API calls)
+    llm_provider=getenv("llm_provider", "groq").lower(),
+    llm_stub_latency_ms=float(getenv("llm_stub_latency_ms", "800")),
+    # Send the LLM summary statistics of the history instead of every period, within about this many tokens
+    llm_compact_payload=getenv("llm_compact_payload", "true").lower() == "true",
+    llm_payload_max_tokens=int(getenv("llm_payload_max_tokens", "1500")),
+    # Fraction of stub LLM calls that fail with a 429, to exercise retries
+    llm_stub_failure_rate=float(getenv("llm_stub_failure_rate", "0")),
+    # Concurrent LLM calls per worker, request and batched analyses alike
+    llm_max_concurrency=int(getenv("llm_max_concurrency", "4")),
+    # Per-minute call and token budget of the batched analyses for the whole host; only the precompute runner sends batches
+    # (0 disables a budget); request analyses are never throttled by it
+    llm_batch_requests_per_minute=int(getenv("llm_batch_requests_per_minute", "30")),
+    llm_batch_tokens_per_minute=int(getenv("llm_batch_tokens_per_minute", "0")),
+    # Bulk analyses: forecasts per LLM call, bounded by prompt plus expected reply tokens, and retries of transient errors
+    llm_batch_max_tokens=int(getenv("llm_batch_max_tokens", "12000")),
+    llm_batch_max_items=int(getenv("llm_batch_max_items", "6")),
+    llm_max_retries=int(getenv("llm_max_retries", "3")),
+    llm_retry_backoff_seconds=float(getenv("llm_retry_backoff_seconds", "1")),
+
+    # Fraction of successful per-request INFO lines to keep (errors are always logged)
+    log_request_sample_rate=float(getenv("log_request_sample_rate", "1.0")),
+    # How often the product/customer name index checks the tables for changes
+    entity_index_refresh_seconds=float(getenv("entity_index_refresh_seconds", "60")),
+
+    # Background precomputation of forecasts (disabled when the interval is 0 or no entities are listed); one worker per
+    # host runs it, the one holding the lock file next to shared_cache_path
+    forecast_store_ttl_seconds=float(getenv("forecast_store_ttl_seconds", "3600")),
+    precompute_interval_seconds=float(getenv("precompute_interval_seconds", "0")),
+    # Comma separated "kind:name" pairs, e.g. "product:Chai,city:London,customer:Around the Horn"
+    precompute_entities=[e.strip() for e in getenv("precompute_entities", "").split(",") if e.strip()],
+    precompute_models=[m.strip() for m in getenv("precompute_models", "arima").split(",") if m.strip()],
+    precompute_frequencies=[f.strip() for f in getenv("precompute_frequencies", "monthly").split(",") if f.strip()],
+    precompute_periods_ahead=int(getenv("precompute_periods_ahead", "3")),
+    precompute_workers=int(getenv("precompute_workers", str(max(1, worker_threads // 2)))),
+
+    cpu_threads=cpu_threads,
+    web_workers=web_workers,
+    # Processes for parallel model fits (hierarchical forecasts, model races), per uvicorn worker
+    process_pool_workers=int(getenv("process_pool_workers", str(worker_threads))),
+    # Upper bound on series fitted by one hierarchical forecast
+    hierarchy_max_nodes=int(getenv("hierarchy_max_nodes", "500")),
+    # How long the winner of an `auto` model race is reused for the same series values and tier
+    auto_model_memory_seconds=float(getenv("auto_model_memory_seconds", "86400")),
+
+    # SQLite file shared by all workers on the host for forecasts and fitted models
+    shared_cache_path=getenv("shared_cache_path", os.path.join("cache", "shared_cache.sqlite3")),
+    shared_cache_max_bytes=int(getenv("shared_cache_max_bytes", str(512 * 1024 * 1024))),
+    fitted_model_ttl_seconds=float(getenv("fitted_model_ttl_seconds", "86400")),
+
+    # Concurrent fits allowed per model, as comma separated "pool:limit" pairs
+    fit_concurrency={
+        pool.strip(): int(limit)
+        for pool, limit in (
+            pair.split(":") for pair in getenv("fit_concurrency", "arima:8,xgboost:4,prophet:2,auto:1,hierarchy:1").split(",") if pair.strip()
+        )
+    },
+    # Requests allowed to wait per model, and the longest wait before answering 503
+    admission_queue_size=int(getenv("admission_queue_size", "16")),
+    admission_max_wait_seconds=float(getenv("admission_max_wait_seconds", "30")),
+    max_periods_ahead=int(getenv("max_periods_ahead", "90")),
+
+    # How long status and results of forecast jobs stay available
+    forecast_job_retention_seconds=float(getenv("forecast_job_retention_seconds", "3600")),
+    # Series whose XGBoost feature matrices are kept in memory per worker
+    feature_store_max_series=int(getenv("feature_store_max_series", "256")),
+    # Stage outputs (queried series, fitted models, predictions, LLM analyses) memoised per worker
+    pipeline_memo_entries=int(getenv("pipeline_memo_entries", "256")),
+    pipeline_memo_ttl_seconds=float(getenv("pipeline_memo_ttl_seconds", "300")),
+
+    # Daily sales materialized views: read when present, optionally created by the warm-up, refreshed periodically (0 disables)
+    sales_views_enabled=getenv("sales_views_enabled", "true").lower() == "true",
+    sales_views_setup_on_startup=getenv("sales_views_setup_on_startup", "false").lower() == "true",
+    sales_views_refresh_seconds=float(getenv("sales_views_refresh_seconds", "900")),
+
+    # How often new orders are read past the (order_date, order_id) watermark (0 disables),
+    # at most how many orders per read, and how many new order lines are kept for merging into cached aggregates
+    order_ingest_poll_seconds=float(getenv("order_ingest_poll_seconds", "30")),
+    order_ingest_batch_orders=int(getenv("order_ingest_batch_orders", "1000")),
+    order_ingest_buffer_rows=int(getenv("order_ingest_buffer_rows", "50000")),
+    # Orders dated up to this long before the watermark are read again, so ones committed late or backdated are not missed
+    order_ingest_overlap_seconds=float(getenv("order_ingest_overlap_seconds", "86400")),
+
+    # "postgres", or "snapshot" to serve sales and entity names from the local snapshot only
+    data_source=getenv("data_source", "postgres").lower(),
+    snapshot_path=getenv("snapshot_path", os.path.join("cache", "snapshot")),
+
+    # Request CPU profiles: sampling interval, automatic profiling of 1 in N requests kept only
+    # when slower than profile_slow_seconds (0 disables), and how many profiles are kept in logs/profiles
+    profile_interval_ms=float(getenv("profile_interval_ms", "5")),
+    profile_sample_every=int(getenv("profile_sample_every", "0")),
+    profile_slow_seconds=float(getenv("profile_slow_seconds", "2")),
+    profile_max_files=int(getenv("profile_max_files", "50")),
 )
\ No newline at end of file
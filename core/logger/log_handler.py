@@ -1,6 +1,7 @@
 import os
-import json
+import orjson
 import logging
+import logging.handlers
 from contextvars import ContextVar
 from datetime import datetime, timedelta
 
@@ -54,6 +55,12 @@ class CustomTimedRotatingFileHandler(logging.handlers.TimedRotatingFileHandler):
         self.rolloverAt = self.rolloverAt + self.interval
 
 
+# Attributes every LogRecord carries; anything else on a record came from `extra=` or the context filter.
+# "message"/"asctime" are added by Formatter.format and QueueHandler.prepare.
+STANDARD_RECORD_ATTRS = frozenset(logging.LogRecord(None, None, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
 # --- JSON formatter that includes dynamic context ---
 class JsonFormatter(logging.Formatter):
     def format(self, record):
@@ -72,16 +79,11 @@ class JsonFormatter(logging.Formatter):
         context = get_log_context()
         for key, value in context.items():
             # Convert non-serializable types like UUID to string
-            log_record[key] = str(value) if not isinstance(value, (str, int, float, bool, type(None))) else value
+            log_record[key] = value if isinstance(value, _PLAIN_TYPES) else str(value)
 
         # Add extra fields dynamically, excluding unwanted ones
-        standard_attrs = logging.LogRecord(None, None, "", 0, "", (), None).__dict__
-        extra_fields = {
-            key: value
-            for key, value in record.__dict__.items()
-            if key not in standard_attrs
-        }
-
-        log_record.update(extra_fields)
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_RECORD_ATTRS:
+                log_record[key] = value
 
-        return json.dumps(log_record, ensure_ascii=False)#, indent=2)
\ No newline at end of file
+        return orjson.dumps(log_record, default=str).decode()
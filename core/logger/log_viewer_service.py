@@ -1,39 +1,240 @@
 import os
 import json
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
 from core.logger.logger import LOG_DIRECTORY
 
+# Same layout JsonFormatter writes the "time" field with, so entries compare as strings
+LOG_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+# Log files whose index is kept in memory; the least recently viewed one is dropped first
+MAX_INDEXED_FILES = 8
 
-def read_log_file(date: str):
+
+def _parse_entry(raw: bytes) -> dict:
+    """The JSON entry, or the raw text as its message when the entry does not parse (e.g. cut short by a crash)"""
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        return {"msg": raw.decode("utf-8", errors="replace")}
+    return entry if isinstance(entry, dict) else {"msg": entry}
+
+
+def _log_time(value: datetime) -> str:
+    """A filter bound in the layout and time zone (UTC) of the entries' "time" field"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(LOG_TIME_FORMAT)
+
+
+class LogFileIndex:
+    """
+    Byte-offset index over the JSON entries of one log file.
+
+    Only the bytes appended since the previous refresh are scanned, so repeated
+    requests on a growing file cost proportional to the new lines. Level, module
+    and time are kept per entry for filtering; full entries are read back from
+    disk only for the page that is returned.
+
+    An entry starts with an unindented "{" and may continue over the
+    following lines (pretty-printed JSON). Lines that never parse, such as an
+    entry cut short by a crash, are indexed as a raw "msg" once the next entry
+    starts, so they cannot stall indexing of the rest of the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.offsets: list[int] = []
+        self.lengths: list[int] = []
+        self.levels: list[str] = []
+        self.modules: list[str] = []
+        self.times: list[str] = []
+        self.columns: set[str] = set()
+        self._position = 0
+        self._inode = None
+
+    def refresh(self):
+        """Index any entries appended since the last call"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return
+
+            # Rotated or truncated file: start over
+            if stat.st_ino != self._inode or stat.st_size < self._position:
+                self._reset()
+                self._inode = stat.st_ino
+
+            if stat.st_size == self._position:
+                return
+
+            with open(self.path, "rb") as f:
+                f.seek(self._position)
+                position = self._position
+                entry_start = entry_end = None
+                parts: list[bytes] = []
+
+                for line in f:
+                    line_start = position
+                    position += len(line)
+
+                    # Partially written line; pick it up on the next refresh
+                    if not line.endswith(b"\n"):
+                        position = line_start
+                        break
+
+                    stripped = line.strip()
+                    if not stripped:
+                        if entry_start is None:
+                            self._position = position
+                        continue
+
+                    # Nested objects of a pretty-printed entry are indented, so only an unindented "{" starts an entry
+                    if line.startswith(b"{") or entry_start is None:
+                        if entry_start is not None:
+                            # The pending lines never formed an entry; keep them as text and move on
+                            self._add(_parse_entry(b" ".join(parts)), entry_start, entry_end - entry_start)
+                        entry_start, parts = line_start, []
+                    parts.append(stripped)
+                    entry_end = position
+
+                    # Only a closing brace can complete an entry, so the lines gathered so far are not re-parsed on every line
+                    if not stripped.endswith(b"}"):
+                        continue
+                    try:
+                        entry = json.loads(b" ".join(parts))
+                    except ValueError:
+                        continue  # Multi-line entry, keep accumulating
+
+                    self._add(entry, entry_start, position - entry_start)
+                    entry_start = None
+                    parts = []
+                    self._position = position
+
+                # An incomplete multi-line entry is re-read from its first line next time
+                if entry_start is None:
+                    self._position = position
+
+    def _add(self, entry, offset: int, length: int):
+        if not isinstance(entry, dict):
+            entry = {"msg": entry}
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.levels.append(str(entry.get("level", "")).upper())
+        self.modules.append(str(entry.get("module", "")))
+        self.times.append(str(entry.get("time", "")))
+        self.columns.update(entry.keys())
+
+    def select(
+        self,
+        levels: Optional[set[str]] = None,
+        module: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> list[int]:
+        """Positions of the entries matching the filters, in file order"""
+        with self._lock:
+            count = len(self.offsets)
+            if not (levels or module or start or end):
+                return list(range(count))
+
+            lvl, mods, times = self.levels, self.modules, self.times
+            return [
+                i for i in range(count)
+                if (not levels or lvl[i] in levels)
+                and (not module or mods[i] == module)
+                and (not start or times[i] >= start)
+                and (not end or times[i] <= end)
+            ]
+
+    def read(self, positions: list[int]) -> list[dict]:
+        """Load the full entries at the given positions from disk"""
+        with self._lock:
+            spans = [(self.offsets[i], self.lengths[i]) for i in positions]
+
+        entries = []
+        with open(self.path, "rb") as f:
+            for offset, length in spans:
+                f.seek(offset)
+                entries.append(_parse_entry(b" ".join(part.strip() for part in f.read(length).splitlines() if part.strip())))
+        return entries
+
+
+_INDEXES: OrderedDict[str, LogFileIndex] = OrderedDict()
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_log_index(log_file: str) -> LogFileIndex:
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(log_file)
+        if index is None:
+            index = _INDEXES[log_file] = LogFileIndex(log_file)
+            while len(_INDEXES) > MAX_INDEXED_FILES:
+                _INDEXES.popitem(last=False)
+        _INDEXES.move_to_end(log_file)
+    index.refresh()
+    return index
+
+
+def resolve_log_file(date: str) -> tuple[str, str]:
     # Format the date to match log file naming convention
     if date != "today":
         date = datetime.strptime(date, "%Y%m%d").strftime("%Y-%m-%d")
-    
 
     # Check if the given date matches today's date
     current_date = datetime.now().strftime("%Y-%m-%d")
     if date == current_date:
         date = "today"
 
-    log_file = os.path.join(LOG_DIRECTORY, f"{date}.log")
-    
-    # If the log file for the specified date does not exist, fallback to today's log
+    return os.path.join(LOG_DIRECTORY, f"{date}.log"), date
+
+
+def read_log_file(
+    date: str,
+    level: Optional[str] = None,
+    module: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    tail: bool = False,
+):
+    """
+    Return one page of log entries for a date along with the column set and the
+    number of entries matching the filters.
+
+    `level` accepts a comma separated list. With `tail` the page is counted from
+    the newest entry backwards (still returned oldest first), which is what the
+    viewer uses to show the latest activity.
+    """
+    log_file, date = resolve_log_file(date)
+
     if not os.path.exists(log_file):
-        return [], date
-
-    logs: list[dict] = []
-    buffer = ""
-    with open(log_file, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            buffer += line
-            try:
-                log_entry = json.loads(buffer)
-                logs.append(log_entry)
-                buffer = ""  # Reset buffer after successful load
-            except json.JSONDecodeError:
-                buffer += " "  # Add a space and continue accumulating
-    return logs, date
\ No newline at end of file
+        return [], [], 0, date
+
+    index = get_log_index(log_file)
+    levels = {lvl.strip().upper() for lvl in level.split(",") if lvl.strip()} if level else None
+    matches = index.select(
+        levels=levels,
+        module=module,
+        start=_log_time(start) if start else None,
+        end=_log_time(end) if end else None,
+    )
+
+    total = len(matches)
+    if tail:
+        stop = max(total - offset, 0)
+        begin = 0 if limit is None else max(stop - limit, 0)
+        page = matches[begin:stop]
+    else:
+        page = matches[offset:] if limit is None else matches[offset:offset + limit]
+
+    return index.read(page), sorted(index.columns), total, date
@@ -1,9 +1,12 @@
 import os
+import queue
+import atexit
 import logging
 from config import CONFIG
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
 
-from core.logger.log_handler import LOG_DIRECTORY
+from core.logger.log_handler import LOG_DIRECTORY, ContextLogFilter
 
 # Logging configuration
 log_config = {
@@ -14,17 +17,11 @@ log_config = {
             "()": "core.logger.log_handler.JsonFormatter",  # JSON logs for Grafana Loki
         },
     },
-    "filters": {
-        "context_filter": {
-            "()": "core.logger.log_handler.ContextLogFilter"
-        }
-    },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
             "formatter": "json",
             "stream": "ext://sys.stdout",
-            "filters": ["context_filter"]
         },
         "file": {
             "class": "core.logger.log_handler.CustomTimedRotatingFileHandler",
@@ -33,7 +30,6 @@ log_config = {
             "when": "midnight",
             "backupCount": 7,
             "encoding": "utf-8",
-            "filters": ["context_filter"]
         },
     },
     "loggers": {
@@ -45,11 +41,36 @@ log_config = {
     },
 }
 
+
+def start_queue_logging(logger: logging.Logger) -> QueueListener:
+    """
+    Move the logger's handlers behind a queue drained by a background thread, so
+    formatting and stdout/file I/O happen off the request path. The context filter
+    is attached to the queue handler because the ContextVar is only visible in the
+    calling thread.
+    """
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextLogFilter())
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Flush whatever is still queued when the worker exits
+    atexit.register(listener.stop)
+    return listener
+
+
 # Configure logging
 dictConfig(log_config)
 
 # Define a logger
 LOG = logging.getLogger(f"{CONFIG.app_name}")
+LOG_LISTENER = start_queue_logging(LOG)
 
 # Test logging
-LOG.info(f"{CONFIG.app_name} logger initialized")
\ No newline at end of file
+LOG.info(f"{CONFIG.app_name} logger initialized")
@@ -1,8 +1,23 @@
 import time
+import anyio
+import random
+from config import CONFIG
 from core.logger.logger import LOG
 from fastapi import FastAPI, Request, Response
+from starlette.concurrency import run_in_threadpool
+from core.utils.profiler import REQUEST_PROFILER, has_api_key, new_profile_id
 
 
+async def _profiled_body(body, sampler, requested: bool, method: str, route: str, status_code: int, profile_id):
+    """The response body, with the profile ending once the last chunk has been sent"""
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        # Also when the client disconnects and the stream is cancelled
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(REQUEST_PROFILER.end, sampler, requested, method, route, status_code, profile_id)
+
 
 def middleware_handler(app: FastAPI):
     
@@ -17,18 +32,47 @@ def middleware_handler(app: FastAPI):
         if http_method in ["OPTIONS", "HEAD", "TRACE", "CONNECT"]:
             return await call_next(request)
 
+        # CPU profile on request (X-Profile header or ?profile=1, with the API key), or sampled automatically
+        profile_requested = (
+            request.headers.get("x-profile") == "1" or request.query_params.get("profile") == "1"
+        ) and has_api_key(request.headers)
+        sampler = REQUEST_PROFILER.begin(profile_requested)
+
         # Start time recording after the method check
         start_time = time.perf_counter()
 
         # Process the request and calculate the time taken
         response: Response
-        response = await call_next(request)
+        try:
+            response = await call_next(request)
+        except Exception:
+            if sampler is not None:
+                await run_in_threadpool(REQUEST_PROFILER.end, sampler, profile_requested, http_method, route, 500)
+            raise
         process_time = time.perf_counter() - start_time
 
         # Add the process time to response headers
         response.headers["X-Process-Time"] = str(process_time)
 
-        # Log the processed request with time taken
-        LOG.info(f"{http_method} - {route} - {process_time:.2f} s 🚀")
+        if sampler is not None and response.headers.get("content-type", "").startswith("text/event-stream"):
+            # Events are produced while the body streams, after call_next has returned. The headers
+            # go out first, so a requested profile's id is handed out before it is stored.
+            profile_id = new_profile_id() if profile_requested else None
+            response.body_iterator = _profiled_body(
+                response.body_iterator, sampler, profile_requested, http_method, route, response.status_code, profile_id
+            )
+            if profile_id is not None:
+                response.headers["X-Profile-Id"] = profile_id
+        elif sampler is not None:
+            profile_id = await run_in_threadpool(
+                REQUEST_PROFILER.end, sampler, profile_requested, http_method, route, response.status_code
+            )
+            if profile_id is not None:
+                response.headers["X-Profile-Id"] = profile_id
+                LOG.info(f"Stored CPU profile {profile_id} of {http_method} - {route} ({process_time:.2f} s)")
+
+        # Log the processed request with time taken; successful requests are sampled
+        if response.status_code >= 400 or random.random() < CONFIG.log_request_sample_rate:
+            LOG.info(f"{http_method} - {route} - {process_time:.2f} s 🚀")
 
         return response
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware import Middleware
 from contextlib import asynccontextmanager
@@ -8,12 +9,23 @@ from core.middlewares.middleware import middleware_handler
 
 
 from config import CONFIG
+from core.utils.thread_budget import apply_thread_budget
+
+# Before any module imports numpy, so the BLAS/OpenMP runtimes start with the budgeted thread count
+apply_thread_budget()
+
 from modules.healthcheck.healthcheck_routes import API_ROUTER
 from modules.logviewer.log_viewer_routes import API_ROUTER as LOG_VIEWER_ROUTER
-from modules.ORM import orm
 from modules.data.data_prep import router as data_router
 from modules.data.SummaryStats import router as data_analysis_router
+from modules.data.entities import router as entities_router
 from modules.models.predict import router as pred_router
+from modules.models.jobs import router as forecast_jobs_router, FORECAST_JOBS
+from core.warmup import warm_up
+from modules.models.precompute import PRECOMPUTER
+from modules.data.sales_views import SALES_VIEWS
+from modules.data.ingestion import ORDER_INGESTOR
+from core.utils.process_pool import shutdown_process_pool
 # from modules.data import dataAnalysis
 
 
@@ -23,7 +35,9 @@ def init_routers(app_: FastAPI) -> None:
     app_.include_router(API_ROUTER)
     app_.include_router(data_router)
     app_.include_router(data_analysis_router)
+    app_.include_router(entities_router)
     app_.include_router(pred_router)
+    app_.include_router(forecast_jobs_router)
     app_.include_router(LOG_VIEWER_ROUTER)
 
 
@@ -39,11 +53,22 @@ def make_middleware() -> list[Middleware]:
     return middleware
 
 
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     # Code to run *before* the application starts (e.g., initialize DB, start background tasks)
-#     yield
-#     # Code to run *after* the application shuts down (e.g., cleanup, close connections)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in a background thread so the worker accepts requests immediately;
+    # /api/v1/readiness reports when it is done
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up))
+    PRECOMPUTER.start()
+    SALES_VIEWS.start()
+    ORDER_INGESTOR.start()
+    yield
+    ORDER_INGESTOR.stop()
+    PRECOMPUTER.stop()
+    SALES_VIEWS.stop()
+    FORECAST_JOBS.shutdown()
+    shutdown_process_pool()
+    if not warmup.done():
+        warmup.cancel()
 
 
 def create_app() -> FastAPI:
@@ -52,7 +77,7 @@ def create_app() -> FastAPI:
         description=CONFIG.description,
         version=CONFIG.version,
         middleware=make_middleware(),
-        # lifespan=lifespan,
+        lifespan=lifespan,
         docs_url="/docs",
         redoc_url="/redoc",
         
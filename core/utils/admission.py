@@ -0,0 +1,163 @@
+import math
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from fastapi import HTTPException
+from config import CONFIG
+from core.logger.logger import LOG
+
+# Relative cost of one history point per model, and of one forecast step
+# (XGBoost predicts step by step, Prophet samples uncertainty for every step)
+MODEL_COST_WEIGHTS = {
+    "arima": (1.0, 0.1),
+    "prophet": (8.0, 2.0),
+    "xgboost": (3.0, 10.0),
+}
+
+
+# Relative cost of the quality tiers' model settings
+TIER_COST_FACTORS = {"fast": 0.3, "balanced": 1.0, "accurate": 3.0}
+
+
+def estimate_cost(model: str, history_length: int, periods_ahead: int, series: int = 1, tier: str = "balanced") -> float:
+    """Cost units for fitting `series` series of the model; `auto` fits every model"""
+    models = MODEL_COST_WEIGHTS if model == "auto" else {model: MODEL_COST_WEIGHTS[model]}
+    return series * TIER_COST_FACTORS[tier] * sum(
+        per_point * history_length + per_step * periods_ahead
+        for per_point, per_step in models.values()
+    )
+
+
+class Overloaded(HTTPException):
+    def __init__(self, pool: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"Too many concurrent '{pool}' forecasts, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+class FitLimiter:
+    """
+    Concurrency limit for one kind of fit with a bounded, cost-ordered wait queue.
+
+    Up to `max_concurrent` fits run at once. Others wait, cheapest first, while
+    the queue has room and their estimated wait stays under `max_wait_seconds`;
+    otherwise they are rejected immediately with 503 and a Retry-After derived
+    from the observed seconds per cost unit.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int, max_wait_seconds: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[float, int]] = []
+        self._sequence = itertools.count()
+        self._running_cost = 0.0
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.seconds_per_cost = None   # Moving average, learnt from finished fits
+
+    def _estimated_wait(self, cost: float) -> float:
+        if self.seconds_per_cost is None:
+            return 0.0
+        queued = sum(c for c, _ in self._waiting if c <= cost)
+        return (self._running_cost + queued) * self.seconds_per_cost / self.max_concurrent
+
+    def expected_seconds(self, cost: float):
+        """Predicted queueing plus run time for a fit of this cost, None until a fit has been timed"""
+        with self._cond:
+            if self.seconds_per_cost is None:
+                return None
+            wait = self._estimated_wait(cost) if self.running >= self.max_concurrent else 0.0
+            return wait + cost * self.seconds_per_cost
+
+    def reject_if_saturated(self):
+        """Cheap check before any work is done for a request"""
+        with self._cond:
+            if self.running >= self.max_concurrent and len(self._waiting) >= self.max_waiting:
+                self.rejected += 1
+                raise Overloaded(self.name, self._estimated_wait(0.0) or 1.0)
+
+    @contextmanager
+    def admit(self, cost: float):
+        with self._cond:
+            if self.running >= self.max_concurrent or self._waiting:
+                wait = self._estimated_wait(cost)
+                if len(self._waiting) >= self.max_waiting or wait > self.max_wait_seconds:
+                    self.rejected += 1
+                    raise Overloaded(self.name, wait or 1.0)
+
+                ticket = (cost, next(self._sequence))
+                heapq.heappush(self._waiting, ticket)
+                admitted = self._cond.wait_for(
+                    lambda: self._waiting[0] == ticket and self.running < self.max_concurrent,
+                    timeout=self.max_wait_seconds,
+                )
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                if not admitted:
+                    self.rejected += 1
+                    self._cond.notify_all()
+                    raise Overloaded(self.name, self._estimated_wait(cost) or 1.0)
+
+            self.running += 1
+            self.admitted += 1
+            self._running_cost += cost
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._cond:
+                self.running -= 1
+                self._running_cost -= cost
+                if cost > 0:
+                    sample = elapsed / cost
+                    self.seconds_per_cost = sample if self.seconds_per_cost is None else 0.8 * self.seconds_per_cost + 0.2 * sample
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "running": self.running,
+                "waiting": len(self._waiting),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "seconds_per_cost": self.seconds_per_cost,
+            }
+
+
+class AdmissionController:
+    """One FitLimiter per pool name (a model type, `auto` or `hierarchy`)"""
+
+    def __init__(self, limits: dict[str, int], max_waiting: int, max_wait_seconds: float, default_limit: int = 1):
+        self._limiters = {
+            name: FitLimiter(name, limit, max_waiting, max_wait_seconds) for name, limit in limits.items()
+        }
+        self._default = (default_limit, max_waiting, max_wait_seconds)
+        self._lock = threading.Lock()
+
+    def limiter(self, pool: str) -> FitLimiter:
+        with self._lock:
+            if pool not in self._limiters:
+                LOG.warning(f"No concurrency limit configured for '{pool}', using {self._default[0]}")
+                self._limiters[pool] = FitLimiter(pool, *self._default)
+            return self._limiters[pool]
+
+    def stats(self) -> dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+ADMISSION = AdmissionController(
+    CONFIG.fit_concurrency,
+    max_waiting=CONFIG.admission_queue_size,
+    max_wait_seconds=CONFIG.admission_max_wait_seconds,
+)
@@ -0,0 +1,34 @@
+import multiprocessing
+import threading
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from config import CONFIG
+from core.utils.thread_budget import limit_pool_process_threads
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by CPU-bound fits that run on several cores at once
+    (hierarchical forecasts, model races). Created on first use.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: forking a process that already runs logging/threadpool threads is unsafe
+            _POOL = ProcessPoolExecutor(
+                max_workers=CONFIG.process_pool_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=limit_pool_process_threads,
+            )
+        return _POOL
+
+
+def shutdown_process_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
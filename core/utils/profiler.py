@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from typing import Optional
+from collections import Counter
+from datetime import datetime, timezone
+from config import CONFIG
+from core.logger.log_handler import LOG_DIRECTORY
+
+PROFILE_DIRECTORY = os.path.join(LOG_DIRECTORY, "profiles")
+
+# Leaf frames of threads that are blocked rather than running; dropped from the samples
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+# Blocking calls into C that leave a non-idle Python frame on top (the log listener waiting on its SimpleQueue)
+_IDLE_FUNCTIONS = {("handlers.py", "dequeue")}
+
+
+def new_profile_id() -> str:
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread of the process every `interval`
+    seconds from a background thread. Forecasts run in threadpool and pool
+    threads, not in the request's task, so all threads are sampled; idle
+    threads (waiting on a lock, queue or selector) are skipped.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.frames: dict[tuple, int] = {}
+        self.samples: dict[int, list[tuple[int, ...]]] = {}
+        self.thread_names: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def _frame_id(self, code, line: int) -> int:
+        key = (code.co_name, code.co_filename, line)
+        frame_id = self.frames.get(key)
+        if frame_id is None:
+            frame_id = self.frames[key] = len(self.frames)
+        return frame_id
+
+    def _sample(self, own: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            filename = os.path.basename(frame.f_code.co_filename)
+            if filename in _IDLE_FILES or (filename, frame.f_code.co_name) in _IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code, frame.f_code.co_firstlineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.setdefault(ident, []).append(tuple(stack))
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        self.thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+    @property
+    def sample_count(self) -> int:
+        return sum(len(stacks) for stacks in self.samples.values())
+
+    def speedscope(self, name: str) -> dict:
+        """Speedscope file (https://www.speedscope.app) with one sampled profile per thread"""
+        frames = [None] * len(self.frames)
+        for (function, filename, line), frame_id in self.frames.items():
+            frames[frame_id] = {"name": function, "file": filename, "line": line}
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": f"{CONFIG.app_name} request profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.thread_names.get(ident, str(ident)),
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(len(stacks) * self.interval, 6),
+                    "samples": [list(stack) for stack in stacks],
+                    "weights": [self.interval] * len(stacks),
+                }
+                for ident, stacks in sorted(self.samples.items(), key=lambda item: -len(item[1]))
+            ],
+        }
+
+    def folded(self) -> str:
+        """Collapsed stacks ("a;b;c count" lines) for flamegraph.pl and similar tools"""
+        names = {frame_id: f"{function} ({os.path.basename(filename)}:{line})" for (function, filename, line), frame_id in self.frames.items()}
+        counts = Counter()
+        for ident, stacks in self.samples.items():
+            thread = self.thread_names.get(ident, str(ident))
+            for stack in stacks:
+                counts[";".join([thread, *(names[frame_id] for frame_id in stack)])] += 1
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class RequestProfiler:
+    """
+    Profiles single requests on demand, and 1 in `sample_every` requests
+    automatically, keeping the automatic ones only when they took at least
+    `slow_seconds`. One request is profiled at a time per worker, since the
+    sampler sees every thread. Profiles are written to `directory` as
+    speedscope JSON plus collapsed stacks; the oldest beyond `max_files` are
+    deleted.
+    """
+
+    def __init__(self, directory: str, interval: float, sample_every: int, slow_seconds: float, max_files: int):
+        self.directory = directory
+        self.interval = interval
+        self.sample_every = sample_every
+        self.slow_seconds = slow_seconds
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._busy = False
+        self.stored = 0
+        self.discarded = 0
+
+    def begin(self, requested: bool) -> Optional[StackSampler]:
+        """A running sampler when this request is to be profiled, None otherwise"""
+        if not requested and (self.sample_every <= 0 or random.random() >= 1 / self.sample_every):
+            return None
+        with self._lock:
+            if self._busy:
+                return None
+            self._busy = True
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def end(self, sampler: StackSampler, requested: bool, method: str, path: str, status_code: int,
+            profile_id: Optional[str] = None) -> Optional[str]:
+        """
+        Stop the sampler and store its profile, under `profile_id` if one was
+        handed out already; returns the profile id, or None when it was not kept
+        """
+        try:
+            sampler.stop()
+            if not requested and sampler.duration < self.slow_seconds:
+                self.discarded += 1
+                return None
+            return self._store(sampler, requested, method, path, status_code, profile_id or new_profile_id())
+        finally:
+            with self._lock:
+                self._busy = False
+
+    def _store(self, sampler: StackSampler, requested: bool, method: str, path: str, status_code: int, profile_id: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = datetime.now(timezone.utc)
+        meta = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "status_code": status_code,
+            "trigger": "requested" if requested else "sampled",
+            "duration_seconds": round(sampler.duration, 3),
+            "samples": sampler.sample_count,
+            "interval_seconds": self.interval,
+            "created_at": created_at.isoformat(),
+        }
+        base = os.path.join(self.directory, profile_id)
+        with open(f"{base}.speedscope.json", "w") as f:
+            json.dump(sampler.speedscope(f"{method} {path}"), f)
+        with open(f"{base}.folded", "w") as f:
+            f.write(sampler.folded())
+        with open(f"{base}.meta.json", "w") as f:
+            json.dump(meta, f)
+        self.stored += 1
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        metas = sorted(name for name in os.listdir(self.directory) if name.endswith(".meta.json"))
+        for name in metas[:max(0, len(metas) - self.max_files)]:
+            profile_id = name[:-len(".meta.json")]
+            for suffix in (".meta.json", ".speedscope.json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def recent(self, limit: int) -> list[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        metas = sorted((name for name in os.listdir(self.directory) if name.endswith(".meta.json")), reverse=True)
+        profiles = []
+        for name in metas[:limit]:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, profile_id: str, suffix: str) -> Optional[str]:
+        # Ids come from the URL; only plain names inside the profile directory are served
+        if os.path.basename(profile_id) != profile_id:
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.isfile(path) else None
+
+
+REQUEST_PROFILER = RequestProfiler(
+    directory=PROFILE_DIRECTORY,
+    interval=CONFIG.profile_interval_ms / 1000,
+    sample_every=CONFIG.profile_sample_every,
+    slow_seconds=CONFIG.profile_slow_seconds,
+    max_files=CONFIG.profile_max_files,
+)
+
+
+def has_api_key(headers) -> bool:
+    """Profiling is only available with the configured API key, and not at all without one"""
+    return CONFIG.api_key is not None and headers.get("x-api-key") == CONFIG.api_key
@@ -0,0 +1,69 @@
+import datetime
+import orjson
+import numpy as np
+import pandas as pd
+from typing import Any
+from fastapi.responses import Response
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Fallback for types orjson does not encode natively"""
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Encode an object to JSON bytes; NumPy scalars/arrays are handled natively and NaN/Inf become null"""
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+def extend_json(encoded: bytes, **fields) -> bytes:
+    """
+    Append extra top-level keys to an already encoded JSON object without re-encoding it.
+    """
+    if not fields:
+        return encoded
+    extra = dumps_json(fields)
+    if encoded == b"{}":
+        return extra
+    return encoded[:-1] + b"," + extra[1:]
+
+
+def sanitize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace NaN and Inf values in the numeric columns of a DataFrame with None"""
+    numeric = df.select_dtypes(include="number")
+    if numeric.empty:
+        return df
+
+    invalid = ~np.isfinite(numeric.to_numpy(dtype="float64"))
+    if not invalid.any():
+        return df
+
+    cleaned = df.copy()
+    cleaned[numeric.columns] = numeric.astype(object).mask(invalid, None)
+    return cleaned
+
+
+def frame_records(df: pd.DataFrame) -> list[dict]:
+    """Sanitise a DataFrame and convert it to a list of row dicts"""
+    return sanitize_frame(df).to_dict(orient="records")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson. Accepts either a Python object or
+    bytes that were already encoded with `dumps_json`, in which case they are sent as-is.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps_json(content)
@@ -0,0 +1,176 @@
+import os
+import time
+import sqlite3
+import threading
+from enum import Enum
+from typing import Callable, Optional
+from config import CONFIG
+from core.logger.logger import LOG
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+# Refresh accessed_at on reads at most this often, so hot keys don't turn every read into a write
+_TOUCH_INTERVAL_SECONDS = 60
+
+
+def cache_key(parts) -> str:
+    """Stable string form of a tuple key (enums by value)"""
+    return "|".join(str(p.value if isinstance(p, Enum) else p) for p in parts)
+
+
+class SharedCache:
+    """
+    Size-bounded key/value store in a local SQLite file, shared by every worker
+    process on the host (uvicorn workers and pool processes alike).
+
+    WAL mode lets readers proceed while one process writes; each write is a
+    single transaction, so other processes see either the old or the new value.
+    When the file holds more than `max_bytes` of values, expired entries and
+    then the least recently read ones are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread (and per process after spawn)
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            now = time.time()
+            if row is None or (row[1] is not None and row[1] < now):
+                self._count(hit=False)
+                return None
+            if now - row[2] > _TOUCH_INTERVAL_SECONDS:
+                connection.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                )
+            self._count(hit=True)
+            return row[0]
+        except sqlite3.Error as e:
+            # The cache is an optimisation; never fail a request because of it
+            LOG.warning(f"Shared cache read failed: {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        now = time.time()
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, key, value, len(value), now, now + ttl_seconds if ttl_seconds else None, now),
+                )
+            self._evict_if_needed(connection)
+        except sqlite3.Error as e:
+            LOG.warning(f"Shared cache write failed: {e}")
+
+    def _evict_if_needed(self, connection: sqlite3.Connection):
+        total = connection.execute("SELECT total(size) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * 0.9
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            removed = connection.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            ).rowcount
+            total = connection.execute("SELECT total(size) FROM entries").fetchone()[0]
+
+            if total > target:
+                # Walk entries from least recently read until enough bytes are freed
+                victims, freed = [], 0
+                for namespace, key, size in connection.execute(
+                    "SELECT namespace, key, size FROM entries ORDER BY accessed_at"
+                ):
+                    if total - freed <= target:
+                        break
+                    victims.append((namespace, key))
+                    freed += size
+                connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", victims)
+                removed += len(victims)
+
+        with self._stats_lock:
+            self.evictions += removed
+
+    def delete(self, namespace: str, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        """Delete a whole namespace, or only its keys matching the predicate"""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                if predicate is None:
+                    return connection.execute("DELETE FROM entries WHERE namespace = ?", (namespace,)).rowcount
+                keys = [
+                    (namespace, key)
+                    for (key,) in connection.execute("SELECT key FROM entries WHERE namespace = ?", (namespace,))
+                    if predicate(key)
+                ]
+                connection.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", keys)
+                return len(keys)
+        except sqlite3.Error as e:
+            LOG.warning(f"Shared cache delete failed: {e}")
+            return 0
+
+    def stats(self) -> dict:
+        try:
+            rows = self._connection().execute(
+                "SELECT namespace, count(*), total(size) FROM entries GROUP BY namespace"
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "namespaces": {namespace: {"entries": count, "bytes": int(size)} for namespace, count, size in rows},
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+SHARED_CACHE = SharedCache(path=CONFIG.shared_cache_path, max_bytes=CONFIG.shared_cache_max_bytes)
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key onto one in-flight computation.
+
+    The first caller for a key starts the work as a separate task; callers that
+    arrive while it is running await the same task instead of starting their own.
+    The task is shielded, so a disconnecting client does not cancel the work for
+    the others. Once it finishes the key is released and the next call recomputes.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._release(key, t))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
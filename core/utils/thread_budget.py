@@ -0,0 +1,99 @@
+import os
+import sys
+from typing import Optional
+from dataclasses import dataclass, asdict
+from config import CONFIG
+from core.logger.logger import LOG
+
+# Read by the BLAS/OpenMP runtimes (and CmdStan) when they are loaded
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "STAN_NUM_THREADS",
+)
+
+# Set in pool processes, which run one single-threaded fit at a time
+_in_pool_process = False
+
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    enabled: bool
+    cores: int
+    web_workers: int
+    worker_threads: int      # Cores one uvicorn worker may keep busy
+    fit_threads: int         # BLAS/OpenMP threads per fit in a uvicorn worker
+    xgboost_threads: int     # n_jobs per XGBoost fit in a uvicorn worker
+    pool_processes: int
+
+
+def compute_thread_budget(cpu_threads: int, web_workers: int, fit_concurrency: dict[str, int], pool_processes: int) -> ThreadBudget:
+    """
+    Split the host's cores between the uvicorn workers, then between the fits
+    each worker runs concurrently, so that a fully loaded host runs about one
+    busy thread per core instead of every library starting one per core.
+    """
+    cores = cpu_threads or os.cpu_count() or 1
+    worker_threads = max(1, cores // web_workers)
+    return ThreadBudget(
+        enabled=cpu_threads > 0,
+        cores=cores,
+        web_workers=web_workers,
+        worker_threads=worker_threads,
+        fit_threads=max(1, worker_threads // max(fit_concurrency.values(), default=1)),
+        xgboost_threads=max(1, worker_threads // fit_concurrency.get("xgboost", 1)),
+        pool_processes=pool_processes,
+    )
+
+
+THREAD_BUDGET = compute_thread_budget(
+    CONFIG.cpu_threads, CONFIG.web_workers, CONFIG.fit_concurrency, CONFIG.process_pool_workers
+)
+
+
+def _limit_threads(threads: int, override: bool):
+    for var in THREAD_ENV_VARS:
+        if override:
+            os.environ[var] = str(threads)
+        else:
+            # Explicit settings from the environment win
+            os.environ.setdefault(var, str(threads))
+
+    # Runtimes that are already loaded ignore the variables; resize their pools directly
+    if "numpy" in sys.modules:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+
+
+def apply_thread_budget():
+    """Limit BLAS/OpenMP threads of this worker; call at worker start, before numpy is imported"""
+    if not THREAD_BUDGET.enabled:
+        return
+    _limit_threads(THREAD_BUDGET.fit_threads, override=False)
+    LOG.info(
+        f"Thread budget: {THREAD_BUDGET.worker_threads} of {THREAD_BUDGET.cores} cores for this worker, "
+        f"{THREAD_BUDGET.fit_threads} BLAS/OpenMP threads per fit, {THREAD_BUDGET.xgboost_threads} XGBoost threads, "
+        f"{THREAD_BUDGET.pool_processes} pool processes"
+    )
+
+
+def limit_pool_process_threads():
+    """Process pool initializer: parallelism comes from the pool, so each process uses one thread"""
+    global _in_pool_process
+    _in_pool_process = True
+    if THREAD_BUDGET.enabled:
+        _limit_threads(1, override=True)
+
+
+def xgboost_n_jobs() -> Optional[int]:
+    """n_jobs for XGBRegressor; None (all cores) when the budget is disabled"""
+    if not THREAD_BUDGET.enabled:
+        return None
+    return 1 if _in_pool_process else THREAD_BUDGET.xgboost_threads
+
+
+def thread_budget_stats() -> dict:
+    return {**asdict(THREAD_BUDGET), "in_pool_process": _in_pool_process}
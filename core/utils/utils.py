@@ -1,19 +1,6 @@
-import math
 import numpy as np
 from sklearn.metrics import mean_absolute_error,mean_squared_error,mean_absolute_percentage_error
 from core.logger.logger import LOG
-def clean_floats(obj):
-    """Remove NaN and Inf values from nested structures"""
-    if isinstance(obj, dict):
-        return {k: clean_floats(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [clean_floats(i) for i in obj]
-    elif isinstance(obj, float):
-        if math.isnan(obj) or math.isinf(obj):
-            return None
-        return obj
-    return obj
-
 def evaluate_arima_model(model_fit, ts):
     """Evaluate ARIMA model fitness and residuals"""
     try:
@@ -0,0 +1,84 @@
+import time
+import importlib
+from datetime import datetime, timezone
+from core.logger.logger import LOG
+
+# Modules that are slow to import; loaded by the warm-up instead of at app import
+HEAVY_MODULES = [
+    "modules.models.Arima",      # statsmodels, scikit-learn
+    "modules.models.Prophet",    # prophet / cmdstanpy
+    "modules.models.XG_boost",   # xgboost
+]
+
+WARMUP_STATE = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "steps": {},
+    "errors": {},
+}
+
+
+def _import_heavy_modules():
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+def _check_database():
+    from modules.data.snapshot import SALES_SNAPSHOT, use_snapshot
+    if use_snapshot():
+        # Serve from the local snapshot; Postgres is never contacted
+        SALES_SNAPSHOT.load()
+        return
+    from modules.ORM.orm import check_connection
+    check_connection()
+
+
+def _build_entity_index():
+    from modules.data.entity_index import ENTITY_INDEX
+    ENTITY_INDEX.ensure_fresh(force=True)
+
+
+def _prepare_sales_views():
+    from config import CONFIG
+    from modules.data.sales_views import SALES_VIEWS
+    if not CONFIG.sales_views_enabled or CONFIG.data_source == "snapshot":
+        return
+    if CONFIG.sales_views_setup_on_startup:
+        SALES_VIEWS.setup()
+    else:
+        SALES_VIEWS.detect()
+
+
+def _build_llm_client():
+    from modules.LLM.LLM_analyzer import get_llm
+    get_llm()
+
+
+WARMUP_STEPS = [
+    ("database", _check_database),
+    ("entity_index", _build_entity_index),
+    ("sales_views", _prepare_sales_views),
+    ("model_libraries", _import_heavy_modules),
+    ("llm_client", _build_llm_client),
+]
+
+
+def warm_up():
+    """
+    Run the warm-up steps once per worker. Every step is attempted even if an
+    earlier one fails; the worker is reported ready only when all succeeded.
+    """
+    WARMUP_STATE["started_at"] = datetime.now(timezone.utc).isoformat()
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            WARMUP_STATE["errors"][name] = str(e)
+            LOG.error(f"Warm-up step '{name}' failed: {e}")
+        WARMUP_STATE["steps"][name] = round(time.perf_counter() - start, 3)
+
+    WARMUP_STATE["finished_at"] = datetime.now(timezone.utc).isoformat()
+    WARMUP_STATE["ready"] = not WARMUP_STATE["errors"]
+    LOG.info(f"Warm-up finished in {sum(WARMUP_STATE['steps'].values()):.2f} s, ready={WARMUP_STATE['ready']}")
@@ -1,7 +1,11 @@
+import os
 import argparse
 
 def main(args):
     import uvicorn
+
+    # Workers size their thread pools from how many of them share the host
+    os.environ["web_workers"] = str(args.workers)
     
     uvicorn.run(
         app="core.server:app",
@@ -1,40 +1,137 @@
 import os 
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage,SystemMessage
+from functools import lru_cache
 from modules.LLM.prompt import SYSTEM_PROMPT
 from config import CONFIG
 import json
 from core.logger.logger import LOG
+from modules.LLM.rate_limit import LLM_LIMITER
 
 os.environ["GROQ_API_KEY"] = CONFIG.groq_api_key
 
-# --- Initialize LLM ---
-llm = ChatGroq(model=CONFIG.model_name)
+# --- Initialize LLM (on first use; langchain_groq is slow to import) ---
+@lru_cache(maxsize=1)
+def get_llm():
+    if CONFIG.llm_provider == "stub":
+        from modules.LLM.stub_llm import StubChatModel
+        return StubChatModel(latency=CONFIG.llm_stub_latency_ms / 1000, failure_rate=CONFIG.llm_stub_failure_rate)
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=CONFIG.model_name)
+
+# Expected size of one five-section analysis, counted against the batch token budget up front
+ANALYSIS_REPLY_TOKENS = 900
+
+def _messages(user_input: str, system_prompt: str = SYSTEM_PROMPT):
+    from langchain_core.messages import HumanMessage,SystemMessage
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_input)
+    ]
+
+def _parse_analysis(content: str) -> dict:
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # If escaped or formatted badly, clean and re-parse
+        cleaned = content.strip()
+        cleaned = cleaned.replace("\n", "").replace("\\n", "").replace("\\", "")
+        return json.loads(cleaned)
 
 # --- Helper function to analyze forecast with Groq ---
 def analyze_forecast(user_input: str):
     try:
-        messages = [
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=user_input)
-        ]
+        with LLM_LIMITER.call():
+            response = get_llm().invoke(
+                _messages(user_input),
+                response_format={"type": "json_object"}  # ensures Groq tries to send valid JSON
+            )
+        return _parse_analysis(response.content)
+
+    except Exception as e:
+        LOG.error(f"LLM analysis failed: {e}")
+        return {"error": "LLM analysis failed", "details": str(e)}
+
+
+class SectionParser:
+    """
+    Picks the complete top-level members out of a JSON object while its text
+    is still arriving, so each analysis section can be passed on as soon as
+    its last sentence is in.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.emitted = set()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self._closed = False
+        self._skipped = False
 
-        response = llm.invoke(
-            messages,
-            response_format={"type": "json_object"}  # ensures Groq tries to send valid JSON
-        )
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        self.text += chunk
+        members = []
+        for i in range(self._pos, len(self.text)):
+            c = self.text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif c in "}]":
+                if self._depth == 1:
+                    members += self._member(i)
+                    self._closed = True
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                members += self._member(i)
+                self._member_start = i + 1
+        self._pos = len(self.text)
+        return members
 
-        # --- Try to parse the JSON ---
+    def _member(self, end: int) -> list[tuple[str, object]]:
+        member = self.text[self._member_start:end].strip()
+        if not member:
+            return []
         try:
-            parsed = json.loads(response.content)
+            parsed = json.loads("{" + member + "}")
         except json.JSONDecodeError:
-            # If escaped or formatted badly, clean and re-parse
-            cleaned = response.content.strip()
-            cleaned = cleaned.replace("\n", "").replace("\\n", "").replace("\\", "")
-            parsed = json.loads(cleaned)
+            # Left to the lenient parse of the whole reply in finish()
+            self._skipped = True
+            return []
+        self.emitted.update(parsed)
+        return list(parsed.items())
 
-        return parsed
+    def finish(self) -> list[tuple[str, object]]:
+        """Sections that could only be parsed from the whole reply"""
+        if self._closed and not self._skipped:
+            return []
+        parsed = _parse_analysis(self.text)
+        return [(key, value) for key, value in parsed.items() if key not in self.emitted]
 
+
+def stream_forecast_analysis(user_input: str):
+    """
+    Yield (section, content) pairs of the analysis as the reply streams in.
+    Joined into a dict they equal what analyze_forecast returns, including its
+    error keys when the call fails.
+    """
+    parser = SectionParser()
+    try:
+        with LLM_LIMITER.call():
+            for chunk in get_llm().stream(_messages(user_input), response_format={"type": "json_object"}):
+                yield from parser.feed(chunk.content)
+        yield from parser.finish()
     except Exception as e:
         LOG.error(f"LLM analysis failed: {e}")
-        return {"error": "LLM analysis failed", "details": str(e)}
+        yield "error", "LLM analysis failed"
+        yield "details", str(e)
@@ -0,0 +1,170 @@
+import time
+import random
+import threading
+from typing import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from config import CONFIG
+from core.logger.logger import LOG
+from modules.LLM.prompt import SYSTEM_PROMPT
+from modules.LLM.payload import estimate_tokens
+from modules.LLM.rate_limit import LLM_LIMITER, LLMLimiter
+from modules.LLM.LLM_analyzer import ANALYSIS_REPLY_TOKENS, get_llm, _messages, _parse_analysis
+
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+### 📦 SEVERAL FORECASTS
+
+The input is a JSON object {"forecasts": {"<id>": <forecast JSON>, ...}}. Analyse every forecast on its own,
+as described above, and return one JSON object that maps every id to its analysis object with the 5 keys:
+{"<id>": {"forecast_quality_assessment": [...], ...}, ...}
+"""
+
+# Errors worth another attempt: rate limits, timeouts and server errors
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _status_code(error: Exception):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def is_transient(error: Exception) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    return isinstance(error, (TimeoutError, ConnectionError)) or type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+def _retry_after(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchAnalyzer:
+    """
+    LLM analyses of many forecasts at once. Prompts are packed into calls of
+    at most `max_items` forecasts and `max_tokens` prompt plus expected reply
+    tokens, the calls run `workers` at a time within the shared LLM limiter,
+    and transient errors are retried with exponential backoff. Forecasts a
+    batched reply leaves out or garbles are retried on their own.
+    """
+
+    def __init__(self, limiter: LLMLimiter, max_tokens: int, max_items: int, max_retries: int, backoff_seconds: float, workers: int,
+                 llm: Callable = get_llm):
+        self.limiter = limiter
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.workers = workers
+        self._stats_lock = threading.Lock()
+
+        self.calls = 0
+        self.analysed = 0
+        self.retries = 0
+        self.failed = 0
+
+    def _count(self, **counts):
+        with self._stats_lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def batches(self, prompts: dict[str, str]) -> list[dict[str, str]]:
+        """Consecutive prompts packed greedily; a prompt over the budget on its own gets a call to itself"""
+        base = estimate_tokens(BATCH_SYSTEM_PROMPT)
+        batches, batch, tokens = [], {}, base
+        for item_id, prompt in prompts.items():
+            cost = estimate_tokens(prompt) + ANALYSIS_REPLY_TOKENS
+            if batch and (len(batch) >= self.max_items or tokens + cost > self.max_tokens):
+                batches.append(batch)
+                batch, tokens = {}, base
+            batch[item_id] = prompt
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _call(self, batch: dict[str, str]) -> tuple[dict[str, dict], str | None]:
+        """Analyses the reply holds for the batch, and the error that ended the last attempt"""
+        # The prompts are JSON already, so they are spliced in rather than parsed and encoded again
+        user_input = '{"forecasts":{' + ",".join(f'"{item_id}":{prompt}' for item_id, prompt in batch.items()) + "}}"
+        tokens = estimate_tokens(BATCH_SYSTEM_PROMPT) + estimate_tokens(user_input) + len(batch) * ANALYSIS_REPLY_TOKENS
+
+        attempt = 0
+        while True:
+            try:
+                self._count(calls=1)
+                with self.limiter.call(tokens, budgeted=True):
+                    response = self.llm().invoke(
+                        _messages(user_input, BATCH_SYSTEM_PROMPT),
+                        response_format={"type": "json_object"},
+                    )
+                parsed = _parse_analysis(response.content)
+                return {item_id: parsed[item_id] for item_id in batch if isinstance(parsed.get(item_id), dict)}, None
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    LOG.error(f"Batched LLM analysis of {len(batch)} forecasts failed: {e}")
+                    return {}, str(e)
+                delay = _retry_after(e) or self.backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+                LOG.warning(f"LLM call failed ({e}), retrying in {delay:.1f} s")
+                self._count(retries=1)
+                time.sleep(delay)
+                attempt += 1
+
+    def analyze_many(self, prompts: dict[Hashable, str]) -> dict[Hashable, dict]:
+        """
+        The analysis of every prompt, keyed like `prompts`. A forecast that
+        cannot be analysed gets the same error dict analyze_forecast returns.
+        """
+        if not prompts:
+            return {}
+        # Short ids keep the keys the LLM has to copy back cheap and unambiguous
+        keys = {f"f{i}": key for i, key in enumerate(prompts)}
+        pending = {item_id: prompts[key] for item_id, key in keys.items()}
+        analyses, errors = {}, {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm-batch") as pool:
+            for attempt_batches in (self.batches(pending), None):
+                if attempt_batches is None:
+                    # Second pass: whatever the batched replies missed, one forecast per call
+                    attempt_batches = [{item_id: prompt} for item_id, prompt in pending.items()]
+                for batch, (result, error) in zip(attempt_batches, pool.map(self._call, attempt_batches)):
+                    analyses.update(result)
+                    for item_id in batch:
+                        if item_id not in result:
+                            errors[item_id] = error or "Analysis missing from the LLM reply"
+                pending = {item_id: prompt for item_id, prompt in pending.items() if item_id not in analyses}
+                if not pending:
+                    break
+
+        self._count(analysed=len(analyses), failed=len(pending))
+        return {
+            key: analyses.get(item_id) or {"error": "LLM analysis failed", "details": errors.get(item_id)}
+            for item_id, key in keys.items()
+        }
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "analysed": self.analysed,
+            "retries": self.retries,
+            "failed": self.failed,
+            "max_items": self.max_items,
+            "max_tokens": self.max_tokens,
+        }
+
+
+BATCH_ANALYZER = BatchAnalyzer(
+    LLM_LIMITER,
+    max_tokens=CONFIG.llm_batch_max_tokens,
+    max_items=CONFIG.llm_batch_max_items,
+    max_retries=CONFIG.llm_max_retries,
+    backoff_seconds=CONFIG.llm_retry_backoff_seconds,
+    workers=CONFIG.llm_max_concurrency,
+)
+
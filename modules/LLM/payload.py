@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from core.utils.serialization import dumps_json
+from modules.models.modelSchema import ForecastFrequency
+
+# Rough size of a token in JSON text, for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+# Periods of the recent window sent when the budget allows
+RECENT_PERIODS = {
+    ForecastFrequency.DAILY: 28,
+    ForecastFrequency.WEEKLY: 13,
+    ForecastFrequency.MONTHLY: 12,
+}
+
+# Longest period length, to tell whether the history reaches back far enough for a comparison
+_PERIOD_LENGTH = {
+    ForecastFrequency.DAILY: pd.Timedelta(days=1),
+    ForecastFrequency.WEEKLY: pd.Timedelta(days=7),
+    ForecastFrequency.MONTHLY: pd.Timedelta(days=31),
+}
+
+_MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _round(value, digits: int = 2):
+    value = float(value)
+    return round(value, digits) if np.isfinite(value) else None
+
+
+def _percent(part: float, whole: float):
+    return _round((part / whole - 1) * 100, 1) if whole else None
+
+
+def _profile(keys: np.ndarray, values: np.ndarray, labels: list[str], mean: float) -> dict:
+    """Mean sales per key (month, quarter, weekday) as a seasonal index, 100 = an average period"""
+    size = len(labels) + 1
+    counts = np.bincount(keys, minlength=size)[1:]
+    sums = np.bincount(keys, weights=values, minlength=size)[1:]
+    present = counts > 0
+    index = np.full(len(labels), np.nan)
+    index[present] = sums[present] / counts[present] / mean * 100 if mean else np.nan
+    return {label: _round(value, 1) for label, value, seen in zip(labels, index, present) if seen}
+
+
+def series_summary(ts: pd.Series, frequency: ForecastFrequency, date_format: str, recent_periods: int, anomalies: int = 5) -> dict:
+    """
+    History condensed to the numbers SYSTEM_PROMPT asks about: level and
+    spread, linear trend and year-over-year growth, volatility, seasonal
+    profiles by month and quarter (and weekday for daily series), the largest
+    anomalies and the most recent periods.
+    """
+    values = ts.to_numpy(dtype="float64")
+    index = pd.DatetimeIndex(ts.index)
+    labels = index.strftime(date_format)
+    n = len(values)
+    mean = values.mean()
+    std = values.std(ddof=1) if n > 1 else 0.0
+
+    # Least squares line through the periods
+    slope, intercept = np.polyfit(np.arange(n), values, 1) if n > 1 else (0.0, mean)
+    fitted_start, fitted_end = intercept, intercept + slope * (n - 1)
+
+    # Last 12 months against the 12 before, when the history covers both
+    last = index[-1]
+    year_ago, two_years_ago = last - pd.DateOffset(years=1), last - pd.DateOffset(years=2)
+    last_year = values[index > year_ago].sum()
+    covered = index[0] <= two_years_ago + _PERIOD_LENGTH[frequency]
+    prior_year = values[(index > two_years_ago) & (index <= year_ago)].sum() if covered else 0.0
+
+    previous = values[:-1]
+    changes = np.divide(np.diff(values), previous, out=np.full(n - 1, np.nan), where=previous != 0)
+    changes = changes[np.isfinite(changes)]
+
+    summary = {
+        "periods": n,
+        "first_period": labels[0],
+        "last_period": labels[-1],
+        "total_sales": _round(values.sum()),
+        "mean": _round(mean),
+        "median": _round(np.median(values)),
+        "std": _round(std),
+        "min": {"period": labels[values.argmin()], "sales": _round(values.min())},
+        "max": {"period": labels[values.argmax()], "sales": _round(values.max())},
+        "trend": {
+            "slope_per_period": _round(slope),
+            "slope_percent_of_mean": _round(slope / mean * 100, 2) if mean else None,
+            "fitted_change_percent": _percent(fitted_end, fitted_start) if fitted_start > 0 else None,
+            "last_12_months_sales": _round(last_year),
+            "year_over_year_percent": _percent(last_year, prior_year) if prior_year else None,
+        },
+        "volatility": {
+            "coefficient_of_variation_percent": _round(std / mean * 100, 1) if mean else None,
+            "period_change_std_percent": _round(changes.std() * 100, 1) if len(changes) > 1 else None,
+            "zero_sales_periods": int((values == 0).sum()),
+        },
+        "seasonal_index": {
+            "month": _profile(index.month.to_numpy(), values, _MONTHS, mean),
+            "quarter": _profile(index.quarter.to_numpy(), values, ["Q1", "Q2", "Q3", "Q4"], mean),
+        },
+    }
+    if frequency == ForecastFrequency.DAILY:
+        summary["seasonal_index"]["weekday"] = _profile(index.dayofweek.to_numpy() + 1, values, _WEEKDAYS, mean)
+
+    if anomalies and std > 0:
+        z = (values - mean) / std
+        outliers = np.flatnonzero(np.abs(z) >= 3)
+        outliers = outliers[np.argsort(-np.abs(z[outliers]))][:anomalies]
+        summary["anomalies"] = [{"period": labels[i], "sales": _round(values[i]), "z_score": _round(z[i], 1)} for i in sorted(outliers)]
+
+    if recent_periods:
+        recent = values[-recent_periods:]
+        summary["recent"] = {
+            "mean": _round(recent.mean()),
+            "vs_overall_mean_percent": _percent(recent.mean(), mean),
+            "sales": {label: _round(value) for label, value in zip(labels[-recent_periods:], recent)},
+        }
+    return summary
+
+
+def _forecast_summary(forecast: list[dict]) -> dict:
+    sales = np.array([row["forecasted_sales"] for row in forecast], dtype="float64")
+    period = next(key for key in forecast[0] if key not in ("forecasted_sales", "lower_bound", "upper_bound"))
+    return {
+        "periods": len(forecast),
+        "first": forecast[0],
+        "last": forecast[-1],
+        "total": _round(np.nansum(sales)),
+        "mean": _round(np.nanmean(sales)),
+        "min": {"period": forecast[int(np.nanargmin(sales))][period], "sales": _round(np.nanmin(sales))},
+        "max": {"period": forecast[int(np.nanargmax(sales))][period], "sales": _round(np.nanmax(sales))},
+    }
+
+
+def build_llm_payload(header: dict, ts: pd.Series, frequency: ForecastFrequency, date_format: str,
+                      forecast: list[dict], evaluation: dict, model_info: dict, max_tokens: int) -> str:
+    """
+    The forecast response for the LLM with the history replaced by its
+    summary. Detail is dropped until the payload fits `max_tokens`: first the
+    recent window is halved down to 3 periods, then anomalies and the weekday
+    profile go, and finally the forecast rows are summarised too.
+    """
+    recent = min(RECENT_PERIODS[frequency], len(ts))
+    anomalies = 5
+    forecast_rows = True
+    while True:
+        history = series_summary(ts, frequency, date_format, recent, anomalies)
+        if not anomalies:
+            history["seasonal_index"].pop("weekday", None)
+        payload = dumps_json({
+            **header,
+            "history_summary": history,
+            "forecast": forecast if forecast_rows else _forecast_summary(forecast),
+            "evaluation_metrics": evaluation,
+            "model_info": model_info,
+        }).decode()
+
+        if estimate_tokens(payload) <= max_tokens:
+            return payload
+        if recent > 3:
+            recent = max(3, recent // 2)
+        elif anomalies:
+            anomalies = 0
+        elif forecast_rows and forecast:
+            forecast_rows = False
+        else:
+            # Nothing left to drop; send it over budget rather than without the numbers
+            return payload
@@ -0,0 +1,84 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from config import CONFIG
+
+WINDOW_SECONDS = 60.0
+
+
+class LLMLimiter:
+    """
+    Process-wide cap on concurrent LLM calls, shared by single, streamed and
+    batched calls alike. Budgeted calls (the batched bulk analyses) also keep
+    to a number of calls and tokens per minute over a sliding window (0
+    disables either budget), so request analyses are never throttled by it.
+    A budgeted call waits for the budget before taking a slot.
+    """
+
+    def __init__(self, concurrency: int, requests_per_minute: int, tokens_per_minute: int):
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._window: deque[tuple[float, int]] = deque()   # (start, tokens) of the budgeted calls in the last minute
+
+        self.calls = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        """Record the call and return 0 when the budget allows it, otherwise how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+                self._window.popleft()
+            over_requests = self.requests_per_minute and len(self._window) >= self.requests_per_minute
+            # A call larger than the whole budget still runs once the window is empty
+            over_tokens = (
+                self.tokens_per_minute and self._window
+                and sum(used for _, used in self._window) + tokens > self.tokens_per_minute
+            )
+            if not over_requests and not over_tokens:
+                self._window.append((now, tokens))
+                return 0.0
+            return max(self._window[0][0] + WINDOW_SECONDS - now, 0.01)
+
+    def _wait_for_budget(self, tokens: int):
+        wait = self._reserve(tokens)
+        if wait:
+            self.throttled += 1
+            start = time.monotonic()
+            while wait:
+                time.sleep(wait)
+                wait = self._reserve(tokens)
+            self.throttled_seconds += time.monotonic() - start
+
+    @contextmanager
+    def call(self, tokens: int = 0, budgeted: bool = False):
+        """Hold a slot for one LLM call of about `tokens` prompt plus reply tokens"""
+        if budgeted:
+            # Sleeping here holds no slot, so request analyses keep every slot the budget leaves idle
+            self._wait_for_budget(tokens)
+        with self._slots:
+            self.calls += 1
+            yield
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "batch_requests_per_minute": self.requests_per_minute,
+            "batch_tokens_per_minute": self.tokens_per_minute,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "throttled_seconds": round(self.throttled_seconds, 2),
+        }
+
+
+# The batch budget is configured for the host; batches only come from the one worker that runs the precompute
+LLM_LIMITER = LLMLimiter(
+    concurrency=CONFIG.llm_max_concurrency,
+    requests_per_minute=CONFIG.llm_batch_requests_per_minute,
+    tokens_per_minute=CONFIG.llm_batch_tokens_per_minute,
+)
@@ -0,0 +1,67 @@
+import json
+import time
+import random
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# The sections SYSTEM_PROMPT asks the model for
+ANALYSIS_SECTIONS = [
+    "forecast_quality_assessment",
+    "trend_and_seasonality_analysis",
+    "model_feature_interpretation",
+    "forecast_outlook_summary",
+    "marketing_and_business_recommendations",
+]
+
+
+class StubRateLimitError(Exception):
+    """What the stub raises in place of a Groq 429"""
+    status_code = 429
+
+
+class StubChatModel:
+    """
+    Stands in for ChatGroq with llm_provider=stub: takes `latency` seconds, as
+    a Groq call would, and answers every prompt with the same JSON sections
+    (whole or streamed) so the app can be load tested without API calls. A
+    batched prompt gets one analysis per forecast id, and `failure_rate` of
+    the calls fail with a rate limit error to exercise the retries.
+    """
+
+    def __init__(self, latency: float, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def _analysis(self, prompt_chars: int) -> dict:
+        return {
+            section: [f"Stub sentence {i + 1} of {section} for a prompt of {prompt_chars} characters." for i in range(5)]
+            for section in ANALYSIS_SECTIONS
+        }
+
+    def _reply(self, messages) -> str:
+        prompt = messages[-1].content
+        if prompt.startswith('{"forecasts":'):
+            forecasts = json.loads(prompt)["forecasts"]
+            return json.dumps({item_id: self._analysis(len(json.dumps(forecast))) for item_id, forecast in forecasts.items()})
+        return json.dumps(self._analysis(sum(len(message.content) for message in messages)))
+
+    def _maybe_fail(self):
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise StubRateLimitError("Stub rate limit exceeded")
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        self.calls += 1
+        time.sleep(self.latency)
+        self._maybe_fail()
+        return AIMessage(content=self._reply(messages))
+
+    def stream(self, messages, chunk_chars: int = 40, **kwargs):
+        """The same reply in chunks: the first after a tenth of the latency, the rest spread over the remainder"""
+        self.calls += 1
+        reply = self._reply(messages)
+        self._maybe_fail()
+        chunks = [reply[i:i + chunk_chars] for i in range(0, len(reply), chunk_chars)]
+        time.sleep(self.latency / 10)
+        for chunk in chunks:
+            yield AIMessageChunk(content=chunk)
+            time.sleep(self.latency * 0.9 / len(chunks))
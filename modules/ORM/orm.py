@@ -1,14 +1,19 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from config import CONFIG
 from core.logger.logger import LOG
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{CONFIG.database_user}:{CONFIG.database_password}@{CONFIG.database_host}:{CONFIG.database_port}/{CONFIG.database_name}"
+SQLALCHEMY_DATABASE_URL = CONFIG.database_url or f"postgresql://{CONFIG.database_user}:{CONFIG.database_password}@{CONFIG.database_host}:{CONFIG.database_port}/{CONFIG.database_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# create_engine is lazy: no connection is opened until the first query or check_connection()
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
 
-try:
-    with engine.connect() as connection:
+
+def check_connection():
+    """Open a connection and run a trivial query; raises if the database is unreachable"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
         LOG.info("Database connection established successfully.")
-except Exception as e:
-    LOG.error(f"Database connection failed: {e}")
-    raise
\ No newline at end of file
+    except Exception as e:
+        LOG.error(f"Database connection failed: {e}")
+        raise
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query
 from modules.ORM.run_query import run_query
+from modules.data.snapshot import SALES_SNAPSHOT, SNAPSHOT_TABLES, use_snapshot
 from core.logger.logger import LOG
 import pandas as pd
 
@@ -13,12 +14,21 @@ async def get_table_stats(
 ):
     """
     Analyze a table by fetching its data and returning summary statistics.
+    In snapshot mode only the snapshot's tables (daily_sales, products, customers) can be analyzed.
     """
     LOG.info(f"Starting analysis for table: {table_name}")
     try:
-        # Query entire table
-        query = f"SELECT * FROM {table_name};"
-        df = run_query(query)
+        if use_snapshot():
+            if table_name not in SNAPSHOT_TABLES:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Table '{table_name}' is not in the sales snapshot; available: {', '.join(SNAPSHOT_TABLES)}"
+                )
+            df = SALES_SNAPSHOT.table(table_name)
+        else:
+            # Query entire table
+            query = f"SELECT * FROM {table_name};"
+            df = run_query(query)
 
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data found in table '{table_name}'")
@@ -43,6 +53,8 @@ async def get_table_stats(
             "missing_values": missing_values,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         LOG.error(f"Error analyzing table {table_name}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -54,11 +54,17 @@
 #         raise HTTPException(status_code=500, detail="Internal server error")
 
 from modules.ORM.run_query import run_query
+from modules.ORM.orm import engine
 from core.logger.logger import LOG
 import pandas as pd
+from sqlalchemy.orm import Session
+from modules.data.snapshot import SALES_SNAPSHOT, use_snapshot
 from modules.data.sql_queries.analytical_queries.monthlySales import SalesQuery
+from modules.models.modelSchema import ForecastFrequency
 from fastapi import APIRouter, HTTPException, Query
 
+session = Session(bind=engine)
+
 router = APIRouter(
     prefix="/api/v1/data_agg", tags=["data"]
 )
@@ -68,8 +74,12 @@ async def get_product_wise_monthly_sales(
     product_name: str | None = Query(default=None, description="Filter sales by product name")
 ):
     try:
-        # Run SQL query
-        df = run_query(SalesQuery.PRODUCT_WISE_MONTHLY_SALES)
+        # Monthly sales per product, from the snapshot in snapshot mode
+        if use_snapshot():
+            df = SALES_SNAPSHOT.product_wise_sales(ForecastFrequency.MONTHLY)
+        else:
+            df = run_query(SalesQuery.product_wise_sales(session, ForecastFrequency.MONTHLY).statement)
+        df = df.rename(columns={"period": "month"})
 
         if df.empty:
             raise HTTPException(status_code=404, detail="No sales data found")
@@ -118,6 +128,8 @@ async def get_product_wise_monthly_sales(
 
         return pivot_df.to_dict(orient="records")
 
+    except HTTPException:
+        raise
     except Exception as e:
         LOG.error(f"Error fetching monthly sales: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
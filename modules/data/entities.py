@@ -0,0 +1,29 @@
+from functools import lru_cache
+from fastapi import APIRouter, Query, Response
+from modules.data.entity_index import ENTITY_INDEX, EntityKind
+
+router = APIRouter(
+    prefix="/api/v1/entities", tags=["entities"]
+)
+
+
+@lru_cache(maxsize=4096)
+def _autocomplete(version: int, kind: EntityKind, query: str, limit: int) -> tuple[str, ...]:
+    # `version` is part of the cache key so a rebuilt index never serves stale names
+    return tuple(ENTITY_INDEX.get(kind).autocomplete(query, limit))
+
+
+@router.get("/autocomplete")
+def autocomplete(
+    response: Response,
+    kind: EntityKind = Query(..., description="Entity to complete: product, customer or city"),
+    q: str = Query("", description="Prefix or approximate name typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+):
+    """
+    Suggest product, customer or city names for a partial or misspelt input.
+    """
+    ENTITY_INDEX.ensure_fresh()
+    suggestions = _autocomplete(ENTITY_INDEX.version, kind, " ".join(q.split()).lower(), limit)
+    response.headers["Cache-Control"] = f"max-age={int(ENTITY_INDEX.refresh_seconds)}"
+    return {"kind": kind, "query": q, "suggestions": list(suggestions)}
@@ -0,0 +1,194 @@
+import time
+import bisect
+import threading
+from enum import Enum
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from config import CONFIG
+from core.logger.logger import LOG
+from modules.ORM.run_query import run_query
+from modules.data.sql_queries.per_tbl_query.products import ProductQuery
+from modules.data.sql_queries.per_tbl_query.customers import CustomerQuery
+from modules.data.snapshot import SALES_SNAPSHOT, use_snapshot
+
+
+class EntityKind(str, Enum):
+    PRODUCT = "product"
+    CUSTOMER = "customer"
+    CITY = "city"
+
+
+def normalize_name(name: str) -> str:
+    """Case and whitespace insensitive form used for every name comparison"""
+    return " ".join(str(name).split()).lower()
+
+
+def _trigrams(name: str) -> set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class ResolvedEntity:
+    kind: EntityKind
+    name: str           # Display name as stored in the database
+    keys: tuple         # Values to filter the sales queries on (ids, or city names)
+
+
+class NameIndex:
+    """
+    Exact lookup of normalised names plus trigram-based fuzzy suggestions for one
+    entity kind. Several database rows can share a normalised name, so each name
+    maps to all of their keys.
+    """
+
+    def __init__(self, kind: EntityKind):
+        self.kind = kind
+        self._entries: dict[str, ResolvedEntity] = {}
+        self._sorted: list[str] = []
+        self._postings: dict[str, set[str]] = {}
+
+    def build(self, rows: Iterable[tuple[str, object]]):
+        grouped: dict[str, tuple[str, list]] = {}
+        for name, key in rows:
+            if name is None or key is None:
+                continue
+            norm = normalize_name(name)
+            if not norm:
+                continue
+            display, keys = grouped.setdefault(norm, (str(name).strip(), []))
+            keys.append(key)
+
+        entries = {norm: ResolvedEntity(self.kind, display, tuple(keys)) for norm, (display, keys) in grouped.items()}
+        postings: dict[str, set[str]] = {}
+        for norm in entries:
+            for gram in _trigrams(norm):
+                postings.setdefault(gram, set()).add(norm)
+
+        # Swap in complete structures so readers never see a half-built index
+        self._entries, self._sorted, self._postings = entries, sorted(entries), postings
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, name: str) -> Optional[ResolvedEntity]:
+        return self._entries.get(normalize_name(name))
+
+    def suggest(self, name: str, limit: int = 5, min_score: float = 0.2) -> list[str]:
+        """Closest names by trigram Jaccard similarity"""
+        query = normalize_name(name)
+        grams = _trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for norm, common in shared.items():
+            score = common / (len(grams) + len(_trigrams(norm)) - common)
+            if score >= min_score:
+                scored.append((score, norm))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self._entries[norm].name for _, norm in scored[:limit]]
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> list[str]:
+        """Names starting with the prefix, then fuzzy matches to fill up the limit"""
+        query = normalize_name(prefix)
+        if not query:
+            return [self._entries[norm].name for norm in self._sorted[:limit]]
+
+        start = bisect.bisect_left(self._sorted, query)
+        matches = []
+        for norm in self._sorted[start:]:
+            if not norm.startswith(query) or len(matches) >= limit:
+                break
+            matches.append(self._entries[norm].name)
+
+        if len(matches) < limit:
+            for name in self.suggest(query, limit=limit):
+                if name not in matches:
+                    matches.append(name)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+
+class EntityIndex:
+    """
+    In-memory index of product names, customer company names and cities.
+
+    Built from the per-table queries and rebuilt when the fingerprint of the
+    products or customers table changes; the fingerprint is checked at most
+    every `entity_index_refresh_seconds`. `version` increases on every rebuild
+    so callers can key caches on it.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.version = 0
+        self._indexes = {kind: NameIndex(kind) for kind in EntityKind}
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _read_fingerprint(self) -> tuple:
+        if use_snapshot():
+            return SALES_SNAPSHOT.fingerprint(), None
+        products = run_query(ProductQuery.GET_PRODUCTS_FINGERPRINT)
+        customers = run_query(CustomerQuery.GET_CUSTOMERS_FINGERPRINT)
+        return products["fingerprint"].iloc[0], customers["fingerprint"].iloc[0]
+
+    def _rebuild(self):
+        if use_snapshot():
+            products, customers = SALES_SNAPSHOT.products(), SALES_SNAPSHOT.customers()
+        else:
+            products = run_query(ProductQuery.GET_ALL_PRODUCTS)
+            customers = run_query(CustomerQuery.GET_ALL_CUSTOMERS)
+
+        # tolist() gives plain Python values the DB driver can bind
+        self._indexes[EntityKind.PRODUCT].build(zip(products["product_name"].tolist(), products["product_id"].tolist()))
+        self._indexes[EntityKind.CUSTOMER].build(zip(customers["company_name"].tolist(), customers["customer_id"].tolist()))
+        self._indexes[EntityKind.CITY].build(zip(customers["city"].tolist(), customers["city"].tolist()))
+        self.version += 1
+        LOG.info(
+            f"Entity index rebuilt (v{self.version}): {len(self._indexes[EntityKind.PRODUCT])} products, "
+            f"{len(self._indexes[EntityKind.CUSTOMER])} customers, {len(self._indexes[EntityKind.CITY])} cities"
+        )
+
+    def ensure_fresh(self, force: bool = False):
+        if not force and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return
+            fingerprint = self._read_fingerprint()
+            if force or fingerprint != self._fingerprint:
+                self._rebuild()
+                self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a fingerprint check on the next access"""
+        self._checked_at = float("-inf")
+
+    def get(self, kind: EntityKind) -> NameIndex:
+        self.ensure_fresh()
+        return self._indexes[kind]
+
+    def resolve(self, kind: EntityKind, name: str) -> ResolvedEntity:
+        """Resolve a user supplied name, raising 404 with suggestions when it is unknown"""
+        index = self.get(kind)
+        entity = index.lookup(name)
+        if entity is None:
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "message": f"Unknown {kind.value} '{name}'",
+                    "suggestions": index.suggest(name),
+                },
+            )
+        return entity
+
+
+ENTITY_INDEX = EntityIndex(refresh_seconds=CONFIG.entity_index_refresh_seconds)
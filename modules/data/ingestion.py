@@ -0,0 +1,221 @@
+import time
+import asyncio
+import threading
+import pandas as pd
+from typing import Callable, Optional
+from datetime import datetime, timedelta
+from collections import deque
+from sqlalchemy import bindparam, text
+from config import CONFIG
+from core.logger.logger import LOG
+from modules.ORM.orm import engine
+from modules.data.entity_index import normalize_name
+from modules.data.snapshot import use_snapshot
+
+# (order_date, order_id) of the newest order already accounted for
+Watermark = tuple[datetime, int]
+
+LATEST_ORDER = """
+    SELECT order_date, order_id FROM orders
+    WHERE order_date IS NOT NULL
+    ORDER BY order_date DESC, order_id DESC
+    LIMIT 1;
+"""
+
+# Orders dated in the window that is read again on every poll
+RECENT_ORDERS = """
+    SELECT order_id, order_date FROM orders
+    WHERE order_date >= :since
+    ORDER BY order_date, order_id;
+"""
+
+# Lines of the given orders with everything the sales aggregates group by
+ORDER_LINES = text("""
+    SELECT o.order_id, o.order_date, o.customer_id, c.company_name, c.city,
+           od.product_id, p.product_name,
+           od.unit_price * od.quantity * (1 - od.discount) AS total_sales
+    FROM orders o
+    JOIN order_details od ON od.order_id = o.order_id
+    LEFT JOIN customers c ON c.customer_id = o.customer_id
+    JOIN products p ON p.product_id = od.product_id
+    WHERE o.order_id IN :order_ids
+    ORDER BY o.order_date, o.order_id;
+""").bindparams(bindparam("order_ids", expanding=True))
+
+
+def after(rows: pd.DataFrame, watermark: Watermark) -> pd.Series:
+    """Mask of the rows newer than the watermark"""
+    order_date, order_id = watermark
+    return (rows["order_date"] > order_date) | ((rows["order_date"] == order_date) & (rows["order_id"] > order_id))
+
+
+class OrderIngestor:
+    """
+    Follows new orders by their (order_date, order_id) watermark instead of
+    re-reading the order history.
+
+    Every `poll_seconds` the lines of orders not seen before are fetched and
+    kept in a buffer of at most `buffer_rows` lines; forecasts of the products,
+    customers and cities they touch are dropped from the forecast store. Cached
+    aggregates remember the watermark they were read at and merge the buffered
+    lines past it (see `lines_since`) instead of being queried again.
+
+    Order ids are not assigned in commit order, so orders dated up to
+    `overlap_seconds` before the watermark are read again and those already
+    seen are skipped by order_id. An order committed later than that, or
+    dated further back, is only counted once its series is read again.
+    """
+
+    def __init__(self, poll_seconds: float, batch_orders: int, buffer_rows: int, overlap_seconds: float):
+        self.poll_seconds = poll_seconds
+        self.batch_orders = batch_orders
+        self.buffer_rows = buffer_rows
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.watermark: Optional[Watermark] = None
+        self._seen: dict[int, datetime] = {}   # order_id -> order_date of the orders in the overlap window
+        self._buffer: deque[pd.DataFrame] = deque()
+        self._buffered = 0
+        self._buffer_start: Optional[Watermark] = None   # Lines at or before this were dropped from the buffer
+        self._listeners: list[Callable[[pd.DataFrame], None]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.polls = 0
+        self.ingested_orders = 0
+        self.late_orders = 0
+        self.ingested_lines = 0
+        self.last_poll_seconds = None
+
+    @property
+    def enabled(self) -> bool:
+        # A snapshot does not change, so there is nothing to follow
+        return self.poll_seconds > 0 and not use_snapshot()
+
+    def on_new_lines(self, listener: Callable[[pd.DataFrame], None]):
+        """Call `listener` with every batch of new order lines"""
+        self._listeners.append(listener)
+
+    def _read_latest(self) -> Optional[Watermark]:
+        with engine.connect() as connection:
+            row = connection.execute(text(LATEST_ORDER)).first()
+        return (pd.Timestamp(row.order_date).to_pydatetime(), int(row.order_id)) if row else None
+
+    def _read_recent(self, since: datetime) -> dict[int, datetime]:
+        """order_id -> order_date of the orders dated from `since` on, oldest first"""
+        with engine.connect() as connection:
+            rows = connection.execute(text(RECENT_ORDERS), {"since": since}).all()
+        return {int(row.order_id): pd.Timestamp(row.order_date).to_pydatetime() for row in rows}
+
+    def _read_lines(self, order_ids: list[int]) -> pd.DataFrame:
+        with engine.connect() as connection:
+            return pd.read_sql_query(ORDER_LINES, connection, params={"order_ids": order_ids})
+
+    def poll(self) -> int:
+        """Fetch the lines of orders not seen yet and advance the watermark; returns how many lines arrived"""
+        start = time.perf_counter()
+        with self._lock:
+            if self.watermark is None:
+                # Everything up to now is read by the full queries
+                self.watermark = self._read_latest()
+                self._buffer_start = self.watermark
+                if self.watermark is not None:
+                    self._seen = self._read_recent(self.watermark[0] - self.overlap)
+                return 0
+
+            recent = self._read_recent(self.watermark[0] - self.overlap)
+            new_ids = [order_id for order_id in recent if order_id not in self._seen][:self.batch_orders]
+            lines = self._read_lines(new_ids) if new_ids else pd.DataFrame()
+            self.polls += 1
+            if lines.empty:
+                return 0
+
+            lines["order_date"] = pd.to_datetime(lines["order_date"])
+            late = ~after(lines, self.watermark)
+            last = lines.iloc[-1]
+            self.watermark = max(self.watermark, (last["order_date"].to_pydatetime(), int(last["order_id"])))
+            # Only the orders still inside the window can turn up again
+            self._seen.update((order_id, recent[order_id]) for order_id in new_ids)
+            since = self.watermark[0] - self.overlap
+            self._seen = {order_id: order_date for order_id, order_date in self._seen.items() if order_date >= since}
+
+            self._buffer.append(lines)
+            self._buffered += len(lines)
+            while self._buffered > self.buffer_rows and len(self._buffer) > 1:
+                dropped = self._buffer.popleft()
+                self._buffered -= len(dropped)
+                last_dropped = dropped.iloc[-1]
+                self._buffer_start = max(self._buffer_start, (last_dropped["order_date"].to_pydatetime(), int(last_dropped["order_id"])))
+
+            self.ingested_orders += lines["order_id"].nunique()
+            self.ingested_lines += len(lines)
+            self.late_orders += lines.loc[late, "order_id"].nunique()
+            self.last_poll_seconds = round(time.perf_counter() - start, 3)
+
+        LOG.info(f"Ingested {lines['order_id'].nunique()} new orders ({len(lines)} lines, {late.sum()} behind the watermark) "
+                 f"up to order {self.watermark[1]}")
+        for listener in self._listeners:
+            try:
+                listener(lines)
+            except Exception as e:
+                LOG.error(f"New order listener failed: {e}")
+        return len(lines)
+
+    def lines_since(self, watermark: Watermark) -> tuple[Optional[pd.DataFrame], Optional[Watermark]]:
+        """
+        Buffered lines past `watermark` and the watermark they reach; no lines
+        (None) when the buffer no longer reaches back that far
+        """
+        with self._lock:
+            current = self.watermark
+            if self._buffer_start is None or watermark < self._buffer_start:
+                return None, current
+            if watermark >= current:
+                return pd.DataFrame(), current
+            lines = pd.concat(self._buffer, ignore_index=True)
+        return lines[after(lines, watermark)], current
+
+    async def poll_forever(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                LOG.error(f"Order ingestion failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.poll_forever())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "watermark": {"order_date": self.watermark[0], "order_id": self.watermark[1]} if self.watermark else None,
+            "polls": self.polls,
+            "ingested_orders": self.ingested_orders,
+            "ingested_lines": self.ingested_lines,
+            "late_orders": self.late_orders,
+            "buffered_lines": self._buffered,
+            "last_poll_seconds": self.last_poll_seconds,
+        }
+
+
+def affected_names(lines: pd.DataFrame) -> dict[str, set[str]]:
+    """Normalized product, customer and city names that new order lines add sales to"""
+    return {
+        "product": {normalize_name(name) for name in lines["product_name"].dropna().unique()},
+        "customer": {normalize_name(name) for name in lines["company_name"].dropna().unique()},
+        "city": {normalize_name(name) for name in lines["city"].dropna().unique()},
+    }
+
+
+ORDER_INGESTOR = OrderIngestor(
+    poll_seconds=CONFIG.order_ingest_poll_seconds,
+    batch_orders=CONFIG.order_ingest_batch_orders,
+    buffer_rows=CONFIG.order_ingest_buffer_rows,
+    overlap_seconds=CONFIG.order_ingest_overlap_seconds,
+)
@@ -0,0 +1,229 @@
+"""
+Materialized views of daily sales and the indexes behind them, created and
+refreshed by the app.
+
+    python -m modules.data.sales_views setup     # create missing indexes and views (idempotent)
+    python -m modules.data.sales_views refresh   # refresh the views without blocking readers
+    python -m modules.data.sales_views status
+"""
+import sys
+import time
+import asyncio
+import argparse
+from typing import Callable, Optional
+from sqlalchemy import Table, Column, MetaData, Integer, String, Float, DateTime, text
+from config import CONFIG
+from core.logger.logger import LOG
+from modules.ORM.orm import engine
+
+# Serialises setup and refresh across the workers (and CLI runs) sharing the database
+ADVISORY_LOCK_ID = 720_431_042
+
+# Base table indexes used by the view definitions and by the live queries when the views are missing
+BASE_INDEXES = {
+    "ix_orders_order_date": "orders (order_date)",
+    "ix_orders_customer_id": "orders (customer_id)",
+    "ix_order_details_product_id": "order_details (product_id)",
+}
+
+_LINE_TOTAL = "od.unit_price * od.quantity * (1 - od.discount)"
+
+# Name -> (definition, unique key for concurrent refresh, lookup column).
+# sales_day is a timestamp without time zone like orders.order_date, so date_trunc over it
+# returns the same periods as the live queries.
+VIEWS = {
+    "mv_daily_sales": (
+        f"""SELECT date_trunc('day', o.order_date) AS sales_day, o.customer_id, od.product_id,
+                   SUM({_LINE_TOTAL}) AS total_sales
+            FROM orders o JOIN order_details od ON od.order_id = o.order_id
+            WHERE o.order_date IS NOT NULL
+            GROUP BY 1, 2, 3""",
+        "sales_day, customer_id, product_id",
+        "customer_id, product_id",
+    ),
+    "mv_product_daily_sales": (
+        f"""SELECT date_trunc('day', o.order_date) AS sales_day, od.product_id,
+                   SUM({_LINE_TOTAL}) AS total_sales
+            FROM orders o JOIN order_details od ON od.order_id = o.order_id
+            WHERE o.order_date IS NOT NULL
+            GROUP BY 1, 2""",
+        "sales_day, product_id",
+        "product_id",
+    ),
+    "mv_customer_daily_sales": (
+        f"""SELECT date_trunc('day', o.order_date) AS sales_day, o.customer_id,
+                   SUM({_LINE_TOTAL}) AS total_sales
+            FROM orders o JOIN order_details od ON od.order_id = o.order_id
+            WHERE o.order_date IS NOT NULL AND o.customer_id IS NOT NULL
+            GROUP BY 1, 2""",
+        "sales_day, customer_id",
+        "customer_id",
+    ),
+    # Orders of customers without a city are kept in one NULL city group per day
+    "mv_city_daily_sales": (
+        f"""SELECT date_trunc('day', o.order_date) AS sales_day, c.city,
+                   SUM({_LINE_TOTAL}) AS total_sales
+            FROM orders o
+            JOIN order_details od ON od.order_id = o.order_id
+            JOIN customers c ON c.customer_id = o.customer_id
+            WHERE o.order_date IS NOT NULL
+            GROUP BY 1, 2""",
+        "sales_day, city",
+        "city",
+    ),
+}
+
+# Table objects for SalesQuery; kept out of the ORM metadata so create_all never touches them
+_metadata = MetaData()
+daily_sales = Table(
+    "mv_daily_sales", _metadata,
+    Column("sales_day", DateTime), Column("customer_id", String), Column("product_id", Integer), Column("total_sales", Float),
+)
+product_daily_sales = Table(
+    "mv_product_daily_sales", _metadata,
+    Column("sales_day", DateTime), Column("product_id", Integer), Column("total_sales", Float),
+)
+customer_daily_sales = Table(
+    "mv_customer_daily_sales", _metadata,
+    Column("sales_day", DateTime), Column("customer_id", String), Column("total_sales", Float),
+)
+city_daily_sales = Table(
+    "mv_city_daily_sales", _metadata,
+    Column("sales_day", DateTime), Column("city", String), Column("total_sales", Float),
+)
+
+
+class SalesViews:
+    """
+    Creates the daily sales views and their indexes, tracks whether they can be
+    read, and refreshes them every `refresh_seconds` with
+    REFRESH MATERIALIZED VIEW CONCURRENTLY so forecasts keep reading the
+    previous contents meanwhile. Only one worker refreshes at a time.
+    Listeners registered with `on_refresh` run after each refresh.
+    """
+
+    def __init__(self, enabled: bool, refresh_seconds: float):
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self.available = False
+        self._listeners: list[Callable[[float], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.skipped_refreshes = 0
+        self.failed_refreshes = 0
+        self.last_refresh_seconds = None
+        self.last_refresh_finished_at = None
+
+    def on_refresh(self, listener: Callable[[float], None]):
+        """Call `listener` with the time.time() a refresh started once it has finished"""
+        self._listeners.append(listener)
+
+    def setup(self):
+        """Create whatever indexes and views are missing; safe to run repeatedly and from several workers"""
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            for name, target in BASE_INDEXES.items():
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+            for name, (definition, unique_key, lookup) in VIEWS.items():
+                connection.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {definition}"))
+                # Concurrent refresh needs a unique index over plain columns
+                connection.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_key ON {name} ({unique_key})"))
+                connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name}_lookup ON {name} ({lookup})"))
+        LOG.info(f"Sales views set up in {time.perf_counter() - start:.2f} s")
+        self.detect()
+
+    def detect(self) -> bool:
+        """Check which views exist and hold data; SalesQuery reads the views only when all of them do"""
+        with engine.connect() as connection:
+            populated = {
+                row.matviewname for row in connection.execute(
+                    text("SELECT matviewname FROM pg_matviews WHERE ispopulated AND matviewname = ANY(:names)"),
+                    {"names": list(VIEWS)},
+                )
+            }
+        self.available = self.enabled and populated == set(VIEWS)
+        LOG.info(f"Sales views {'in use' if self.available else 'not in use'} ({len(populated)} of {len(VIEWS)} present)")
+        return self.available
+
+    def refresh(self) -> bool:
+        """Refresh every view unless another worker is already doing it; returns whether this call refreshed"""
+        started_at = time.time()
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            if not connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar():
+                self.skipped_refreshes += 1
+                return False
+            try:
+                for name in VIEWS:
+                    connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+                    connection.commit()
+            finally:
+                # The lock belongs to the session, so it survives rolling back a failed refresh
+                connection.rollback()
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                connection.commit()
+
+        self.refreshes += 1
+        self.last_refresh_seconds = round(time.perf_counter() - start, 2)
+        self.last_refresh_finished_at = time.time()
+        LOG.info(f"Refreshed {len(VIEWS)} sales views in {self.last_refresh_seconds} s")
+        for listener in self._listeners:
+            try:
+                listener(started_at)
+            except Exception as e:
+                LOG.error(f"Sales view refresh listener failed: {e}")
+        return True
+
+    async def refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                if self.available:
+                    await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                self.failed_refreshes += 1
+                LOG.error(f"Sales view refresh failed: {e}")
+
+    def start(self):
+        if self.enabled and self.refresh_seconds > 0 and self._task is None and CONFIG.data_source != "snapshot":
+            self._task = asyncio.create_task(self.refresh_forever())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "available": self.available,
+            "refresh_seconds": self.refresh_seconds,
+            "refreshes": self.refreshes,
+            "skipped_refreshes": self.skipped_refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "last_refresh_finished_at": self.last_refresh_finished_at,
+        }
+
+
+SALES_VIEWS = SalesViews(enabled=CONFIG.sales_views_enabled, refresh_seconds=CONFIG.sales_views_refresh_seconds)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage the daily sales materialized views")
+    parser.add_argument("command", choices=["setup", "refresh", "status"])
+    args = parser.parse_args(argv)
+
+    if args.command == "setup":
+        SALES_VIEWS.setup()
+    else:
+        if args.command == "refresh" and not SALES_VIEWS.refresh():
+            print("Another process is refreshing the views")
+        SALES_VIEWS.detect()
+    print(f"Sales views {'available' if SALES_VIEWS.available else 'not available'}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,293 @@
+"""
+Local snapshot of the daily sales facts (an uncompressed Arrow IPC file that
+workers memory-map), products and customers (Parquet).
+
+    python -m modules.data.snapshot export   # write a fresh snapshot from Postgres
+    python -m modules.data.snapshot status
+
+With data_source=snapshot the workers read sales aggregates, entity names and
+table stats from the snapshot and never connect to Postgres.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import threading
+import pandas as pd
+from typing import Callable, Optional
+from datetime import datetime, timezone
+from config import CONFIG
+from core.logger.logger import LOG
+from modules.models.modelSchema import ForecastFrequency
+
+# Sales per day, customer and product with the names the aggregates group by
+DAILY_SALES_FACTS = """
+    SELECT date_trunc('day', o.order_date) AS sales_day,
+           o.customer_id, c.company_name, c.city,
+           od.product_id, p.product_name,
+           SUM(od.unit_price * od.quantity * (1 - od.discount)) AS total_sales
+    FROM orders o
+    JOIN order_details od ON od.order_id = o.order_id
+    LEFT JOIN customers c ON c.customer_id = o.customer_id
+    JOIN products p ON p.product_id = od.product_id
+    WHERE o.order_date IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5, 6
+    ORDER BY 1;
+"""
+
+FACTS_FILE = "daily_sales.arrow"
+MANIFEST = "manifest.json"
+
+# Tables the snapshot holds, by the name the table stats endpoint takes
+SNAPSHOT_TABLES = ("daily_sales", "products", "customers")
+
+
+def _arrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("The sales snapshot needs pyarrow: uv sync --extra snapshot") from None
+
+
+def truncate_period(dates: pd.Series, frequency: ForecastFrequency) -> pd.Series:
+    """date_trunc of the sales queries: day, ISO week (Monday) or month"""
+    if frequency == ForecastFrequency.DAILY:
+        return dates.dt.floor("D")
+    if frequency == ForecastFrequency.WEEKLY:
+        return dates.dt.to_period("W").dt.start_time
+    return dates.dt.to_period("M").dt.start_time
+
+
+def write_snapshot(path: str, facts: pd.DataFrame, products: pd.DataFrame, customers: pd.DataFrame) -> dict:
+    """Write the facts, products and customers, then swap them in for the previous snapshot"""
+    pa = _arrow()
+    facts = facts.assign(sales_day=pd.to_datetime(facts["sales_day"]))
+
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    # Uncompressed IPC, so readers map the file and use its buffers in place instead of decoding a copy
+    table = pa.Table.from_pandas(facts, preserve_index=False)
+    with pa.OSFile(os.path.join(staging, FACTS_FILE), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    pa.parquet.write_table(pa.Table.from_pandas(products, preserve_index=False), os.path.join(staging, "products.parquet"))
+    pa.parquet.write_table(pa.Table.from_pandas(customers, preserve_index=False), os.path.join(staging, "customers.parquet"))
+
+    manifest = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "fact_rows": len(facts),
+        "first_day": facts["sales_day"].min().isoformat() if len(facts) else None,
+        "last_day": facts["sales_day"].max().isoformat() if len(facts) else None,
+        "products": len(products),
+        "customers": len(customers),
+    }
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # Readers that already mapped the old files keep them until they reload
+    previous = f"{path}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, previous)
+    os.rename(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+def export_snapshot(path: str) -> dict:
+    """Read the daily sales facts, products and customers from Postgres and write them as the snapshot"""
+    _arrow()
+    from modules.ORM.run_query import run_query
+    from modules.data.sql_queries.per_tbl_query.products import ProductQuery
+    from modules.data.sql_queries.per_tbl_query.customers import CustomerQuery
+
+    start = time.perf_counter()
+    facts = run_query(DAILY_SALES_FACTS)
+    products = run_query(ProductQuery.GET_ALL_PRODUCTS)[["product_id", "product_name"]]
+    customers = run_query(CustomerQuery.GET_ALL_CUSTOMERS)[["customer_id", "company_name", "city"]]
+    manifest = write_snapshot(path, facts, products, customers)
+
+    LOG.info(f"Exported sales snapshot of {len(facts)} daily facts to {path} in {time.perf_counter() - start:.2f} s")
+    return manifest
+
+
+class SalesSnapshot:
+    """
+    Sales aggregates and entity tables served from the local snapshot.
+
+    The fact file is memory-mapped as one Arrow table on first use, so the
+    workers of a host share the page cache rather than each holding a copy;
+    each aggregate filters it with Arrow compute and only converts the
+    matching rows to pandas. Methods mirror SalesQuery and return the same columns, so the
+    forecast pipeline reads either source the same way.
+
+    Every read checks the manifest, and a newly exported snapshot is loaded in
+    place of the old one; listeners registered with `on_reload` run after that.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._facts = None
+        self._products: Optional[pd.DataFrame] = None
+        self._customers: Optional[pd.DataFrame] = None
+        self.manifest: Optional[dict] = None
+        self._version = None   # (inode, mtime) of the loaded manifest
+        self._listeners: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.reads = 0
+        self.reloads = 0
+
+    def on_reload(self, listener: Callable[[], None]):
+        """Call `listener` whenever a new snapshot replaced the loaded one"""
+        self._listeners.append(listener)
+
+    def _manifest_version(self):
+        try:
+            stat = os.stat(os.path.join(self.path, MANIFEST))
+        except FileNotFoundError:
+            return None   # Between the renames of an export
+        return stat.st_ino, stat.st_mtime_ns
+
+    def load(self):
+        pa = _arrow()
+        with self._lock:
+            start = time.perf_counter()
+            version = self._manifest_version()
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+            # Zero-copy: the table's buffers point into the mapped file
+            facts = pa.ipc.open_file(pa.memory_map(os.path.join(self.path, FACTS_FILE))).read_all()
+            products = pa.parquet.read_table(os.path.join(self.path, "products.parquet"), memory_map=True).to_pandas()
+            customers = pa.parquet.read_table(os.path.join(self.path, "customers.parquet"), memory_map=True).to_pandas()
+            reloaded = self._facts is not None
+            self._facts, self._products, self._customers = facts, products, customers
+            self.manifest, self._version = manifest, version
+            self.load_seconds = round(time.perf_counter() - start, 3)
+        LOG.info(f"Loaded sales snapshot from {manifest['created_at']}: {facts.num_rows} daily facts in {self.load_seconds} s")
+        if reloaded:
+            self.reloads += 1
+            for listener in self._listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    LOG.error(f"Sales snapshot reload listener failed: {e}")
+
+    def _ensure_loaded(self):
+        if self._facts is None:
+            self.load()
+            return
+        version = self._manifest_version()
+        if version is not None and version != self._version:
+            try:
+                self.load()
+            except Exception as e:
+                # An export still in progress; keep serving the loaded snapshot and try again on the next read
+                LOG.warning(f"Could not load the new sales snapshot yet: {e}")
+
+    def products(self) -> pd.DataFrame:
+        self._ensure_loaded()
+        return self._products
+
+    def customers(self) -> pd.DataFrame:
+        self._ensure_loaded()
+        return self._customers
+
+    def fingerprint(self) -> str:
+        """Changes with every exported snapshot; stands in for the tables' fingerprints"""
+        self._ensure_loaded()
+        return self.manifest["created_at"]
+
+    def table(self, name: str) -> pd.DataFrame:
+        """One of SNAPSHOT_TABLES as a DataFrame"""
+        self._ensure_loaded()
+        if name == "daily_sales":
+            return self._facts.to_pandas()
+        return self._products if name == "products" else self._customers
+
+    def _facts_where(self, columns: list[str], with_customer: bool = False, **filters) -> pd.DataFrame:
+        pa = _arrow()
+        self._ensure_loaded()
+        self.reads += 1
+        mask = None
+        for column, values in filters.items():
+            if values is None:
+                continue
+            condition = pa.compute.is_in(self._facts[column], value_set=pa.array(list(values)))
+            mask = condition if mask is None else pa.compute.and_(mask, condition)
+        if with_customer:
+            condition = pa.compute.is_valid(self._facts["customer_id"])
+            mask = condition if mask is None else pa.compute.and_(mask, condition)
+        table = self._facts if mask is None else self._facts.filter(mask)
+        return table.select(columns + ["sales_day", "total_sales"]).to_pandas()
+
+    @staticmethod
+    def _aggregate(facts: pd.DataFrame, group_columns: list[str], frequency: ForecastFrequency, ordered: bool = True) -> pd.DataFrame:
+        facts = facts.assign(period=truncate_period(facts["sales_day"], frequency))
+        df = facts.groupby(group_columns + ["period"], as_index=False, dropna=False)["total_sales"].sum()
+        if ordered:
+            df = df.sort_values(["period"] + group_columns, ignore_index=True)
+        return df
+
+    def product_wise_sales(self, frequency: ForecastFrequency = ForecastFrequency.MONTHLY, product_ids=None) -> pd.DataFrame:
+        facts = self._facts_where(["product_name"], product_id=product_ids)
+        return self._aggregate(facts, ["product_name"], frequency)
+
+    def customer_wise_sales(self, frequency: ForecastFrequency = ForecastFrequency.MONTHLY, customer_ids=None) -> pd.DataFrame:
+        facts = self._facts_where(["company_name"], with_customer=True, customer_id=customer_ids)
+        return self._aggregate(facts, ["company_name"], frequency)
+
+    def customer_product_wise_sales(self, frequency: ForecastFrequency = ForecastFrequency.MONTHLY, customer_ids=None, product_ids=None) -> pd.DataFrame:
+        facts = self._facts_where(["company_name", "product_name"], with_customer=True, customer_id=customer_ids, product_id=product_ids)
+        return self._aggregate(facts, ["company_name", "product_name"], frequency)
+
+    def city_wise_sales(self, frequency: ForecastFrequency = ForecastFrequency.MONTHLY, cities=None) -> pd.DataFrame:
+        facts = self._facts_where(["city"], with_customer=True, city=cities)
+        return self._aggregate(facts, ["city"], frequency)
+
+    def hierarchy_sales(self, frequency: ForecastFrequency = ForecastFrequency.MONTHLY, cities=None) -> pd.DataFrame:
+        facts = self._facts_where(["city", "company_name", "product_name"], with_customer=True, city=cities)
+        return self._aggregate(facts, ["city", "company_name", "product_name"], frequency, ordered=False)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": use_snapshot(),
+            "path": self.path,
+            "loaded": self._facts is not None,
+            "manifest": self.manifest,
+            "load_seconds": self.load_seconds,
+            "reads": self.reads,
+            "reloads": self.reloads,
+        }
+
+
+SALES_SNAPSHOT = SalesSnapshot(CONFIG.snapshot_path)
+
+
+def use_snapshot() -> bool:
+    """Whether this worker serves from the snapshot instead of Postgres"""
+    return CONFIG.data_source == "snapshot"
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Manage the local sales snapshot")
+    parser.add_argument("command", choices=["export", "status"])
+    parser.add_argument("--path", default=CONFIG.snapshot_path, help="Snapshot directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(json.dumps(export_snapshot(args.path), indent=2))
+    else:
+        snapshot = SalesSnapshot(args.path)
+        snapshot.load()
+        print(json.dumps(snapshot.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
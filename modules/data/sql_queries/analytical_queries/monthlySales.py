@@ -4,8 +4,9 @@ from modules.ORM.models import Order, OrderDetail, Product, Customer
 from modules.models.modelSchema import ForecastFrequency
 from modules.ORM.orm import engine
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 from core.logger.logger import LOG
+from modules.data.sales_views import SALES_VIEWS, daily_sales, product_daily_sales, customer_daily_sales, city_daily_sales
 
 session = Session(bind=engine)
 
@@ -21,10 +22,17 @@ class SalesQuery:
         return freq_map.get(frequency,"month")
 
     @staticmethod
-    def product_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY):
+    def _until(query, until):
+        """Only orders up to an (order_date, order_id) watermark, see modules/data/ingestion.py"""
+        return query.filter(tuple_(Order.order_date, Order.order_id) <= until)
+
+    @staticmethod
+    def product_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY,product_ids = None,until = None):
         LOG.info(f"frequency selected query {frequency}")
         trunc_period = SalesQuery._get_trunc_period(frequency)
-        return (
+        if SALES_VIEWS.available:
+            return SalesQuery._product_view_sales(session, trunc_period, product_ids)
+        query = (
             session.query(
                 Product.product_name,
                 func.date_trunc(trunc_period, Order.order_date).label("period"),
@@ -37,12 +45,19 @@ class SalesQuery:
             .group_by(Product.product_name, func.date_trunc(trunc_period, Order.order_date))
             .order_by(func.date_trunc(trunc_period, Order.order_date), Product.product_name)
         )
+        if product_ids is not None:
+            query = query.filter(Product.product_id.in_(product_ids))
+        if until is not None:
+            query = SalesQuery._until(query, until)
+        return query
 
     @staticmethod
-    def customer_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY):
+    def customer_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY,customer_ids = None,until = None):
         trunc_period = SalesQuery._get_trunc_period(frequency)
+        if SALES_VIEWS.available:
+            return SalesQuery._customer_view_sales(session, trunc_period, customer_ids)
 
-        return (
+        query = (
             session.query(
                 Customer.company_name,
                 func.date_trunc(trunc_period, Order.order_date).label("period"),
@@ -55,11 +70,18 @@ class SalesQuery:
             .group_by(Customer.company_name, func.date_trunc(trunc_period, Order.order_date))
             .order_by(func.date_trunc(trunc_period, Order.order_date), Customer.company_name)
         )
+        if customer_ids is not None:
+            query = query.filter(Customer.customer_id.in_(customer_ids))
+        if until is not None:
+            query = SalesQuery._until(query, until)
+        return query
 
     @staticmethod
-    def customer_product_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY):
+    def customer_product_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY,customer_ids = None,product_ids = None,until = None):
         trunc_period = SalesQuery._get_trunc_period(frequency)
-        return (
+        if SALES_VIEWS.available:
+            return SalesQuery._customer_product_view_sales(session, trunc_period, customer_ids, product_ids)
+        query = (
             session.query(
                 Customer.company_name,
                 Product.product_name,
@@ -74,11 +96,20 @@ class SalesQuery:
             .group_by(Customer.company_name, Product.product_name, func.date_trunc(trunc_period, Order.order_date))
             .order_by(func.date_trunc(trunc_period, Order.order_date), Customer.company_name, Product.product_name)
         )
+        if customer_ids is not None:
+            query = query.filter(Customer.customer_id.in_(customer_ids))
+        if product_ids is not None:
+            query = query.filter(Product.product_id.in_(product_ids))
+        if until is not None:
+            query = SalesQuery._until(query, until)
+        return query
     
     @staticmethod
-    def city_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY):
+    def city_wise_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY,cities = None,until = None):
         trunc_period = SalesQuery._get_trunc_period(frequency)
-        return (
+        if SALES_VIEWS.available:
+            return SalesQuery._city_view_sales(session, trunc_period, cities)
+        query = (
             session.query(
                 Customer.city,
                 func.date_trunc(trunc_period, Order.order_date).label("period"),
@@ -90,4 +121,107 @@ class SalesQuery:
             .join(OrderDetail, OrderDetail.order_id == Order.order_id)
             .group_by(Customer.city, func.date_trunc(trunc_period, Order.order_date))
             .order_by(func.date_trunc(trunc_period, Order.order_date), Customer.city)
-        )
\ No newline at end of file
+        )
+        if cities is not None:
+            query = query.filter(Customer.city.in_(cities))
+        if until is not None:
+            query = SalesQuery._until(query, until)
+        return query
+
+    @staticmethod
+    def hierarchy_sales(session,frequency:ForecastFrequency = ForecastFrequency.MONTHLY,cities = None,until = None):
+        """Sales at the finest level of the city > customer > product hierarchy in one query"""
+        trunc_period = SalesQuery._get_trunc_period(frequency)
+        if SALES_VIEWS.available:
+            return SalesQuery._hierarchy_view_sales(session, trunc_period, cities)
+        query = (
+            session.query(
+                Customer.city,
+                Customer.company_name,
+                Product.product_name,
+                func.date_trunc(trunc_period, Order.order_date).label("period"),
+                func.sum(
+                    OrderDetail.unit_price * OrderDetail.quantity * (1 - OrderDetail.discount)
+                ).label("total_sales")
+            )
+            .join(Order, Order.customer_id == Customer.customer_id)
+            .join(OrderDetail, OrderDetail.order_id == Order.order_id)
+            .join(Product, Product.product_id == OrderDetail.product_id)
+            .group_by(Customer.city, Customer.company_name, Product.product_name, func.date_trunc(trunc_period, Order.order_date))
+        )
+        if cities is not None:
+            query = query.filter(Customer.city.in_(cities))
+        if until is not None:
+            query = SalesQuery._until(query, until)
+        return query
+
+    # Same result columns and order as above, read from the daily sales views (modules/data/sales_views.py)
+
+    @staticmethod
+    def _product_view_sales(session, trunc_period, product_ids):
+        period = func.date_trunc(trunc_period, product_daily_sales.c.sales_day)
+        query = (
+            session.query(Product.product_name, period.label("period"), func.sum(product_daily_sales.c.total_sales).label("total_sales"))
+            .join(product_daily_sales, product_daily_sales.c.product_id == Product.product_id)
+            .group_by(Product.product_name, period)
+            .order_by(period, Product.product_name)
+        )
+        if product_ids is not None:
+            query = query.filter(product_daily_sales.c.product_id.in_(product_ids))
+        return query
+
+    @staticmethod
+    def _customer_view_sales(session, trunc_period, customer_ids):
+        period = func.date_trunc(trunc_period, customer_daily_sales.c.sales_day)
+        query = (
+            session.query(Customer.company_name, period.label("period"), func.sum(customer_daily_sales.c.total_sales).label("total_sales"))
+            .join(customer_daily_sales, customer_daily_sales.c.customer_id == Customer.customer_id)
+            .group_by(Customer.company_name, period)
+            .order_by(period, Customer.company_name)
+        )
+        if customer_ids is not None:
+            query = query.filter(customer_daily_sales.c.customer_id.in_(customer_ids))
+        return query
+
+    @staticmethod
+    def _customer_product_view_sales(session, trunc_period, customer_ids, product_ids):
+        period = func.date_trunc(trunc_period, daily_sales.c.sales_day)
+        query = (
+            session.query(Customer.company_name, Product.product_name, period.label("period"), func.sum(daily_sales.c.total_sales).label("total_sales"))
+            .select_from(daily_sales)
+            .join(Customer, Customer.customer_id == daily_sales.c.customer_id)
+            .join(Product, Product.product_id == daily_sales.c.product_id)
+            .group_by(Customer.company_name, Product.product_name, period)
+            .order_by(period, Customer.company_name, Product.product_name)
+        )
+        if customer_ids is not None:
+            query = query.filter(daily_sales.c.customer_id.in_(customer_ids))
+        if product_ids is not None:
+            query = query.filter(daily_sales.c.product_id.in_(product_ids))
+        return query
+
+    @staticmethod
+    def _city_view_sales(session, trunc_period, cities):
+        period = func.date_trunc(trunc_period, city_daily_sales.c.sales_day)
+        query = (
+            session.query(city_daily_sales.c.city, period.label("period"), func.sum(city_daily_sales.c.total_sales).label("total_sales"))
+            .group_by(city_daily_sales.c.city, period)
+            .order_by(period, city_daily_sales.c.city)
+        )
+        if cities is not None:
+            query = query.filter(city_daily_sales.c.city.in_(cities))
+        return query
+
+    @staticmethod
+    def _hierarchy_view_sales(session, trunc_period, cities):
+        period = func.date_trunc(trunc_period, daily_sales.c.sales_day)
+        query = (
+            session.query(Customer.city, Customer.company_name, Product.product_name, period.label("period"), func.sum(daily_sales.c.total_sales).label("total_sales"))
+            .select_from(daily_sales)
+            .join(Customer, Customer.customer_id == daily_sales.c.customer_id)
+            .join(Product, Product.product_id == daily_sales.c.product_id)
+            .group_by(Customer.city, Customer.company_name, Product.product_name, period)
+        )
+        if cities is not None:
+            query = query.filter(Customer.city.in_(cities))
+        return query
@@ -6,3 +6,9 @@ class CustomerQuery:
     GET_CUSTOMER_BY_ID = """
         SELECT * FROM customers WHERE customer_id = :id;
     """
+
+    # Changes whenever a customer is added, removed, renamed or moves city
+    GET_CUSTOMERS_FINGERPRINT = """
+        SELECT md5(coalesce(string_agg(customer_id || ':' || company_name || ':' || coalesce(city, ''), ',' ORDER BY customer_id), '')) AS fingerprint
+        FROM customers;
+    """
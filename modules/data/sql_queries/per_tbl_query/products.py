@@ -10,3 +10,9 @@ class ProductQuery:
     GET_PRODUCTS_BY_CATEGORY = """
         SELECT * FROM products WHERE category_id = :category_id;
     """
+
+    # Changes whenever a product is added, removed or renamed
+    GET_PRODUCTS_FINGERPRINT = """
+        SELECT md5(coalesce(string_agg(product_id || ':' || product_name, ',' ORDER BY product_id), '')) AS fingerprint
+        FROM products;
+    """
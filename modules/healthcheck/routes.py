@@ -1,8 +1,18 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from core.warmup import WARMUP_STATE
 
 
 health_router = APIRouter()
 
 @health_router.get('/healthcheck')
 async def health_check() -> dict:
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@health_router.get('/readiness')
+async def readiness():
+    """Reports 503 until the startup warm-up (DB check, model libraries, LLM client) has completed"""
+    if WARMUP_STATE["ready"]:
+        return {"status": "ready", **WARMUP_STATE}
+    status = "failed" if WARMUP_STATE["finished_at"] else "warming_up"
+    return JSONResponse(status_code=503, content={"status": status, **WARMUP_STATE})
@@ -1,10 +1,12 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, Query
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Query, Request, HTTPException
+from fastapi.responses import HTMLResponse, FileResponse
 
 
 from core.logger.log_viewer_service import read_log_file
+from core.utils.profiler import REQUEST_PROFILER, has_api_key
 
 
 
@@ -15,30 +17,78 @@ class LogData(BaseModel):
     columns: list[str]
     logs: list[dict]
     date: datetime
+    total: int
+    offset: int
+    limit: int
 
 
 @log_router.get("/logs/data")
-def logs_data(date: str = Query("today", description="Date in YYYY-MM-DD format or 'today'")) -> LogData:
-    
-    logs, date = read_log_file(date)
-
-    all_keys = set()
-    for log in logs:
-        all_keys.update(log.keys())
-    columns = sorted(list(all_keys))  # Sort headers for consistency
-    
+def logs_data(
+    date: str = Query("today", description="Date in YYYYMMDD format or 'today'"),
+    level: Optional[str] = Query(None, description="Comma separated log levels, e.g. 'ERROR,WARNING'"),
+    module: Optional[str] = Query(None, description="Only entries logged from this module"),
+    start: Optional[datetime] = Query(None, description="Only entries at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only entries at or before this time"),
+    offset: int = Query(0, ge=0, description="Number of matching entries to skip"),
+    limit: int = Query(500, ge=1, le=10000, description="Maximum number of entries to return"),
+    tail: bool = Query(False, description="Page from the newest entries backwards"),
+) -> LogData:
+
+    logs, columns, total, date = read_log_file(
+        date, level=level, module=module, start=start, end=end,
+        offset=offset, limit=limit, tail=tail,
+    )
+
     if date == "today":
         log_date = datetime.today().strftime("%Y-%m-%d")
     else:
         log_date = date  # Already in YYYY-MM-DD format
-    
-    return LogData(columns=columns, logs=logs, date=log_date)
-    
+
+    return LogData(columns=columns, logs=logs, date=log_date, total=total, offset=offset, limit=limit)
+
 
 @log_router.get("/logs", response_class=HTMLResponse)
 def view_logs():
 
     with open("core/logger/log_viewer.html", 'r') as file:
         html_content = file.read()
-        
-    return HTMLResponse(content=html_content)
\ No newline at end of file
+
+    return HTMLResponse(content=html_content)
+
+
+def _require_api_key(request: Request):
+    if not has_api_key(request.headers):
+        raise HTTPException(status_code=403, detail="Profiles need a valid X-API-Key header")
+
+
+@log_router.get("/profiles")
+def list_profiles(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of profiles to return, newest first"),
+):
+    """
+    Recent request CPU profiles with their route, duration and trigger.
+    """
+    _require_api_key(request)
+    return {
+        "profiles": REQUEST_PROFILER.recent(limit),
+        "stored": REQUEST_PROFILER.stored,
+        "discarded": REQUEST_PROFILER.discarded,
+    }
+
+
+@log_router.get("/profiles/{profile_id}")
+def get_profile(
+    request: Request,
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|folded)$", description="speedscope JSON or collapsed stacks for flamegraph.pl"),
+):
+    """
+    Download a stored profile; open the speedscope file at https://www.speedscope.app.
+    """
+    _require_api_key(request)
+    suffix = ".speedscope.json" if format == "speedscope" else ".folded"
+    path = REQUEST_PROFILER.path(profile_id, suffix)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return FileResponse(path, filename=f"{profile_id}{suffix}")
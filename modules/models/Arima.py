@@ -1,15 +1,39 @@
 from core.logger.logger import LOG
 import pandas as pd
 from statsmodels.tsa.arima.model import ARIMA
-from modules.models.modelSchema import ForecastFrequency
+from modules.models.modelSchema import ForecastFrequency, QualityTier
 from core.utils.utils import evaluate_arima_model
+from modules.models.model_cache import series_fingerprint, load_model, store_model
 
-def forecast_with_arima(ts,periods_ahead,frequency:ForecastFrequency):
+# Estimator per quality tier. Hannan-Rissanen is a closed-form regression
+# estimate, an order of magnitude faster than the state space MLE.
+ARIMA_TIERS = {
+    QualityTier.FAST: dict(method="hannan_rissanen", enforce=False),
+    QualityTier.BALANCED: dict(method="statespace", enforce=True),
+    QualityTier.ACCURATE: dict(method="innovations_mle", enforce=True),
+}
+
+def fit_arima(ts,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED):
     LOG.info(f"Arima Model Selected for the frequency {frequency}")
-    model = ARIMA(ts,order=(1,1,1))
-    model_fit = model.fit()
+    settings = ARIMA_TIERS[tier]
+    # Reuse a fit of the same series from any worker
+    fingerprint = series_fingerprint(ts, "arima", (1, 1, 1), settings["method"])
+    model_fit = load_model(fingerprint)
+    if model_fit is None:
+        model = ARIMA(
+            ts,order=(1,1,1),
+            enforce_stationarity=settings["enforce"],
+            enforce_invertibility=settings["enforce"],
+        )
+        model_fit = model.fit(method=settings["method"])
+        store_model(fingerprint, model_fit)
+    return model_fit
+
+def evaluate_arima(model_fit,ts):
+    return evaluate_arima_model(model_fit,ts)
 
-    evaluation = evaluate_arima_model(model_fit,ts)
+def predict_arima(model_fit,ts,periods_ahead,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED,evaluation = None):
+    settings = ARIMA_TIERS[tier]
     forecast = model_fit.forecast(steps = periods_ahead)
 
     freq_map = {
@@ -44,11 +68,18 @@ def forecast_with_arima(ts,periods_ahead,frequency:ForecastFrequency):
         "upper_bound":None
     })
 
-    return forecast_df,evaluation,{
+    return forecast_df,{
         "model_type": "ARIMA",
         "model_order": (1, 1, 1),
+        "estimator": settings["method"],
+        "quality_tier": tier.value,
         "interval_confidence": None,
         "frequency": frequency.value,
         "data_points": len(ts)
     }
 
+def forecast_with_arima(ts,periods_ahead,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED):
+    model_fit = fit_arima(ts,frequency,tier)
+    evaluation = evaluate_arima(model_fit,ts)
+    forecast_df,model_info = predict_arima(model_fit,ts,periods_ahead,frequency,tier,evaluation)
+    return forecast_df,evaluation,model_info
@@ -1,23 +1,52 @@
 from core.logger.logger import LOG
+import copy
 import pandas as pd
 from prophet import Prophet
-from modules.models.modelSchema import ForecastFrequency
-from modules.models.modelSchema import ForecastFrequency
+from prophet.serialize import model_to_json, model_from_json
+from modules.models.modelSchema import ForecastFrequency, QualityTier
 from core.utils.utils import evaluate_prophet_model
+from modules.models.model_cache import series_fingerprint, load_model, store_model
 
-def forecast_with_prophet(ts,period_ahead,frequency:ForecastFrequency):
+# Posterior samples drawn per forecast for the uncertainty interval; sampling
+# dominates predict time and 0 returns the point forecast without an interval
+PROPHET_TIERS = {
+    QualityTier.FAST: dict(uncertainty_samples=0),
+    QualityTier.BALANCED: dict(uncertainty_samples=300),
+    QualityTier.ACCURATE: dict(uncertainty_samples=1000),
+}
+
+def fit_prophet(ts,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED):
     LOG.info(f"Prophet model Selected for frequency {frequency}")
     prophet_df = ts.reset_index()
     prophet_df.columns = ["ds","y"]
 
-    model = Prophet(
-        interval_width=0.95,
-        daily_seasonality=(frequency == ForecastFrequency.DAILY),
-        weekly_seasonality= (frequency == ForecastFrequency.WEEKLY),
-        yearly_seasonality=True
-    )
-    model.fit(prophet_df)
+    # Prophet models are cached as JSON (the format Prophet supports for serialisation)
+    fingerprint = series_fingerprint(ts, "prophet", frequency.value, 0.95)
+    model = load_model(fingerprint, loads=model_from_json)
+    if model is None:
+        model = Prophet(
+            interval_width=0.95,
+            daily_seasonality=(frequency == ForecastFrequency.DAILY),
+            weekly_seasonality= (frequency == ForecastFrequency.WEEKLY),
+            yearly_seasonality=True
+        )
+        model.fit(prophet_df)
+        store_model(fingerprint, model, dumps=lambda m: model_to_json(m).encode())
+    # Sampling only affects predict, so one cached fit serves every tier
+    model.uncertainty_samples = PROPHET_TIERS[tier]["uncertainty_samples"]
+    return model
+
+def evaluate_prophet(model,ts):
+    prophet_df = ts.reset_index()
+    prophet_df.columns = ["ds","y"]
+    # In-sample metrics only need yhat, so skip uncertainty sampling (on a copy; the fit may be shared)
+    point_model = copy.copy(model)
+    point_model.uncertainty_samples = 0
+    fitted = point_model.predict(prophet_df[["ds"]])
+    return evaluate_prophet_model(model,fitted,prophet_df,ts)
 
+def predict_prophet(model,ts,period_ahead,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED,evaluation = None):
+    settings = PROPHET_TIERS[tier]
     freq_map = {
         ForecastFrequency.DAILY:"D",
         ForecastFrequency.WEEKLY:"W",
@@ -26,12 +55,11 @@ def forecast_with_prophet(ts,period_ahead,frequency:ForecastFrequency):
 
     freq_str = freq_map[frequency]
 
-    future = model.make_future_dataframe(periods=period_ahead,freq=freq_str)
-    forecast = model.predict(future)
-
-    future_forecast = forecast[forecast["ds"] > prophet_df["ds"].max()][["ds", "yhat", "yhat_lower", "yhat_upper"]]
-
-    evaluation = evaluate_prophet_model(model,forecast,prophet_df,ts)
+    # Only the future periods: the history is predicted (without sampling) by evaluate_prophet
+    future = model.make_future_dataframe(periods=period_ahead,freq=freq_str,include_history=False)
+    future_forecast = model.predict(future)
+    if not settings["uncertainty_samples"]:
+        future_forecast["yhat_lower"] = future_forecast["yhat_upper"] = float("nan")
 
     if frequency == ForecastFrequency.DAILY:
         date_format = "%Y-%m-%d"
@@ -50,9 +78,17 @@ def forecast_with_prophet(ts,period_ahead,frequency:ForecastFrequency):
         "upper_bound": future_forecast["yhat_upper"].round(2)
     })
         
-    return forecast_df, evaluation, {
+    return forecast_df, {
         "model_type": "Prophet",
-        "interval_confidence": "95%",
+        "interval_confidence": "95%" if settings["uncertainty_samples"] else None,
+        "uncertainty_samples": settings["uncertainty_samples"],
+        "quality_tier": tier.value,
         "frequency": frequency.value,
         "data_points": len(ts)
-    }
\ No newline at end of file
+    }
+
+def forecast_with_prophet(ts,period_ahead,frequency:ForecastFrequency,tier:QualityTier = QualityTier.BALANCED):
+    model = fit_prophet(ts,frequency,tier)
+    evaluation = evaluate_prophet(model,ts)
+    forecast_df, model_info = predict_prophet(model,ts,period_ahead,frequency,tier,evaluation)
+    return forecast_df, evaluation, model_info
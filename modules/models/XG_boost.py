@@ -1,9 +1,13 @@
 from core.logger.logger import LOG
 import pandas as pd
 import numpy as np
+from dataclasses import dataclass
 from xgboost import XGBRegressor #type:ignore
-from modules.models.modelSchema import ForecastFrequency
+from modules.models.modelSchema import ForecastFrequency, QualityTier
 from core.utils.utils import evaluate_xgboost_model
+from modules.models.model_cache import series_fingerprint, load_model, store_model
+from core.utils.thread_budget import xgboost_n_jobs
+from modules.models.feature_store import FEATURE_STORE, TIME_FEATURES
 
 
 def create_time_features(df, date_col='ds'):
@@ -29,32 +33,30 @@ def create_time_features(df, date_col='ds'):
     
     return df
 
-def create_lag_features(df,target_col = "y",lags = [1,2,3,7,14,30]):
-    df = df.copy()
-    for lag in lags:
-        df[f"lag_{lag}"] = df[target_col].shift(lag)
-    return df
+# Boosting settings per quality tier, merged over the base parameters
+XGBOOST_TIERS = {
+    QualityTier.FAST: dict(n_estimators=40, tree_method="hist", max_bin=64),
+    QualityTier.BALANCED: dict(n_estimators=100, tree_method="hist"),
+    QualityTier.ACCURATE: dict(n_estimators=400, learning_rate=0.05, tree_method="exact"),
+}
 
-def create_rolling_features(df,target_col = 'y',windows = [7,14,30]):
-    df = df.copy()
-    for window in windows:
-        df[f'rolling_mean_{window}'] = df[target_col].shift(1).rolling(window=window).mean()
-        df[f'rolling_std_{window}'] = df[target_col].shift(1).rolling(window=window).std()
-        df[f'rolling_min_{window}'] = df[target_col].shift(1).rolling(window=window).min()
-        df[f'rolling_max_{window}'] = df[target_col].shift(1).rolling(window=window).max()
-    return df
+@dataclass
+class XGBoostFit:
+    """Fitted regressor with the training frame the forecast loop continues from"""
+    model: XGBRegressor
+    feature_cols: list[str]
+    lags: list[int]
+    windows: list[int]
+    X: pd.DataFrame
+    y: pd.Series
+    history: pd.DataFrame    # ds/y rows the model was trained on
 
-
-def forecast_with_xgboost(ts, period_ahead, frequency: ForecastFrequency):
+def fit_xgboost(ts, frequency: ForecastFrequency, tier: QualityTier = QualityTier.BALANCED, series_key = None) -> XGBoostFit:
     """
-    Generate forecast using XGBoost model with time series features
+    Fit XGBoost on calendar, lag and rolling features of the series
     """
     LOG.info(f"XGBoost model selected for frequency {frequency}")
     
-    # Prepare data
-    xgb_df = ts.reset_index()
-    xgb_df.columns = ["ds", "y"]
-    
     # Determine lag and rolling window sizes based on frequency
     if frequency == ForecastFrequency.DAILY:
         lags = [1, 2, 3, 7, 14, 30]
@@ -69,30 +71,26 @@ def forecast_with_xgboost(ts, period_ahead, frequency: ForecastFrequency):
         windows = [3, 6, 12]
         min_train_size = 12  # At least 12 months
     
-    # Create features
-    xgb_df = create_time_features(xgb_df, 'ds')
-    xgb_df = create_lag_features(xgb_df, 'y', lags)
-    xgb_df = create_rolling_features(xgb_df, 'y', windows)
-    
-    # Drop rows with NaN values (from lag/rolling features)
-    xgb_df = xgb_df.dropna()
-    
-    if len(xgb_df) < min_train_size:
+    # Calendar, lag and rolling features as float32, extended from the last request for this series
+    features = FEATURE_STORE.features(series_key, ts, lags, windows)
+    complete = ~np.isnan(features.values).any(axis=1)   # Rows whose lags and windows reach back far enough
+    feature_cols = features.columns
+
+    if complete.sum() < min_train_size:
         LOG.warning(f"Not enough data after feature engineering. Need at least {min_train_size} periods.")
         # Fallback to simpler features
-        xgb_df = ts.reset_index()
-        xgb_df.columns = ["ds", "y"]
-        xgb_df = create_time_features(xgb_df, 'ds')
-    
-    # Define feature columns (exclude date and target)
-    feature_cols = [col for col in xgb_df.columns if col not in ['ds', 'y']]
-    
-    # Split features and target
-    X = xgb_df[feature_cols]
-    y = xgb_df['y']
+        complete = np.ones(len(ts), dtype=bool)
+        feature_cols = TIME_FEATURES
+
+    X = pd.DataFrame(
+        features.values[complete][:, [features.columns.index(col) for col in feature_cols]],
+        columns=feature_cols,
+    )
+    y = pd.Series(features.y[complete])
+    xgb_df = pd.DataFrame({"ds": features.index[complete], "y": y.to_numpy()})
     
-    # Train XGBoost model
-    model = XGBRegressor(
+    # Train XGBoost model (or reuse a fit of the same series from any worker)
+    params = dict(
         n_estimators=100,
         learning_rate=0.1,
         max_depth=5,
@@ -102,12 +100,28 @@ def forecast_with_xgboost(ts, period_ahead, frequency: ForecastFrequency):
         random_state=42,
         objective='reg:squarederror'
     )
-    
-    model.fit(X, y)
-    
+    params.update(XGBOOST_TIERS[tier])
+    fingerprint = series_fingerprint(ts, "xgboost", frequency.value, sorted(params.items()), feature_cols)
+    model = load_model(fingerprint)
+    if model is None:
+        model = XGBRegressor(**params, n_jobs=xgboost_n_jobs())
+        model.fit(X, y)
+        store_model(fingerprint, model)
+    else:
+        # The thread count is not part of the fit; use this process's budget, not the one it was fitted under
+        model.set_params(n_jobs=xgboost_n_jobs())
+    return XGBoostFit(model, feature_cols, lags, windows, X, y, xgb_df)
+
+def evaluate_xgboost(fit: XGBoostFit, ts):
     # In-sample predictions for evaluation
-    y_pred = model.predict(X)
-    evaluation = evaluate_xgboost_model(y.values, y_pred)
+    y_pred = fit.model.predict(fit.X)
+    return evaluate_xgboost_model(fit.y.values, y_pred)
+
+def predict_xgboost(fit: XGBoostFit, ts, period_ahead, frequency: ForecastFrequency, tier: QualityTier = QualityTier.BALANCED, evaluation = None):
+    """
+    Forecast step by step, feeding each prediction back into the lag and rolling features
+    """
+    model, feature_cols, lags, windows, xgb_df = fit.model, fit.feature_cols, fit.lags, fit.windows, fit.history
     
     # Generate future dates
     freq_map = {
@@ -208,14 +222,23 @@ def forecast_with_xgboost(ts, period_ahead, frequency: ForecastFrequency):
     feature_importance = dict(zip(feature_cols, model.feature_importances_))
     top_features = dict(sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)[:5])
     
-    return forecast_df, evaluation, {
+    return forecast_df, {
         "model_type": "XGBoost",
         "interval_confidence": "95%",
         "frequency": frequency.value,
         "data_points": len(ts),
         "n_estimators": model.n_estimators,
         "max_depth": model.max_depth,
+        "tree_method": model.get_params()["tree_method"],
+        "quality_tier": tier.value,
         "top_features": {k: round(float(v), 4) for k, v in top_features.items()}
     }
 
-
+def forecast_with_xgboost(ts, period_ahead, frequency: ForecastFrequency, tier: QualityTier = QualityTier.BALANCED, series_key = None):
+    """
+    Generate forecast using XGBoost model with time series features
+    """
+    fit = fit_xgboost(ts, frequency, tier, series_key)
+    evaluation = evaluate_xgboost(fit, ts)
+    forecast_df, model_info = predict_xgboost(fit, ts, period_ahead, frequency, tier, evaluation)
+    return forecast_df, evaluation, model_info
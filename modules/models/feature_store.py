@@ -0,0 +1,139 @@
+import threading
+import numpy as np
+import pandas as pd
+from typing import Hashable, Optional
+from dataclasses import dataclass
+from collections import OrderedDict
+from numpy.lib.stride_tricks import sliding_window_view
+from config import CONFIG
+
+TIME_FEATURES = ["year", "month", "day", "dayofweek", "quarter", "dayofyear", "weekofyear"]
+ROLLING_STATS = ["mean", "std", "min", "max"]
+
+
+def feature_columns(lags: list[int], windows: list[int]) -> list[str]:
+    """Column names in matrix order, the same names the XGBoost model is trained on"""
+    return (
+        TIME_FEATURES
+        + [f"lag_{lag}" for lag in lags]
+        + [f"rolling_{stat}_{window}" for window in windows for stat in ROLLING_STATS]
+    )
+
+
+def compute_feature_rows(y: np.ndarray, index: pd.DatetimeIndex, start: int, lags: list[int], windows: list[int]) -> np.ndarray:
+    """
+    Feature rows start..len(y)-1 as float32. Row t only depends on y[:t], so rows
+    of an unchanged history prefix never need recomputing. Lag and rolling
+    features that reach before the first period are NaN.
+    """
+    n = len(y)
+    rows = n - start
+    out = np.full((rows, len(TIME_FEATURES) + len(lags) + 4 * len(windows)), np.nan, dtype=np.float32)
+
+    dates = index[start:]
+    iso = dates.isocalendar()
+    out[:, :len(TIME_FEATURES)] = np.column_stack([
+        dates.year, dates.month, dates.day, dates.dayofweek,
+        dates.quarter, dates.dayofyear, iso["week"].to_numpy(dtype=np.int64),
+    ])
+
+    t = np.arange(start, n)
+    col = len(TIME_FEATURES)
+    for lag in lags:
+        valid = t >= lag
+        out[valid, col] = y[t[valid] - lag]
+        col += 1
+
+    for window in windows:
+        first = max(start, window)
+        if first < n:
+            # Window for row t is y[t - window:t], i.e. row t - window of the sliding view
+            view = sliding_window_view(y, window)[first - window:n - window]
+            rows_slice = slice(first - start, n - start)
+            out[rows_slice, col] = view.mean(axis=1)
+            out[rows_slice, col + 1] = view.std(axis=1, ddof=1) if window > 1 else np.nan
+            out[rows_slice, col + 2] = view.min(axis=1)
+            out[rows_slice, col + 3] = view.max(axis=1)
+        col += 4
+
+    return out
+
+
+@dataclass
+class FeatureMatrix:
+    index: pd.DatetimeIndex
+    y: np.ndarray           # float64 history the rows were built from
+    values: np.ndarray      # float32, one row per period
+    columns: list[str]
+
+
+class FeatureStore:
+    """
+    Per-series XGBoost feature matrices, kept in memory and extended when a
+    request brings new periods instead of being rebuilt from the whole history.
+
+    A stored matrix is reused while the new history starts with the same
+    periods and the same values; only the last stored period may differ (the
+    current, still open period), since no stored row depends on it. Any other
+    change to the history rebuilds the matrix. The least recently used series
+    are dropped beyond `max_series`.
+    """
+
+    def __init__(self, max_series: int):
+        self.max_series = max_series
+        self._entries: OrderedDict[Hashable, FeatureMatrix] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.extended = 0
+        self.rebuilt = 0
+
+    def _reusable_rows(self, stored: FeatureMatrix, index: pd.DatetimeIndex, y: np.ndarray) -> int:
+        n = len(stored.index)
+        if n > len(index) or not stored.index.equals(index[:n]):
+            return 0
+        if not np.array_equal(stored.y[:n - 1], y[:n - 1]):
+            return 0
+        return n
+
+    def features(self, series_key: Optional[Hashable], ts: pd.Series, lags: list[int], windows: list[int]) -> FeatureMatrix:
+        index = pd.DatetimeIndex(ts.index)
+        y = ts.to_numpy(dtype="float64")
+        columns = feature_columns(lags, windows)
+        if series_key is None:
+            return FeatureMatrix(index, y, compute_feature_rows(y, index, 0, lags, windows), columns)
+
+        key = (series_key, tuple(lags), tuple(windows))
+        with self._lock:
+            stored = self._entries.get(key)
+
+        reuse = self._reusable_rows(stored, index, y) if stored is not None else 0
+        if reuse == len(index):
+            values = stored.values
+            counter = "hits"
+        elif reuse:
+            values = np.vstack([stored.values, compute_feature_rows(y, index, reuse, lags, windows)])
+            counter = "extended"
+        else:
+            values = compute_feature_rows(y, index, 0, lags, windows)
+            counter = "rebuilt"
+
+        matrix = FeatureMatrix(index, y, values, columns)
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._entries[key] = matrix
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_series:
+                self._entries.popitem(last=False)
+        return matrix
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._entries),
+            "bytes": sum(m.values.nbytes for m in self._entries.values()),
+            "hits": self.hits,
+            "extended": self.extended,
+            "rebuilt": self.rebuilt,
+        }
+
+
+FEATURE_STORE = FeatureStore(max_series=CONFIG.feature_store_max_series)
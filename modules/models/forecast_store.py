@@ -0,0 +1,62 @@
+import threading
+from typing import Callable, Hashable, Optional
+from config import CONFIG
+from core.utils.shared_cache import SHARED_CACHE, SharedCache, cache_key
+from modules.data.entity_index import normalize_name
+from modules.models.modelSchema import ModelType, ForecastFrequency, QualityTier
+
+
+def forecast_key(kind: str, names: tuple, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                 tier: QualityTier = QualityTier.BALANCED) -> tuple:
+    """Identity of a forecast request, shared by request coalescing and the forecast store"""
+    return (
+        kind,
+        *(normalize_name(name) if name else None for name in names),
+        periods_ahead,
+        ModelType(model),
+        ForecastFrequency(frequency),
+        QualityTier(tier),
+    )
+
+
+class ForecastStore:
+    """
+    Encoded forecast responses keyed like the forecast endpoints' requests.
+
+    Backed by the host-wide shared cache, so a forecast computed (or
+    precomputed) by one worker is served by all of them. Entries older than
+    `ttl_seconds` are not served; the endpoints then compute the forecast live.
+    """
+
+    NAMESPACE = "forecast"
+
+    def __init__(self, cache: SharedCache, ttl_seconds: float):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self.cache.get(self.NAMESPACE, cache_key(key))
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+    def put(self, key: Hashable, body: bytes):
+        self.cache.set(self.NAMESPACE, cache_key(key), body, ttl_seconds=self.ttl_seconds)
+
+    def invalidate(self, predicate: Optional[Callable[[list[str]], bool]] = None) -> int:
+        """Drop every entry, or only those whose key parts match the predicate"""
+        if predicate is None:
+            return self.cache.delete(self.NAMESPACE)
+        return self.cache.delete(self.NAMESPACE, lambda key: predicate(key.split("|")))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
+
+
+FORECAST_STORE = ForecastStore(SHARED_CACHE, ttl_seconds=CONFIG.forecast_store_ttl_seconds)
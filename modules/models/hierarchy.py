@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from enum import Enum
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.process_pool import get_process_pool
+from modules.models.modelSchema import ModelType, ForecastFrequency, QualityTier
+
+
+class ReconciliationMethod(str, Enum):
+    BOTTOM_UP = "bottom_up"
+    MINT = "mint"
+
+
+# Levels of the hierarchy, top to bottom, with the columns that identify a node
+HIERARCHY_LEVELS = [
+    ("total", []),
+    ("city", ["city"]),
+    ("customer", ["city", "company_name"]),
+    ("product", ["city", "company_name", "product_name"]),
+]
+
+
+def build_hierarchy(bottom: pd.DataFrame, levels) -> tuple[np.ndarray, list[dict]]:
+    """
+    Summing matrix S (nodes x bottom series) and node descriptions for the given
+    levels. `bottom` has one row per bottom-level series with the level columns.
+    """
+    m = len(bottom)
+    columns = np.arange(m)
+    blocks, nodes = [], []
+    parent_codes = None
+
+    for level, cols in levels:
+        if cols:
+            codes, labels = pd.MultiIndex.from_frame(bottom[cols]).factorize()
+        else:
+            codes, labels = np.zeros(m, dtype=int), [("All Cities",)]
+
+        block = np.zeros((len(labels), m))
+        block[codes, columns] = 1.0
+        blocks.append(block)
+
+        # First bottom series of each node tells which parent node it belongs to
+        first = np.unique(codes, return_index=True)[1]
+        for code, label in enumerate(labels):
+            label = label if isinstance(label, tuple) else (label,)
+            nodes.append({
+                "level": level,
+                "name": label[-1],
+                "parent": None if parent_codes is None else int(parent_codes[first[code]]),
+            })
+        parent_codes = codes + (len(nodes) - len(labels))
+
+    return np.vstack(blocks), nodes
+
+
+def fit_node(values: np.ndarray, index: pd.DatetimeIndex, periods_ahead: int, model: ModelType, frequency: ForecastFrequency, tier: QualityTier):
+    """
+    Base forecast and residual variance for one node; runs in a pool process.
+    Falls back to a flat forecast of the recent mean when the model cannot be fitted.
+    """
+    from modules.models.pipeline import generate_forecast
+
+    ts = pd.Series(values, index=index)
+    if not np.any(values):
+        return np.zeros(periods_ahead), 1e-6, None
+
+    try:
+        forecast_df, evaluation, _ = generate_forecast(ts, periods_ahead, model, frequency, tier=tier)
+        forecast = forecast_df["forecasted_sales"].to_numpy(dtype="float64")
+        rmse = (evaluation or {}).get("in_sample_rmse")
+        variance = float(rmse) ** 2 if rmse else float(np.var(values))
+        return forecast, max(variance, 1e-6), forecast_df.iloc[:, 0].tolist()
+    except Exception as e:
+        LOG.warning(f"Falling back to mean forecast for a hierarchy node: {e}")
+        return np.full(periods_ahead, values[-3:].mean()), max(float(np.var(values)), 1e-6), None
+
+
+def reconcile(base: np.ndarray, S: np.ndarray, variances: np.ndarray, method: ReconciliationMethod) -> np.ndarray:
+    """
+    Make base forecasts (nodes x horizon) coherent with the summing matrix S.
+
+    bottom_up sums the bottom-level forecasts. mint is the MinT estimator with a
+    diagonal covariance of in-sample residual variances (WLS):
+    S (S' W^-1 S)^-1 S' W^-1 y_hat.
+    """
+    m = S.shape[1]
+    if method == ReconciliationMethod.BOTTOM_UP:
+        return S @ base[-m:]
+
+    weighted = S.T / variances          # S' W^-1, shape (m, n)
+    G = np.linalg.solve(weighted @ S, weighted)
+    return S @ (G @ base)
+
+
+def hierarchical_forecast(
+    df: pd.DataFrame,
+    periods_ahead: int,
+    model: ModelType,
+    frequency: ForecastFrequency,
+    method: ReconciliationMethod,
+    single_city: bool,
+    max_nodes: int,
+    tier: QualityTier = QualityTier.BALANCED,
+) -> dict:
+    """
+    Forecast every node of the city > customer > product hierarchy from one
+    bottom-level aggregate, fitting nodes in parallel, and reconcile the result.
+    """
+    df = df.copy()
+    df["period"] = pd.to_datetime(df["period"], utc=True).dt.tz_localize(None)
+    for col in ("city", "company_name", "product_name"):
+        df[col] = df[col].fillna("Unknown").astype(str).str.strip()
+
+    # Bottom series x periods on a complete grid, missing periods are zero sales
+    bottom = df.pivot_table(
+        index=["city", "company_name", "product_name"],
+        columns="period",
+        values="total_sales",
+        aggfunc="sum",
+        fill_value=0.0,
+    )
+    freq_str = {ForecastFrequency.DAILY: "D", ForecastFrequency.WEEKLY: "W-MON", ForecastFrequency.MONTHLY: "MS"}[frequency]
+    full_index = pd.date_range(bottom.columns.min(), bottom.columns.max(), freq=freq_str)
+    bottom = bottom.reindex(columns=full_index, fill_value=0.0)
+
+    levels = HIERARCHY_LEVELS[1:] if single_city else HIERARCHY_LEVELS
+    S, nodes = build_hierarchy(bottom.index.to_frame(index=False), levels)
+    if len(nodes) > max_nodes:
+        raise ValueError(f"Hierarchy has {len(nodes)} nodes, more than the limit of {max_nodes}")
+
+    history = S @ bottom.to_numpy(dtype="float64")   # Every node's series in one product
+    LOG.info(f"Fitting {len(nodes)} hierarchy nodes with {model.value} ({frequency.value})")
+
+    pool = get_process_pool()
+    results = list(pool.map(
+        fit_node,
+        history,
+        [full_index] * len(nodes),
+        [periods_ahead] * len(nodes),
+        [model] * len(nodes),
+        [frequency] * len(nodes),
+        [tier] * len(nodes),
+        chunksize=max(1, len(nodes) // (CONFIG.process_pool_workers * 4)),
+    ))
+
+    base = np.vstack([forecast for forecast, _, _ in results])
+    variances = np.array([variance for _, variance, _ in results])
+    reconciled = reconcile(base, S, variances, method)
+
+    labels = next((labels for _, _, labels in results if labels), None)
+    if labels is None:
+        labels = [str(p) for p in pd.date_range(full_index[-1], periods=periods_ahead + 1, freq=freq_str)[1:]]
+
+    # Assemble the tree from the flat node list
+    tree_nodes = [
+        {
+            "name": node["name"],
+            "level": node["level"],
+            "history_total": round(float(history[i].sum()), 2),
+            "base_forecast": np.round(base[i], 2).tolist(),
+            "forecast": np.round(reconciled[i], 2).tolist(),
+            "children": [],
+        }
+        for i, node in enumerate(nodes)
+    ]
+    for i, node in enumerate(nodes):
+        if node["parent"] is not None:
+            tree_nodes[node["parent"]]["children"].append(tree_nodes[i])
+
+    return {
+        "periods": labels,
+        "reconciliation": method.value,
+        "nodes": len(nodes),
+        "bottom_series": S.shape[1],
+        "tree": tree_nodes[0],
+    }
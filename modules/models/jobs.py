@@ -0,0 +1,325 @@
+import time
+import uuid
+import orjson
+import asyncio
+from enum import Enum
+from typing import Optional
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, asdict
+from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.admission import Overloaded
+from core.utils.serialization import FastJSONResponse, dumps_json
+from core.utils.shared_cache import SHARED_CACHE, SharedCache
+from modules.models import predict
+from modules.models.forecast_store import forecast_key
+from modules.models.hierarchy import ReconciliationMethod
+from modules.models.modelSchema import ModelType, ForecastFrequency, QualityTier
+from modules.models.progress import stage_listener
+
+# Times a job waits out a 503 from admission control before giving up
+OVERLOADED_RETRIES = 3
+
+# How often a subscriber polls the shared cache for a job run by another worker
+REMOTE_POLL_SECONDS = 0.5
+
+
+class ForecastJobKind(str, Enum):
+    PRODUCT = "product"
+    CUSTOMER = "customer"
+    CITY = "city"
+    HIERARCHY = "hierarchy"
+
+
+class ForecastJobRequest(BaseModel):
+    kind: ForecastJobKind
+    name: Optional[str] = Field(None, description="Product, customer or city name (optional for hierarchy)")
+    product_name: Optional[str] = Field(None, description="Product filter for customer forecasts")
+    periods_ahead: int = Field(3, ge=1, le=CONFIG.max_periods_ahead)
+    model: ModelType = ModelType.ARIMA
+    frequency: ForecastFrequency = ForecastFrequency.MONTHLY
+    tier: QualityTier = QualityTier.ACCURATE
+    reconciliation: ReconciliationMethod = ReconciliationMethod.MINT
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class ForecastJob:
+    id: str
+    request: dict
+    status: JobStatus = JobStatus.QUEUED
+    stage: Optional[str] = None
+    events: list[dict] = field(default_factory=list)
+    error: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def view(self) -> dict:
+        def iso(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+        return {
+            "job_id": self.id,
+            "status": self.status.value,
+            "stage": self.stage,
+            "request": self.request,
+            "events": self.events,
+            "error": self.error,
+            "created_at": iso(self.created_at),
+            "finished_at": iso(self.finished_at),
+        }
+
+
+def _job_call(request: ForecastJobRequest) -> tuple:
+    """Forecast key, admission pool, worker function and its arguments for a job request"""
+    if request.kind != ForecastJobKind.HIERARCHY and not request.name:
+        raise HTTPException(status_code=422, detail=f"'name' is required for {request.kind.value} forecasts")
+
+    periods, model, frequency, tier = request.periods_ahead, request.model, request.frequency, request.tier
+    if request.kind == ForecastJobKind.PRODUCT:
+        return (forecast_key("product", (request.name,), periods, model, frequency, tier), model.value,
+                predict.product_sales_forecast, request.name, periods, model, frequency, tier)
+    if request.kind == ForecastJobKind.CUSTOMER:
+        return (forecast_key("customer", (request.name, request.product_name), periods, model, frequency, tier), model.value,
+                predict.customer_sales_forecast, request.name, request.product_name, periods, model, frequency, tier)
+    if request.kind == ForecastJobKind.CITY:
+        return (forecast_key("city", (request.name,), periods, model, frequency, tier), model.value,
+                predict.city_sales_forecast, request.name, periods, model, frequency, tier)
+    method = request.reconciliation
+    return (forecast_key(f"hierarchy:{method.value}", (request.name,), periods, model, frequency, tier), "hierarchy",
+            predict.hierarchy_sales_forecast, request.name, periods, model, frequency, method, tier)
+
+
+class ForecastJobManager:
+    """
+    Runs forecast requests as background tasks of this worker and records their
+    progress.
+
+    Job state and results are written through to the host-wide shared cache, so
+    any worker can answer status, event and result requests for any job. Jobs
+    are kept for `retention_seconds` after they were last updated.
+    """
+
+    NAMESPACE = "forecast_job"
+    RESULT_NAMESPACE = "forecast_job_result"
+
+    def __init__(self, cache: SharedCache, retention_seconds: float):
+        self.cache = cache
+        self.retention_seconds = retention_seconds
+        self._jobs: dict[str, ForecastJob] = {}
+        self._changed: dict[str, asyncio.Event] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, request: ForecastJobRequest) -> ForecastJob:
+        call = _job_call(request)
+        self._purge()
+        self._loop = asyncio.get_running_loop()
+
+        job = ForecastJob(id=uuid.uuid4().hex, request=request.model_dump(mode="json"))
+        self._jobs[job.id] = job
+        self._changed[job.id] = asyncio.Event()
+        self._save(job)
+        self._tasks[job.id] = asyncio.create_task(self._run(job, *call))
+        self.submitted += 1
+        return job
+
+    async def _run(self, job: ForecastJob, key: tuple, pool: str, compute, *args):
+        self._update(job, status=JobStatus.RUNNING)
+        try:
+            for attempt in range(OVERLOADED_RETRIES + 1):
+                try:
+                    # Stages are reported from the worker thread running the forecast
+                    with stage_listener(lambda stage: self._update(job, stage=stage)):
+                        body = await predict.fetch_forecast(key, pool, compute, *args)
+                    break
+                except Overloaded as e:
+                    if attempt == OVERLOADED_RETRIES:
+                        raise
+                    self._update(job, status=JobStatus.QUEUED)
+                    await asyncio.sleep(float(e.headers["Retry-After"]))
+                    self._update(job, status=JobStatus.RUNNING)
+
+            self.cache.set(self.RESULT_NAMESPACE, job.id, body, ttl_seconds=self.retention_seconds)
+            self.succeeded += 1
+            self._update(job, status=JobStatus.SUCCEEDED)
+        except HTTPException as e:
+            self.failed += 1
+            self._update(job, status=JobStatus.FAILED, error={"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            LOG.error(f"Forecast job {job.id} failed: {e}")
+            self.failed += 1
+            self._update(job, status=JobStatus.FAILED, error={"status_code": 500, "detail": "Internal server error"})
+        finally:
+            self._tasks.pop(job.id, None)
+
+    def _update(self, job: ForecastJob, status: Optional[JobStatus] = None, stage: Optional[str] = None, error: Optional[dict] = None):
+        """Record a status or stage change; called from the event loop and from worker threads"""
+        if status is not None:
+            job.status = status
+        if stage is not None:
+            job.stage = stage
+        if error is not None:
+            job.error = error
+        if job.done:
+            job.finished_at = time.time()
+        job.events.append({
+            "status": job.status.value,
+            "stage": job.stage,
+            "at": datetime.now(timezone.utc).isoformat(),
+        })
+        self._save(job)
+        self._loop.call_soon_threadsafe(self._notify, job.id)
+
+    def _notify(self, job_id: str):
+        # Swap in a fresh event so every current subscriber wakes up exactly once
+        event = self._changed.get(job_id)
+        if event is not None:
+            self._changed[job_id] = asyncio.Event()
+            event.set()
+
+    def _save(self, job: ForecastJob):
+        self.cache.set(self.NAMESPACE, job.id, dumps_json(asdict(job)), ttl_seconds=self.retention_seconds)
+
+    def _purge(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+            self._changed.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[ForecastJob]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        encoded = self.cache.get(self.NAMESPACE, job_id)
+        if encoded is None:
+            return None
+        state = orjson.loads(encoded)
+        state["status"] = JobStatus(state["status"])
+        return ForecastJob(**state)
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        return self.cache.get(self.RESULT_NAMESPACE, job_id)
+
+    async def events(self, job_id: str):
+        """Server-Sent Events for every recorded change of a job, until it finishes"""
+        sent = 0
+        while True:
+            changed = self._changed.get(job_id)
+            job = self.get(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job expired\"}\n\n"
+                return
+            for event in job.events[sent:]:
+                yield f"event: progress\ndata: {dumps_json(event).decode()}\n\n"
+            sent = len(job.events)
+            if job.done:
+                yield f"event: done\ndata: {dumps_json(job.view()).decode()}\n\n"
+                return
+
+            if changed is not None:
+                await changed.wait()
+            else:
+                # Job runs in another worker; follow it through the shared cache
+                await asyncio.sleep(REMOTE_POLL_SECONDS)
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "running": len(self._tasks),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retention_seconds": self.retention_seconds,
+        }
+
+
+FORECAST_JOBS = ForecastJobManager(SHARED_CACHE, retention_seconds=CONFIG.forecast_job_retention_seconds)
+
+router = APIRouter(
+    prefix = "/api/v1/forecast_jobs",
+    tags = ["forecast jobs"],
+    default_response_class = FastJSONResponse
+)
+
+
+def _get_job(job_id: str) -> ForecastJob:
+    job = FORECAST_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'")
+    return job
+
+
+@router.post("", status_code=202)
+async def submit_forecast_job(request: ForecastJobRequest):
+    """
+    Start a forecast in the background. Poll the status URL or subscribe to the
+    events URL, then fetch the result URL once the job has succeeded.
+    """
+    job = FORECAST_JOBS.submit(request)
+    base = f"{router.prefix}/{job.id}"
+    return FastJSONResponse(
+        dumps_json({
+            **job.view(),
+            "status_url": base,
+            "events_url": f"{base}/events",
+            "result_url": f"{base}/result",
+        }),
+        status_code=202,
+        headers={"Location": base},
+    )
+
+
+@router.get("/stats")
+async def get_forecast_job_stats():
+    return FORECAST_JOBS.stats()
+
+
+@router.get("/{job_id}")
+async def get_forecast_job(job_id: str):
+    return _get_job(job_id).view()
+
+
+@router.get("/{job_id}/events")
+async def get_forecast_job_events(job_id: str):
+    """Stage progress as Server-Sent Events (query, fit, predict, analysis), ending with a `done` event"""
+    _get_job(job_id)
+    return StreamingResponse(
+        FORECAST_JOBS.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/result")
+async def get_forecast_job_result(job_id: str):
+    """The forecast response once the job succeeded; 202 with the job status while it is still running"""
+    job = _get_job(job_id)
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=job.error["status_code"], detail=job.error["detail"])
+    if not job.done:
+        return FastJSONResponse(dumps_json(job.view()), status_code=202)
+
+    body = FORECAST_JOBS.result(job_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Result of job '{job_id}' has expired")
+    return FastJSONResponse(body)
@@ -4,8 +4,14 @@ class ModelType(str,Enum):
     ARIMA = "arima"
     PROPHET = "prophet"
     XGBOOST = "xgboost"
+    AUTO = "auto"      # Race the models above on a holdout and use the winner
 
 class ForecastFrequency(str, Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
-    MONTHLY = "monthly"
\ No newline at end of file
+    MONTHLY = "monthly"
+
+class QualityTier(str, Enum):
+    FAST = "fast"            # Cheapest settings, for interactive dashboards
+    BALANCED = "balanced"
+    ACCURATE = "accurate"    # Full settings, for batch jobs
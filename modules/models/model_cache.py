@@ -0,0 +1,37 @@
+import pickle
+import hashlib
+import numpy as np
+from typing import Any, Callable, Optional
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.shared_cache import SHARED_CACHE
+
+NAMESPACE = "fitted_model"
+
+
+def series_fingerprint(ts, *params) -> str:
+    """Hash of a series' values, index and the model parameters it is fitted with"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(ts.to_numpy(dtype="float64")).tobytes())
+    digest.update(np.asarray(ts.index.asi8).tobytes())
+    digest.update(repr(params).encode())
+    return digest.hexdigest()
+
+
+def load_model(fingerprint: str, loads: Callable[[bytes], Any] = pickle.loads) -> Optional[Any]:
+    """Fitted model for the fingerprint from the shared cache, if any worker stored one"""
+    raw = SHARED_CACHE.get(NAMESPACE, fingerprint)
+    if raw is None:
+        return None
+    try:
+        return loads(raw)
+    except Exception as e:
+        LOG.warning(f"Discarding unreadable cached model {fingerprint}: {e}")
+        return None
+
+
+def store_model(fingerprint: str, model: Any, dumps: Callable[[Any], bytes] = pickle.dumps):
+    try:
+        SHARED_CACHE.set(NAMESPACE, fingerprint, dumps(model), ttl_seconds=CONFIG.fitted_model_ttl_seconds)
+    except Exception as e:
+        LOG.warning(f"Could not cache fitted model {fingerprint}: {e}")
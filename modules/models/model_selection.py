@@ -0,0 +1,144 @@
+import time
+import orjson
+import threading
+import multiprocessing
+from concurrent.futures import wait
+import numpy as np
+from typing import Hashable, Optional
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.process_pool import get_process_pool
+from core.utils.shared_cache import SHARED_CACHE, SharedCache, cache_key
+from modules.models.model_cache import series_fingerprint
+from modules.models.modelSchema import ModelType, ForecastFrequency, QualityTier
+
+CANDIDATE_MODELS = [ModelType.ARIMA, ModelType.PROPHET, ModelType.XGBOOST]
+
+# Periods held out for scoring, per frequency
+HOLDOUT_PERIODS = {
+    ForecastFrequency.DAILY: 14,
+    ForecastFrequency.WEEKLY: 4,
+    ForecastFrequency.MONTHLY: 3,
+}
+
+
+def holdout_size(frequency: ForecastFrequency, n: int) -> int:
+    # Never hold out more than a fifth of the history
+    return max(1, min(HOLDOUT_PERIODS[frequency], n // 5))
+
+
+def score_model(ts, model: ModelType, frequency: ForecastFrequency, holdout: int, tier: QualityTier = QualityTier.BALANCED) -> dict:
+    """Fit on all but the last `holdout` periods and score the forecast of those; runs in a pool process"""
+    from modules.models.pipeline import generate_forecast
+
+    start = time.perf_counter()
+    try:
+        forecast_df, _, _ = generate_forecast(ts.iloc[:-holdout], holdout, model, frequency, tier=tier)
+        predicted = forecast_df["forecasted_sales"].to_numpy(dtype="float64")
+        actual = ts.iloc[-holdout:].to_numpy(dtype="float64")
+
+        errors = actual - predicted
+        non_zero = actual != 0
+        mape = float(np.mean(np.abs(errors[non_zero] / actual[non_zero])) * 100) if non_zero.any() else None
+        return {
+            "holdout_rmse": round(float(np.sqrt(np.mean(errors ** 2))), 2),
+            "holdout_mae": round(float(np.mean(np.abs(errors))), 2),
+            "holdout_mape": round(mape, 2) if mape is not None else None,
+            "fit_seconds": round(time.perf_counter() - start, 3),
+        }
+    except Exception as e:
+        return {"error": str(e), "fit_seconds": round(time.perf_counter() - start, 3)}
+
+
+class ModelSelector:
+    """
+    Picks the model for `auto` requests. The candidates are fitted concurrently
+    on the process pool, at the request's tier, and scored on a short holdout;
+    the winner is remembered in the shared cache per series, tier and series
+    values, so later requests for the same data, on any worker, only fit the
+    winner. A race cut short by a deadline is not remembered.
+    """
+
+    NAMESPACE = "model_selection"
+
+    def __init__(self, cache: SharedCache, memory_seconds: float):
+        self.cache = cache
+        self.memory_seconds = memory_seconds
+        self._lock = threading.Lock()
+        self.races = 0
+        self.remembered = 0
+
+    def _recall(self, key: Hashable) -> Optional[tuple[ModelType, dict]]:
+        raw = self.cache.get(self.NAMESPACE, cache_key(key))
+        if raw is None:
+            return None
+        selection = orjson.loads(raw)
+        return ModelType(selection["selected_model"]), selection
+
+    def _remember(self, key: Hashable, winner: ModelType, selection: dict):
+        self.cache.set(self.NAMESPACE, cache_key(key), orjson.dumps(selection), ttl_seconds=self.memory_seconds)
+
+    def race(self, ts, frequency: ForecastFrequency, tier: QualityTier = QualityTier.BALANCED,
+             deadline: float | None = None) -> tuple[ModelType, dict]:
+        """
+        Score the candidates; those not scored by `deadline` (a time.monotonic()
+        value) drop out of the race with a "missed the deadline" error.
+        """
+        holdout = holdout_size(frequency, len(ts))
+        missed = {"error": "missed the deadline", "fit_seconds": None}
+
+        # Inside a pool process (hierarchy nodes, precompute) the candidates run sequentially
+        if multiprocessing.parent_process() is None:
+            pool = get_process_pool()
+            futures = [pool.submit(score_model, ts, model, frequency, holdout, tier) for model in CANDIDATE_MODELS]
+            wait(futures, timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            scores = []
+            for future in futures:
+                if future.done():
+                    scores.append(future.result())
+                else:
+                    future.cancel()
+                    scores.append(missed)
+        else:
+            scores = [
+                missed if deadline is not None and time.monotonic() >= deadline else score_model(ts, model, frequency, holdout, tier)
+                for model in CANDIDATE_MODELS
+            ]
+
+        scored = {model.value: score for model, score in zip(CANDIDATE_MODELS, scores)}
+        valid = [(score["holdout_rmse"], model) for model, score in zip(CANDIDATE_MODELS, scores) if "error" not in score]
+        winner = min(valid, key=lambda item: item[0])[1] if valid else ModelType.ARIMA
+
+        return winner, {
+            "selected_model": winner.value,
+            "holdout_periods": holdout,
+            "tier": tier.value,
+            "scores": scored,
+        }
+
+    def select(self, series_key: Optional[Hashable], ts, frequency: ForecastFrequency,
+               tier: QualityTier = QualityTier.BALANCED, deadline: float | None = None) -> tuple[ModelType, dict]:
+        # The values are part of the key, so new orders in the series start a new race
+        key = (series_key, series_fingerprint(ts), tier) if series_key is not None else None
+        if key is not None:
+            recalled = self._recall(key)
+            if recalled is not None:
+                with self._lock:
+                    self.remembered += 1
+                winner, selection = recalled
+                return winner, {**selection, "remembered": True}
+
+        with self._lock:
+            self.races += 1
+        winner, selection = self.race(ts, frequency, tier, deadline)
+        LOG.info(f"Auto model selection picked {winner.value} for {series_key}: {selection['scores']}")
+        complete = all(score.get("error") != "missed the deadline" for score in selection["scores"].values())
+        if key is not None and complete:
+            self._remember(key, winner, selection)
+        return winner, {**selection, "remembered": False}
+
+    def stats(self) -> dict:
+        return {"races": self.races, "remembered": self.remembered}
+
+
+MODEL_SELECTOR = ModelSelector(SHARED_CACHE, memory_seconds=CONFIG.auto_model_memory_seconds)
@@ -0,0 +1,663 @@
+import time
+import hashlib
+import itertools
+import threading
+import contextvars
+import pandas as pd
+from typing import Any, Callable, Hashable, Optional
+from dataclasses import dataclass
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from fastapi import HTTPException #type:ignore
+from sqlalchemy.orm import Session
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.admission import ADMISSION, Overloaded, estimate_cost
+from core.utils.serialization import dumps_json, extend_json, frame_records
+from modules.ORM.orm import engine
+from modules.ORM.run_query import run_query
+from modules.data.entity_index import ENTITY_INDEX, EntityKind, normalize_name
+from modules.data.ingestion import ORDER_INGESTOR, Watermark, affected_names
+from modules.data.sales_views import SALES_VIEWS
+from modules.data.snapshot import SALES_SNAPSHOT, truncate_period, use_snapshot
+from modules.data.sql_queries.analytical_queries.monthlySales import SalesQuery
+from modules.models.modelSchema import ModelType, ForecastFrequency, QualityTier
+from modules.models.model_cache import series_fingerprint
+from modules.models.forecast_store import FORECAST_STORE
+from modules.models.model_selection import MODEL_SELECTOR
+from modules.models.progress import report_stage
+
+session = Session(bind=engine)
+
+# Stages in execution order; fit, evaluate and predict run once per model tried
+PIPELINE_STAGES = ("fetch", "resample", "prepare", "fit", "evaluate", "predict", "format", "prompt", "analyse")
+
+# Fits raced against a deadline run here so the request can stop waiting for them.
+# An abandoned fit keeps its admission slot until it finishes and still caches its model.
+budget_pool = ThreadPoolExecutor(
+    max_workers=sum(CONFIG.fit_concurrency.values()) + CONFIG.admission_queue_size,
+    thread_name_prefix="forecast-budget",
+)
+
+# Stage timings of the request being run; deadline fallbacks run in copies of the context and add to the same dict
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+_MISS = object()
+
+
+@dataclass(frozen=True)
+class SeriesRequest:
+    """The series a forecast is made for: kind is product, customer, city or hierarchy"""
+    kind: str
+    name: Optional[str]
+    product_name: Optional[str] = None   # Product filter for customer forecasts
+
+
+@dataclass
+class FetchedSeries:
+    df: pd.DataFrame
+    series_key: tuple    # Resolved names, shared with the model selector and the feature store
+    generation: int      # Distinguishes this query result from earlier ones of the same request
+    filters: dict        # Order line column -> values the query kept, to pick new lines to merge
+    watermark: Optional[Watermark] = None   # Newest order included; None when unknown (read from the views)
+
+
+@dataclass
+class ModelForecast:
+    forecast_df: pd.DataFrame
+    evaluation: Optional[dict]
+    model_info: dict
+
+
+class StageMemo:
+    """In-process LRU of stage outputs with a time to live"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISS
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return _MISS
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        with self._lock:
+            stale = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _model_stages(model_type: ModelType, series_key) -> tuple[Callable, Callable, Callable]:
+    """fit, evaluate and predict of a model; model libraries are imported on first use, not at app import"""
+    if model_type == ModelType.ARIMA:
+        from modules.models.Arima import fit_arima, evaluate_arima, predict_arima
+        return fit_arima, evaluate_arima, predict_arima
+    if model_type == ModelType.PROPHET:
+        from modules.models.Prophet import fit_prophet, evaluate_prophet, predict_prophet
+        return fit_prophet, evaluate_prophet, predict_prophet
+    if model_type == ModelType.XGBOOST:
+        from modules.models.XG_boost import fit_xgboost, evaluate_xgboost, predict_xgboost
+        return (lambda ts, frequency, tier: fit_xgboost(ts, frequency, tier, series_key)), evaluate_xgboost, predict_xgboost
+    raise ValueError(f"Unknown model type: {model_type}")
+
+
+def read_sales(aggregate: str, frequency: ForecastFrequency, until: Optional[Watermark] = None, **filters) -> pd.DataFrame:
+    """A SalesQuery aggregate from Postgres, or the same aggregate from the local snapshot in snapshot mode"""
+    if use_snapshot():
+        return getattr(SALES_SNAPSHOT, aggregate)(frequency, **filters)
+    return run_query(getattr(SalesQuery, aggregate)(session, frequency, until=until, **filters).statement)
+
+
+def merge_order_lines(fetched: FetchedSeries, lines: pd.DataFrame, frequency: ForecastFrequency) -> Optional[pd.DataFrame]:
+    """The fetched aggregate plus the sales of new order lines; None when none of them belong to it"""
+    for column, values in fetched.filters.items():
+        lines = lines[lines[column].isin(values)]
+    group_columns = [column for column in fetched.df.columns if column not in ("period", "total_sales")]
+    if "company_name" in group_columns or fetched.series_key[0] == "city":
+        # Aggregates joined to customers have no orders without one
+        lines = lines[lines["customer_id"].notna()]
+    if lines.empty:
+        return None
+
+    periods = truncate_period(lines["order_date"], frequency)
+    tz = getattr(fetched.df["period"].dt, "tz", None)
+    if tz is not None:
+        periods = periods.dt.tz_localize("UTC").dt.tz_convert(tz)
+    lines = lines.assign(period=periods)
+    if fetched.series_key[0] == "hierarchy" and fetched.series_key[1]:
+        lines = lines.assign(city=fetched.series_key[1])
+
+    merged = pd.concat([fetched.df, lines[fetched.df.columns]], ignore_index=True)
+    merged = merged.groupby(group_columns + ["period"], as_index=False, sort=False, dropna=False)["total_sales"].sum()
+    return merged.sort_values("period", kind="stable", ignore_index=True)
+
+
+def resample_sales(df: pd.DataFrame, frequency: ForecastFrequency) -> pd.DataFrame:
+    """A daily aggregate summed into weeks or months, the rows the date_trunc query for that frequency returns"""
+    group_columns = [column for column in df.columns if column not in ("period", "total_sales")]
+    periods = df["period"]
+    tz = getattr(periods.dt, "tz", None)
+    if tz is not None:
+        # Truncate the wall time, as date_trunc does in the session time zone
+        periods = periods.dt.tz_localize(None)
+    periods = truncate_period(periods, frequency)
+    if tz is not None:
+        periods = periods.dt.tz_localize(tz)
+    resampled = df.assign(period=periods).groupby(group_columns + ["period"], as_index=False, sort=False, dropna=False)["total_sales"].sum()
+    return resampled.sort_values(["period"] + group_columns, ignore_index=True)[list(df.columns)]
+
+
+def _period_format(frequency: ForecastFrequency) -> tuple[str, str]:
+    if frequency == ForecastFrequency.DAILY:
+        return "date", "%Y-%m-%d"
+    if frequency == ForecastFrequency.WEEKLY:
+        return "week", "%Y-W%U"
+    return "month", "%b-%Y"
+
+
+def _digest(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+
+def _entity(request: SeriesRequest) -> dict:
+    if request.kind == "customer":
+        return {"customer": request.name, "product": request.product_name or "All Products"}
+    return {request.kind: request.name}
+
+
+class ForecastPipeline:
+    """
+    The forecast of one series as explicit stages: fetch the daily aggregate,
+    resample it to the requested frequency, prepare the series, fit, evaluate and predict the model, format the response, build
+    the LLM prompt and analyse it with the LLM.
+
+    Each stage except format and prompt (cheap, and specific to the response)
+    is memoised on its inputs: fetch, resample and prepare on the request, fit and
+    evaluate on the series fingerprint and model settings, predict additionally
+    on the horizon, analyse on the prompt. Memoised outputs are shared, so
+    callers get copies of the dicts they may change. Every stage is timed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.memo = StageMemo(max_entries, ttl_seconds)
+        self._generation = itertools.count(1)
+        self.merged_fetches = 0
+        self._stats = {stage: {"calls": 0, "memo_hits": 0, "seconds": 0.0, "max_seconds": 0.0} for stage in PIPELINE_STAGES}
+        self._stats_lock = threading.Lock()
+
+    def _stage(self, stage: str, key: Optional[Hashable], compute: Callable, *args, keep: Optional[Callable[[Any], bool]] = None):
+        """
+        Run a stage, or return its memoised output for `key` (never memoised
+        when the key is None, or when `keep` rejects the output)
+        """
+        if key is not None:
+            value = self.memo.get((stage, key))
+            if value is not _MISS:
+                self._record(stage, 0.0, hit=True)
+                return value
+
+        start = time.perf_counter()
+        value = compute(*args)
+        self._record(stage, time.perf_counter() - start, hit=False)
+        if key is not None and (keep is None or keep(value)):
+            self.memo.set((stage, key), value)
+        return value
+
+    def _record(self, stage: str, seconds: float, hit: bool):
+        with self._stats_lock:
+            stats = self._stats[stage]
+            stats["calls"] += 1
+            stats["memo_hits"] += hit
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    # Series
+
+    def fetch(self, request: SeriesRequest, frequency: ForecastFrequency) -> FetchedSeries:
+        """
+        The sales aggregate of the request's entities at `frequency`. Only the
+        daily aggregate is queried; weekly and monthly ones are summed from it,
+        so all three frequencies share one query and one memo entry.
+        """
+        daily = self.fetch_daily(request)
+        if frequency == ForecastFrequency.DAILY:
+            return daily
+        return self._stage("resample", (request, frequency, daily.generation), self._resample, daily, frequency)
+
+    @staticmethod
+    def _resample(daily: FetchedSeries, frequency: ForecastFrequency) -> FetchedSeries:
+        series_key = daily.series_key[:-1] + (frequency,)
+        return FetchedSeries(resample_sales(daily.df, frequency), series_key, daily.generation, daily.filters, daily.watermark)
+
+    def fetch_daily(self, request: SeriesRequest) -> FetchedSeries:
+        """
+        The daily sales aggregate of the request's entities, resolved through
+        the entity index. A memoised aggregate behind the order watermark gets
+        the newer order lines merged in rather than being queried again.
+        """
+        report_stage("query")
+        key, frequency = request, ForecastFrequency.DAILY
+        fetched = self._stage("fetch", key, self._fetch, request, frequency)
+        if fetched.watermark is None or ORDER_INGESTOR.watermark is None or fetched.watermark >= ORDER_INGESTOR.watermark:
+            return fetched
+
+        lines, watermark = ORDER_INGESTOR.lines_since(fetched.watermark)
+        if lines is None:
+            # The new lines are no longer buffered; read the aggregate again
+            self.invalidate("fetch", lambda entry, _: entry == key)
+            return self._stage("fetch", key, self._fetch, request, frequency)
+
+        merged = merge_order_lines(fetched, lines, frequency) if not lines.empty else None
+        if merged is None:
+            fetched = FetchedSeries(fetched.df, fetched.series_key, fetched.generation, fetched.filters, watermark)
+        else:
+            fetched = FetchedSeries(merged, fetched.series_key, next(self._generation), fetched.filters, watermark)
+            self.merged_fetches += 1
+        self.memo.set(("fetch", key), fetched)
+        return fetched
+
+    def _fetch(self, request: SeriesRequest, frequency: ForecastFrequency) -> FetchedSeries:
+        # Read up to the ingestion watermark so later lines can be merged without counting any twice;
+        # the views are only as fresh as their last refresh, so aggregates read from them are never merged.
+        # The ingestor is off in snapshot mode, which leaves the watermark unset.
+        until = ORDER_INGESTOR.watermark if ORDER_INGESTOR.enabled and not SALES_VIEWS.available else None
+
+        if request.kind == "product":
+            product = ENTITY_INDEX.resolve(EntityKind.PRODUCT, request.name)
+            df = read_sales("product_wise_sales", frequency, until, product_ids=product.keys)
+            not_found = f"No sales data found for '{request.name}'"
+            series_key = ("product", product.name, frequency)
+            filters = {"product_id": product.keys}
+        elif request.kind == "customer":
+            customer = ENTITY_INDEX.resolve(EntityKind.CUSTOMER, request.name)
+            filters = {"customer_id": customer.keys}
+            if request.product_name:
+                product = ENTITY_INDEX.resolve(EntityKind.PRODUCT, request.product_name)
+                df = read_sales("customer_product_wise_sales", frequency, until, customer_ids=customer.keys, product_ids=product.keys)
+                not_found = f"No sales data found for product '{request.product_name}' and customer '{request.name}'"
+                filters["product_id"] = product.keys
+            else:
+                product = None
+                df = read_sales("customer_wise_sales", frequency, until, customer_ids=customer.keys)
+                not_found = f"No sales data found for customer '{request.name}'"
+            series_key = ("customer", customer.name, product.name if product else None, frequency)
+        elif request.kind == "city":
+            city = ENTITY_INDEX.resolve(EntityKind.CITY, request.name)
+            df = read_sales("city_wise_sales", frequency, until, cities=city.keys)
+            not_found = f"No sales data found for city '{request.name}'"
+            series_key = ("city", city.name, frequency)
+            filters = {"city": city.keys}
+        elif request.kind == "hierarchy":
+            city = ENTITY_INDEX.resolve(EntityKind.CITY, request.name) if request.name else None
+            df = read_sales("hierarchy_sales", frequency, until, cities=city.keys if city else None)
+            if city is not None and not df.empty:
+                df["city"] = city.name
+            not_found = "No sales data found"
+            series_key = ("hierarchy", city.name if city else None, frequency)
+            filters = {"city": city.keys} if city else {}
+        else:
+            raise ValueError(f"Unknown series kind: {request.kind}")
+
+        if df.empty:
+            raise HTTPException(status_code=404, detail=not_found)
+        return FetchedSeries(df, series_key, next(self._generation), filters, until)
+
+    def prepare(self, fetched: FetchedSeries) -> pd.Series:
+        """Total sales per period, oldest first"""
+        return self._stage("prepare", (fetched.series_key, fetched.generation), self._prepare, fetched.df)
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame) -> pd.Series:
+        periods = pd.to_datetime(df["period"], utc=True).dt.tz_convert(None)
+        ts = df["total_sales"].groupby(periods.rename("period")).sum().sort_index()
+        if len(ts) < 3:
+            raise HTTPException(status_code=400, detail="Not enough historical data for forecasting")
+        return ts
+
+    # Model
+
+    def forecast(self, ts: pd.Series, periods_ahead: int, model_type: ModelType, frequency: ForecastFrequency,
+                 series_key=None, tier: QualityTier = QualityTier.BALANCED, deadline: float | None = None) -> ModelForecast:
+        """Fit, evaluate and predict one model on the series; `deadline` only bounds the race of `auto`"""
+        if model_type == ModelType.AUTO:
+            # Race the models on a holdout (or reuse the remembered winner for this series), leaving
+            # half of the time to the deadline for fitting the winner on the whole series
+            race_deadline = None if deadline is None else time.monotonic() + max(deadline - time.monotonic(), 0) / 2
+            selected, selection = MODEL_SELECTOR.select(series_key, ts, frequency, tier, race_deadline)
+            result = self.forecast(ts, periods_ahead, selected, frequency, series_key, tier)
+            result.model_info["model_selection"] = selection
+            return result
+
+        fit, evaluate, predict = _model_stages(model_type, series_key)
+        fit_key = (series_fingerprint(ts), model_type, tier, frequency)
+
+        report_stage("fit")
+        model_fit = self._stage("fit", fit_key, fit, ts, frequency, tier)
+        evaluation = self._stage("evaluate", fit_key, evaluate, model_fit, ts)
+        report_stage("predict")
+        forecast_df, model_info = self._stage(
+            "predict", (fit_key, periods_ahead), predict, model_fit, ts, periods_ahead, frequency, tier, evaluation
+        )
+        return ModelForecast(forecast_df, evaluation, dict(model_info))
+
+    # Response
+
+    def format(self, request: SeriesRequest, ts: pd.Series, frequency: ForecastFrequency, result: ModelForecast) -> bytes:
+        return self._stage("format", None, self._format, request, ts, frequency, result)
+
+    @staticmethod
+    def _format(request: SeriesRequest, ts: pd.Series, frequency: ForecastFrequency, result: ModelForecast) -> bytes:
+        period_label, date_format = _period_format(frequency)
+        history_df = pd.DataFrame({
+            period_label: ts.index.strftime(date_format),
+            "actual_sales": ts.to_numpy(),
+        })
+
+        # Encode once; without llm_compact_payload the same bytes feed the LLM
+        return dumps_json({
+            **_entity(request),
+            f"last_known_{period_label}": ts.index[-1].strftime(date_format),
+            "history": frame_records(history_df),
+            "forecast": frame_records(result.forecast_df),
+            "evaluation_metrics": result.evaluation,
+            "model_info": result.model_info,
+        })
+
+    def prompt(self, request: SeriesRequest, ts: pd.Series, frequency: ForecastFrequency, result: ModelForecast) -> Optional[str]:
+        """The LLM input with the history summarised, or None to send the response body itself"""
+        if not CONFIG.llm_compact_payload:
+            return None
+        return self._stage("prompt", None, self._prompt, request, ts, frequency, result)
+
+    @staticmethod
+    def _prompt(request: SeriesRequest, ts: pd.Series, frequency: ForecastFrequency, result: ModelForecast) -> str:
+        from modules.LLM.payload import build_llm_payload
+        period_label, date_format = _period_format(frequency)
+        header = {**_entity(request), f"last_known_{period_label}": ts.index[-1].strftime(date_format)}
+        return build_llm_payload(
+            header, ts, frequency, date_format, frame_records(result.forecast_df), result.evaluation, result.model_info,
+            max_tokens=CONFIG.llm_payload_max_tokens,
+        )
+
+    def analyse(self, body: bytes, prompt: Optional[str] = None) -> bytes:
+        report_stage("analysis")
+        prompt = body.decode() if prompt is None else prompt
+        # A failed analysis is not memoised, so the next request with this prompt asks the LLM again
+        llm_response = self._stage("analyse", _digest(prompt), self._analyse, prompt, keep=lambda analysis: "error" not in analysis)
+        return extend_json(body, llm_analysis=llm_response)
+
+    def remember_analysis(self, prompt: str, analysis: dict):
+        """Memoise an analysis made elsewhere (e.g. in a batch) so requests for the same prompt reuse it"""
+        if "error" not in analysis:
+            self.memo.set(("analyse", _digest(prompt)), analysis)
+
+    @staticmethod
+    def _analyse(prompt: str):
+        from modules.LLM.LLM_analyzer import analyze_forecast
+        return analyze_forecast(prompt)
+
+    # Whole request
+
+    @contextmanager
+    def _request(self, request: SeriesRequest, model: ModelType):
+        """Times the stages of one request and turns unexpected errors into a 500"""
+        timings = {}
+        token = _request_timings.set(timings)
+        try:
+            yield
+            LOG.info("Forecast stages: " + ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in timings.items()),
+                     extra={"model_type": model.value})
+        except HTTPException:
+            raise
+        except Exception as e:
+            LOG.error(f"Error generating {request.kind} forecast: {e}", extra={"model_type": model.value})
+            raise HTTPException(status_code=500, detail="Internal server error")
+        finally:
+            _request_timings.reset(token)
+
+    def _forecast_body(self, request: SeriesRequest, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                       tier: QualityTier, deadline_ms: int | None) -> tuple[bytes, Optional[str]]:
+        deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+        LOG.info(f"Forecast request - {request.kind}: {request.name}, product: {request.product_name}, "
+                 f"model: {model.value}, freq: {frequency.value}, tier: {tier.value}")
+        fetched = self.fetch(request, frequency)
+        ts = self.prepare(fetched)
+
+        if model == ModelType.XGBOOST:
+            min_required = 60 if frequency == ForecastFrequency.DAILY else (20 if frequency == ForecastFrequency.WEEKLY else 12)
+            if len(ts) < min_required:
+                LOG.warning(f"XGBoost works best with at least {min_required} data points. Current: {len(ts)}")
+
+        result = budgeted_forecast(ts, periods_ahead, model, frequency, fetched.series_key, tier, deadline)
+        return self.format(request, ts, frequency, result), self.prompt(request, ts, frequency, result)
+
+    def run(self, request: SeriesRequest, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+            tier: QualityTier = QualityTier.BALANCED, deadline_ms: int | None = None) -> bytes:
+        """Run every stage for one series and return the encoded response body"""
+        with self._request(request, model):
+            body, prompt = self._forecast_body(request, periods_ahead, model, frequency, tier, deadline_ms)
+            return self.analyse(body, prompt)
+
+    def forecast_body(self, request: SeriesRequest, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                      tier: QualityTier = QualityTier.BALANCED, deadline_ms: int | None = None) -> tuple[bytes, Optional[str]]:
+        """Every stage but analyse: the response body without the LLM analysis, and the prompt for it"""
+        with self._request(request, model):
+            return self._forecast_body(request, periods_ahead, model, frequency, tier, deadline_ms)
+
+    def analysis_sections(self, body: bytes, prompt: Optional[str] = None):
+        """
+        Yield (section, content) of the LLM analysis as the reply streams in;
+        a memoised analysis is yielded at once. A complete analysis is memoised
+        for later requests, streamed or not.
+        """
+        prompt = body.decode() if prompt is None else prompt
+        key = ("analyse", _digest(prompt))
+        analysis = self.memo.get(key)
+        if analysis is not _MISS:
+            self._record("analyse", 0.0, hit=True)
+            yield from analysis.items()
+            return
+
+        from modules.LLM.LLM_analyzer import stream_forecast_analysis
+        start = time.perf_counter()
+        analysis = {}
+        for section, content in stream_forecast_analysis(prompt):
+            analysis[section] = content
+            yield section, content
+        self._record("analyse", time.perf_counter() - start, hit=False)
+        if "error" not in analysis:
+            self.memo.set(key, analysis)
+
+    def invalidate(self, stage: str, predicate: Callable[[Hashable, Any], bool] = lambda key, value: True) -> int:
+        """Drop memoised outputs of a stage whose key and value match; returns how many were dropped"""
+        return self.memo.invalidate(lambda entry, value: entry[0] == stage and predicate(entry[1], value))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stages = {
+                stage: {**stats, "seconds": round(stats["seconds"], 3), "max_seconds": round(stats["max_seconds"], 3)}
+                for stage, stats in self._stats.items()
+            }
+        return {"memo_entries": len(self.memo), "merged_fetches": self.merged_fetches, "stages": stages}
+
+
+FORECAST_PIPELINE = ForecastPipeline(CONFIG.pipeline_memo_entries, CONFIG.pipeline_memo_ttl_seconds)
+
+
+def _touched(names: dict[str, set[str]], kind: str, name: Optional[str]) -> bool:
+    if kind == "hierarchy":
+        return name is None or normalize_name(name) in names["city"]
+    return name is not None and normalize_name(name) in names.get(kind, ())
+
+
+# (kind, normalized name) -> time.time() of the newest order lines for it that the views may not hold yet
+_pending_view_names: dict[tuple[str, str], float] = {}
+_pending_lock = threading.Lock()
+
+
+def _invalidate_names(names: dict[str, set[str]], oldest: Optional[Watermark] = None) -> int:
+    """
+    Drop the stored forecasts of the names. Memoised aggregates read from the
+    views have no watermark to merge new lines from and are dropped too, as
+    are those read at or past `oldest`, which may or may not hold the lines.
+    """
+    dropped = FORECAST_STORE.invalidate(
+        lambda parts: _touched(names, parts[0].split(":")[0], None if parts[1] == "None" else parts[1])
+    )
+    FORECAST_PIPELINE.invalidate(
+        "fetch",
+        lambda _, fetched: (fetched.watermark is None or (oldest is not None and fetched.watermark >= oldest))
+                           and _touched(names, fetched.series_key[0], fetched.series_key[1]),
+    )
+    return dropped
+
+
+def invalidate_for_new_orders(lines: pd.DataFrame) -> int:
+    """
+    Drop the stored forecasts of the products, customers and cities that new
+    order lines touch; every other stored forecast stays valid. While the
+    views are in use the forecasts would only be recomputed from the same
+    view contents, so the names wait for the next refresh instead.
+    """
+    names = affected_names(lines)
+    if SALES_VIEWS.available:
+        now = time.time()
+        with _pending_lock:
+            for kind, kind_names in names.items():
+                _pending_view_names.update(((kind, name), now) for name in kind_names)
+        return 0
+
+    # Lines of late orders can be behind aggregates read since; the lines are ordered by (order_date, order_id)
+    first = lines.iloc[0]
+    dropped = _invalidate_names(names, oldest=(first["order_date"].to_pydatetime(), int(first["order_id"])))
+    LOG.info(f"New orders invalidated {dropped} stored forecasts")
+    return dropped
+
+
+def invalidate_after_refresh(started_at: float) -> int:
+    """
+    Once the views are refreshed, drop what new orders seen before the
+    refresh started touched. Names of orders seen since may be missing from
+    the refreshed views and wait for the next refresh.
+    """
+    names = {kind: set() for kind in ("product", "customer", "city")}
+    with _pending_lock:
+        for (kind, name), seen_at in list(_pending_view_names.items()):
+            if seen_at < started_at:
+                names[kind].add(name)
+                del _pending_view_names[(kind, name)]
+    if not any(names.values()):
+        return 0
+    dropped = _invalidate_names(names)
+    LOG.info(f"Refreshed sales views invalidated {dropped} stored forecasts")
+    return dropped
+
+
+def invalidate_for_new_snapshot() -> int:
+    """A newly exported snapshot may change any series: drop every stored forecast and memoised aggregate"""
+    dropped = FORECAST_STORE.invalidate()
+    FORECAST_PIPELINE.invalidate("fetch")
+    LOG.info(f"New sales snapshot invalidated {dropped} stored forecasts")
+    return dropped
+
+
+ORDER_INGESTOR.on_new_lines(invalidate_for_new_orders)
+SALES_VIEWS.on_refresh(invalidate_after_refresh)
+SALES_SNAPSHOT.on_reload(invalidate_for_new_snapshot)
+
+
+def generate_forecast(ts, periods_ahead, model_type: ModelType, frequency: ForecastFrequency, series_key = None, tier: QualityTier = QualityTier.BALANCED):
+    """Generate forecast based on selected model"""
+    result = FORECAST_PIPELINE.forecast(ts, periods_ahead, model_type, frequency, series_key, tier)
+    return result.forecast_df, result.evaluation, result.model_info
+
+
+def admitted_forecast(ts, periods_ahead, model_type: ModelType, frequency: ForecastFrequency, series_key = None,
+                      tier: QualityTier = QualityTier.BALANCED, deadline: float | None = None) -> ModelForecast:
+    """The model's stages once its concurrency limit admits them; raises 503 when overloaded"""
+    cost = estimate_cost(model_type.value, len(ts), periods_ahead, tier=tier.value)
+    with ADMISSION.limiter(model_type.value).admit(cost):
+        return FORECAST_PIPELINE.forecast(ts, periods_ahead, model_type, frequency, series_key, tier, deadline)
+
+
+def fallback_chain(model_type: ModelType, tier: QualityTier) -> list[tuple[ModelType, QualityTier]]:
+    """Settings to try in order when a deadline is set: as requested, the same model at the fast tier, fast ARIMA"""
+    chain = [(model_type, tier), (model_type, QualityTier.FAST), (ModelType.ARIMA, QualityTier.FAST)]
+    return list(dict.fromkeys(chain))
+
+
+def budgeted_forecast(ts, periods_ahead, model_type: ModelType, frequency: ForecastFrequency, series_key = None,
+                      tier: QualityTier = QualityTier.BALANCED, deadline: float | None = None) -> ModelForecast:
+    """
+    admitted_forecast that returns by `deadline` (a time.monotonic() value) by
+    falling back to cheaper settings. A candidate is skipped when its model's
+    observed fit times predict it cannot finish in the remaining time, and
+    abandoned when it overruns; fast ARIMA, the last resort, always runs.
+    """
+    if deadline is None:
+        return admitted_forecast(ts, periods_ahead, model_type, frequency, series_key, tier)
+
+    chain = fallback_chain(model_type, tier)
+    skipped = []
+    result = None
+    for candidate, candidate_tier in chain[:-1]:
+        remaining = deadline - time.monotonic()
+        cost = estimate_cost(candidate.value, len(ts), periods_ahead, tier=candidate_tier.value)
+        expected = ADMISSION.limiter(candidate.value).expected_seconds(cost)
+        if remaining <= 0:
+            skipped.append({"model": candidate.value, "tier": candidate_tier.value, "reason": "no time left"})
+            continue
+        if expected is not None and expected > remaining:
+            skipped.append({"model": candidate.value, "tier": candidate_tier.value, "reason": "predicted to miss the deadline"})
+            continue
+
+        future = budget_pool.submit(
+            contextvars.copy_context().run,
+            admitted_forecast, ts, periods_ahead, candidate, frequency, series_key, candidate_tier, deadline,
+        )
+        try:
+            result = future.result(timeout=remaining)
+            break
+        except FutureTimeout:
+            skipped.append({"model": candidate.value, "tier": candidate_tier.value, "reason": "missed the deadline"})
+        except Overloaded:
+            skipped.append({"model": candidate.value, "tier": candidate_tier.value, "reason": "overloaded"})
+    else:
+        candidate, candidate_tier = chain[-1]
+        result = admitted_forecast(ts, periods_ahead, candidate, frequency, series_key, candidate_tier)
+
+    if skipped:
+        LOG.warning(f"Forecast fell back to {candidate.value} ({candidate_tier.value}) to meet its deadline", extra={"model_type": model_type.value})
+
+    result.model_info["latency_budget"] = {
+        "requested": {"model": model_type.value, "tier": tier.value},
+        "used": {"model": candidate.value, "tier": candidate_tier.value},
+        "fallback": bool(skipped),
+        "skipped": skipped,
+    }
+    return result
@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from typing import Optional
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+from fastapi import HTTPException
+from config import CONFIG
+from core.logger.logger import LOG
+from core.utils.serialization import extend_json
+from core.utils.thread_budget import limit_pool_process_threads
+from modules.models.modelSchema import ModelType, ForecastFrequency
+from modules.models.forecast_store import FORECAST_STORE, forecast_key
+
+ENTITY_KINDS = ("product", "customer", "city")
+
+# Next to the shared forecast cache, so it is the same file for every worker of the host
+RUNNER_LOCK_PATH = os.path.join(os.path.dirname(CONFIG.shared_cache_path) or ".", "precompute.lock")
+
+
+def _try_lock(lock_file) -> bool:
+    """Take an exclusive lock on the file without waiting; the OS drops it when the process exits"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def parse_entities(specs: list[str]) -> list[tuple[str, str]]:
+    """Parse "kind:name" entries from the config, skipping malformed ones"""
+    entities = []
+    for spec in specs:
+        kind, _, name = spec.partition(":")
+        kind, name = kind.strip().lower(), name.strip()
+        if kind not in ENTITY_KINDS or not name:
+            LOG.warning(f"Ignoring precompute entity '{spec}', expected one of {ENTITY_KINDS} as 'kind:name'")
+            continue
+        entities.append((kind, name))
+    return entities
+
+
+def _lower_priority():
+    # Pool processes only get the cores the request-serving workers leave idle
+    os.nice(10)
+    limit_pool_process_threads()
+
+
+def compute_forecast(kind: str, name: str, periods_ahead: int, model: ModelType, frequency: ForecastFrequency) -> tuple[bytes, str]:
+    """
+    Entry point executed in a pool process; returns the encoded response body
+    without the LLM analysis, and the prompt for it. The analyses are made
+    afterwards in batches by the parent.
+    """
+    from modules.models.pipeline import FORECAST_PIPELINE, SeriesRequest
+
+    try:
+        body, prompt = FORECAST_PIPELINE.forecast_body(SeriesRequest(kind, name), periods_ahead, model, frequency)
+        return body, body.decode() if prompt is None else prompt
+    except HTTPException as e:
+        # HTTPException does not survive pickling back to the parent
+        raise RuntimeError(f"{e.status_code}: {e.detail}") from None
+
+
+class ForecastPrecomputer:
+    """
+    Periodically computes forecasts for the configured entities x models x
+    frequencies in a low-priority process pool, analyses them with batched LLM
+    calls and writes them to the forecast store.
+    """
+
+    def __init__(self, entities, models, frequencies, periods_ahead: int, interval_seconds: float, workers: int,
+                 lock_path: str = RUNNER_LOCK_PATH):
+        self.entities = parse_entities(entities)
+        self.models = [ModelType(m) for m in models]
+        self.frequencies = [ForecastFrequency(f) for f in frequencies]
+        self.periods_ahead = periods_ahead
+        self.interval_seconds = interval_seconds
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self.lock_path = lock_path
+        self._lock_file = None
+
+        self.runs = 0
+        self.skipped_runs = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.last_run_seconds = None
+        self.last_run_finished_at = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval_seconds > 0 and bool(self.entities)
+
+    def jobs(self) -> list[tuple]:
+        return [
+            (kind, name, model, frequency)
+            for (kind, name), model, frequency in product(self.entities, self.models, self.frequencies)
+        ]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs logging/threadpool threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+            )
+        return self._pool
+
+    async def run_once(self):
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        jobs = self.jobs()
+        start = time.perf_counter()
+
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, compute_forecast, kind, name, self.periods_ahead, model, frequency)
+                for kind, name, model, frequency in jobs
+            ),
+            return_exceptions=True,
+        )
+
+        forecasts = {}
+        for (kind, name, model, frequency), result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                self.failed += 1
+                LOG.warning(f"Precompute failed for {kind} '{name}' ({model.value}, {frequency.value}): {result}")
+                continue
+            # Customer forecasts are requested per customer and product; None is all products
+            names = (name, None) if kind == "customer" else (name,)
+            forecasts[forecast_key(kind, names, self.periods_ahead, model, frequency)] = result
+
+        from modules.models.pipeline import FORECAST_PIPELINE
+        from modules.LLM.batch_analyzer import BATCH_ANALYZER
+        analyses = await asyncio.to_thread(
+            BATCH_ANALYZER.analyze_many, {key: prompt for key, (_, prompt) in forecasts.items()}
+        )
+        for key, (body, prompt) in forecasts.items():
+            if "error" in analyses[key]:
+                # Left to the endpoints, which ask the LLM again, rather than serving the error to every worker
+                self.failed += 1
+                LOG.warning(f"Precompute analysis failed for {key}: {analyses[key].get('details')}")
+                continue
+            self.succeeded += 1
+            FORECAST_PIPELINE.remember_analysis(prompt, analyses[key])
+            await asyncio.to_thread(FORECAST_STORE.put, key, extend_json(body, llm_analysis=analyses[key]))
+
+        self.runs += 1
+        self.last_run_seconds = round(time.perf_counter() - start, 2)
+        self.last_run_finished_at = time.time()
+        LOG.info(f"Precomputed {len(jobs)} forecasts in {self.last_run_seconds} s")
+
+    def _elect(self) -> bool:
+        """
+        Whether this worker is the host's precompute runner. The first worker
+        to lock the file keeps the lock until it stops or exits; the others
+        try again every interval, so one of them takes over from a runner
+        that is gone.
+        """
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            lock_file = open(self.lock_path, "a+")
+            if not _try_lock(lock_file):
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            LOG.info(f"This worker (pid {os.getpid()}) runs the forecast precompute for the host")
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()   # closing the file releases the lock
+            self._lock_file = None
+
+    async def run_forever(self):
+        while True:
+            try:
+                if self._elect():
+                    await self.run_once()
+                else:
+                    self.skipped_runs += 1
+            except Exception as e:
+                LOG.error(f"Forecast precompute run failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            LOG.info(f"Starting forecast precompute every {self.interval_seconds} s for {len(self.jobs())} forecasts")
+            self._task = asyncio.create_task(self.run_forever())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._release()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "jobs": len(self.jobs()),
+            "runner": self._lock_file is not None,
+            "runs": self.runs,
+            "skipped_runs": self.skipped_runs,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "last_run_seconds": self.last_run_seconds,
+            "last_run_finished_at": self.last_run_finished_at,
+        }
+
+
+PRECOMPUTER = ForecastPrecomputer(
+    entities=CONFIG.precompute_entities,
+    models=CONFIG.precompute_models,
+    frequencies=CONFIG.precompute_frequencies,
+    periods_ahead=CONFIG.precompute_periods_ahead,
+    interval_seconds=CONFIG.precompute_interval_seconds,
+    workers=CONFIG.precompute_workers,
+)
@@ -1,247 +1,328 @@
-from modules.ORM.run_query import run_query
 from core.logger.logger import LOG
-import pandas as pd
-from modules.data.sql_queries.analytical_queries.monthlySales import SalesQuery
 from fastapi import APIRouter, HTTPException, Query #type:ignore
-from modules.ORM.orm import engine
-from sqlalchemy.orm import Session
-from modules.models.modelSchema import ModelType,ForecastFrequency
-from core.utils.utils import clean_floats
-from modules.models.Prophet import forecast_with_prophet
-from modules.models.Arima import forecast_with_arima
-from modules.models.XG_boost import forecast_with_xgboost
-from modules.LLM.LLM_analyzer import analyze_forecast
-import json
-
-
-session = Session(bind=engine)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import orjson
+import anyio
+import threading
+from contextlib import aclosing
+from modules.models.modelSchema import ModelType,ForecastFrequency,QualityTier
+from core.utils.serialization import FastJSONResponse, dumps_json, extend_json
+from core.utils.singleflight import SingleFlight
+from modules.models.forecast_store import FORECAST_STORE, forecast_key
+from core.utils.shared_cache import SHARED_CACHE
+from core.utils.admission import ADMISSION, estimate_cost
+from core.utils.thread_budget import thread_budget_stats
+from modules.models.feature_store import FEATURE_STORE
+from modules.models.precompute import PRECOMPUTER
+from modules.data.sales_views import SALES_VIEWS
+from modules.data.ingestion import ORDER_INGESTOR
+from modules.data.snapshot import SALES_SNAPSHOT
+from modules.models.hierarchy import ReconciliationMethod, hierarchical_forecast
+from modules.models.model_selection import MODEL_SELECTOR
+from modules.models.pipeline import FORECAST_PIPELINE, SeriesRequest
+from modules.models.progress import report_stage, shared_stages
+from modules.LLM.rate_limit import LLM_LIMITER
+from modules.LLM.batch_analyzer import BATCH_ANALYZER
+from config import CONFIG
+
+
+# Concurrent requests for the same forecast share one computation
+forecast_flight = SingleFlight()
 
 router = APIRouter(
     prefix = "/api/v1/data_forecast",
-    tags = ["forecast"]
+    tags = ["forecast"],
+    default_response_class = FastJSONResponse
 )
 
-def generate_forecast(ts, periods_ahead, model_type: ModelType, frequency: ForecastFrequency):
-    """Generate forecast based on selected model"""
-    if model_type == ModelType.ARIMA:
-        return forecast_with_arima(ts, periods_ahead, frequency)
-    elif model_type == ModelType.PROPHET:
-        return forecast_with_prophet(ts, periods_ahead, frequency)
-    elif model_type == ModelType.XGBOOST:
-        return forecast_with_xgboost(ts, periods_ahead, frequency)
+async def fetch_forecast(key: tuple, pool: str, compute, *args, deadline_ms: int | None = None) -> bytes:
+    """A fresh stored forecast, otherwise compute it live (coalescing identical concurrent requests) and store it"""
+    # The store is a SQLite file other workers write to, so even a hit may wait on its lock
+    body = await run_in_threadpool(FORECAST_STORE.get, key)
+    if body is None:
+        # Answer 503 straight away rather than querying the database for a fit that cannot be admitted
+        ADMISSION.limiter(pool).reject_if_saturated()
+        # A deadline may have degraded the forecast, so it is neither stored nor shared with full-budget requests
+        flight_key = key if deadline_ms is None else (*key, deadline_ms)
+        # Stages of the shared computation reach a job that joined it as well as the one that started it
+        with shared_stages(flight_key):
+            if deadline_ms is None:
+                body = await forecast_flight.do(flight_key, _compute_and_store, key, compute, *args)
+            else:
+                body = await forecast_flight.do(flight_key, run_in_threadpool, compute, *args)
+    return body
+
+async def serve_forecast(key: tuple, pool: str, compute, *args, deadline_ms: int | None = None) -> FastJSONResponse:
+    return FastJSONResponse(await fetch_forecast(key, pool, compute, *args, deadline_ms=deadline_ms))
+
+def _sse(event: str, data: bytes) -> str:
+    return f"event: {event}\ndata: {data.decode()}\n\n"
+
+async def _stored_events(body: bytes):
+    response = orjson.loads(body)
+    analysis = response.pop("llm_analysis", None) or {}
+    yield _sse("forecast", dumps_json(response))
+    for section, content in analysis.items():
+        yield _sse("analysis", dumps_json({"section": section, "content": content}))
+    yield _sse("done", dumps_json({"sections": len(analysis), "from_store": True, "stored": True}))
+
+class _EventStreamResponse(StreamingResponse):
+    """
+    Closes the event generator when the response ends. Starlette stops
+    iterating when the client disconnects but leaves the generator to the
+    garbage collector, together with whatever it holds.
+    """
+
+    def __init__(self, events):
+        super().__init__(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+_DONE = object()
+
+async def _iterate_closing(generator):
+    """
+    Like iterate_in_threadpool, but the generator is closed once iteration
+    stops, also when the client disconnects mid-stream. Closing waits for a
+    step still running in the threadpool, so the LLM slot and the upstream
+    stream the generator holds are released right away rather than on
+    garbage collection.
+    """
+    lock = threading.Lock()
+
+    def step():
+        with lock:
+            return next(generator, _DONE)
+
+    def close():
+        with lock:
+            generator.close()
+
+    try:
+        while (item := await run_in_threadpool(step)) is not _DONE:
+            yield item
+    finally:
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(close)
+
+async def _analysis_events(key: tuple | None, body: bytes, prompt: str | None):
+    yield _sse("forecast", body)
+    analysis = {}
+    async with aclosing(_iterate_closing(FORECAST_PIPELINE.analysis_sections(body, prompt))) as sections:
+        async for section, content in sections:
+            analysis[section] = content
+            yield _sse("analysis", dumps_json({"section": section, "content": content}))
+    stored = key is not None and "error" not in analysis
+    if stored:
+        # The complete response serves later streamed and plain requests alike
+        await run_in_threadpool(FORECAST_STORE.put, key, extend_json(body, llm_analysis=analysis))
+    yield _sse("done", dumps_json({"sections": len(analysis), "from_store": False, "stored": stored}))
+
+async def stream_forecast(key: tuple, pool: str, request: SeriesRequest, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                          tier: QualityTier, deadline_ms: int | None) -> StreamingResponse:
+    """
+    Server-Sent Events: a `forecast` event with the response body as soon as the
+    model has predicted, one `analysis` event per LLM section as it completes,
+    then `done`. Errors before the forecast are answered with their status code.
+    """
+    body = await run_in_threadpool(FORECAST_STORE.get, key)
+    if body is not None:
+        events = _stored_events(body)
     else:
-        raise ValueError(f"Unknown model type: {model_type}")
+        ADMISSION.limiter(pool).reject_if_saturated()
+        body, prompt = await forecast_flight.do(
+            (*key, "stream", deadline_ms), run_in_threadpool,
+            FORECAST_PIPELINE.forecast_body, request, periods_ahead, model, frequency, tier, deadline_ms,
+        )
+        # A deadline may have degraded the forecast, so it is not stored
+        events = _analysis_events(key if deadline_ms is None else None, body, prompt)
+    return _EventStreamResponse(events)
+
+def _analysis_failed(body: bytes) -> bool:
+    """Whether the response carries the error dict of a failed LLM analysis (extend_json appends it last)"""
+    return b'"llm_analysis":{"error":' in body
+
+async def _compute_and_store(key: tuple, compute, *args) -> bytes:
+    body = await run_in_threadpool(compute, *args)
+    # Write through so other workers on this host can serve it too; a failed
+    # analysis is not, so the next request asks the LLM again
+    if not _analysis_failed(body):
+        await run_in_threadpool(FORECAST_STORE.put, key, body)
+    return body
+
+def product_sales_forecast(product_name: str, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                           tier: QualityTier = QualityTier.BALANCED, deadline_ms: int | None = None) -> bytes:
+    """Run the product forecast and return the encoded response body"""
+    return FORECAST_PIPELINE.run(SeriesRequest("product", product_name), periods_ahead, model, frequency, tier, deadline_ms)
+
+def customer_sales_forecast(customer_name: str, product_name: str | None, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                            tier: QualityTier = QualityTier.BALANCED, deadline_ms: int | None = None) -> bytes:
+    """Run the customer (optionally customer x product) forecast and return the encoded response body"""
+    return FORECAST_PIPELINE.run(SeriesRequest("customer", customer_name, product_name), periods_ahead, model, frequency, tier, deadline_ms)
+
+def city_sales_forecast(city_name: str, periods_ahead: int, model: ModelType, frequency: ForecastFrequency,
+                        tier: QualityTier = QualityTier.BALANCED, deadline_ms: int | None = None) -> bytes:
+    """Run the city forecast and return the encoded response body"""
+    return FORECAST_PIPELINE.run(SeriesRequest("city", city_name), periods_ahead, model, frequency, tier, deadline_ms)
+
+
+def hierarchy_sales_forecast(city_name: str | None, periods_ahead: int, model: ModelType, frequency: ForecastFrequency, reconciliation: ReconciliationMethod,
+                             tier: QualityTier = QualityTier.BALANCED) -> bytes:
+    """Run the reconciled city > customer > product forecast and return the encoded response body"""
+    try:
+        LOG.info(f"Hierarchical forecast for {city_name or 'all cities'} using {model.value} ({frequency.value}), {reconciliation.value}")
+
+        fetched = FORECAST_PIPELINE.fetch(SeriesRequest("hierarchy", city_name), frequency)
+        df, city = fetched.df, fetched.series_key[1]
+
+        # Every bottom series and its ancestors are fitted; bottom series dominate the count
+        series = df.groupby(["city", "company_name", "product_name"]).ngroups
+        cost = estimate_cost(model.value, df["period"].nunique(), periods_ahead, series=series, tier=tier.value)
+        report_stage("fit")
+        try:
+            with ADMISSION.limiter("hierarchy").admit(cost):
+                result = hierarchical_forecast(
+                    df, periods_ahead, model, frequency, reconciliation,
+                    single_city=city is not None, max_nodes=CONFIG.hierarchy_max_nodes, tier=tier,
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return dumps_json({
+            "city": city or "All Cities",
+            "model": model.value,
+            "quality_tier": tier.value,
+            "frequency": frequency.value,
+            **result,
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        LOG.error(f"Error generating hierarchical forecast: {e}", extra={"model_type": model.value})
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 
 @router.get("/sales/product_sales_forecast")
 async def gete_product_sales_forecast(
     product_name:str = Query(..., description = "Product name to forecast"),
-    periods_ahead: int = Query(3,description = "Number of periods to forecast default = 3"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description = "Number of periods to forecast default = 3"),
     model :ModelType = Query(ModelType.ARIMA,description = "Forecasting model to use (arima or prophet)"),
-    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)")
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
 ):
-    try:
-        LOG.info(f"frequency selected {frequency}")
-        df = run_query(SalesQuery.product_wise_sales(session,frequency).statement)
-        if df.empty:
-            raise HTTPException(status_code=404,detail = "No Sales data found")
-        
-        df["product_name"] = df["product_name"].str.strip()
-        df = df[df["product_name"].str.lower() == product_name.strip().lower()]
-        
-        if df.empty:
-            raise HTTPException(status_code=404, detail=f"No sales data found for '{product_name}'")
-        
-        df["period"] = pd.to_datetime(df["period"],utc = True).dt.tz_convert(None)
-
-        ts = df.groupby("period")["total_sales"].sum().sort_index()
-
-        if len(ts)<3:
-            raise HTTPException(status_code = 400,detail = "Not enough historical data for forecasting")
-        
-        if model == ModelType.XGBOOST:
-            min_required = 60 if frequency == ForecastFrequency.DAILY else (20 if frequency == ForecastFrequency.WEEKLY else 12)
-            if len(ts) < min_required:
-                LOG.warning(f"XGBoost works best with at least {min_required} data points. Current: {len(ts)}")
-
-        forecast_df, evaluation, model_info = generate_forecast(ts, periods_ahead, model, frequency)
-        
-        forecast_df,evaluation,model_info = generate_forecast(ts,periods_ahead,model,frequency)
-
-        if frequency == ForecastFrequency.DAILY:
-            period_label, date_format = "date", "%Y-%m-%d"
-        elif frequency == ForecastFrequency.WEEKLY:
-            period_label, date_format = "week", "%Y-W%U"
-        else:  # MONTHLY
-            period_label, date_format = "month", "%b-%Y"
-        
-        history_df = ts.reset_index().assign(**{period_label: ts.index.strftime(date_format)})
-        history_df = history_df[[period_label, "total_sales"]].rename(columns={"total_sales": "actual_sales"})
-        
-        # Build response
-        response = {
-            "product": product_name,
-            f"last_known_{period_label}": ts.index[-1].strftime(date_format),
-            "history": history_df.to_dict(orient="records"),
-            "forecast": forecast_df.to_dict(orient="records"),
-            "evaluation_metrics": evaluation,
-            "model_info": model_info
-        }
-        llm_response = analyze_forecast(json.dumps(response))
-        response["llm_analysis"] = llm_response
-        
-        # Prophet may return floats with NaN/inf, so we clean them
-        return clean_floats(response) if model in [ModelType.PROPHET, ModelType.XGBOOST] else response
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        LOG.error(f"Error generating forecast: {e}", extra={"model_type": model.value})
-        raise HTTPException(status_code=500, detail="Internal server error")
+    key = forecast_key("product", (product_name,), periods_ahead, model, frequency, tier)
+    return await serve_forecast(key, model.value, product_sales_forecast, product_name, periods_ahead, model, frequency, tier, deadline_ms, deadline_ms=deadline_ms)
 
 @router.get("/sales/customer_sales_forecast")
 async def get_customer_sales_forecast(
     customer_name: str = Query(..., description="Customer name to filter"),
     product_name: str | None = Query(default=None, description="Optional product name to filter"),
-    periods_ahead: int = Query(3, description="Number of periods to forecast (default=3)"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast (default=3)"),
     model: ModelType = Query(ModelType.ARIMA, description="Forecasting model to use (arima or prophet)"),
-    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)")
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
 ):
-    try:
-        LOG.info(f"Forecast request - customer: {customer_name}, product: {product_name}, freq: {frequency}")
-
-        if product_name:
-            df = run_query(SalesQuery.customer_product_wise_sales(session, frequency).statement)
-        else:
-            df = run_query(SalesQuery.customer_wise_sales(session, frequency).statement)
-
-        if df.empty:
-            raise HTTPException(status_code=404, detail="No sales data found")
-
-        df["company_name"] = df["company_name"].astype(str).str.strip().str.lower()
-        if "product_name" in df.columns:
-            df["product_name"] = df["product_name"].astype(str).str.strip().str.lower()
-
-        customer_name_clean = customer_name.strip().lower()
-        product_name_clean = product_name.strip().lower() if product_name else None
-
-        df = df[df["company_name"] == customer_name_clean]
-        if df.empty:
-            raise HTTPException(status_code=404, detail=f"No sales data found for customer '{customer_name}'")
-
-        if product_name_clean and "product_name" in df.columns:
-            df = df[df["product_name"] == product_name_clean]
-            if df.empty:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No sales data found for product '{product_name}' and customer '{customer_name}'"
-                )
-
-        df["period"] = pd.to_datetime(df["period"], utc=True).dt.tz_convert(None)
-
-        ts = df.groupby("period")["total_sales"].sum().sort_index()
-
-        if len(ts) < 3:
-            raise HTTPException(status_code=400, detail="Not enough historical data for forecasting")
-        
-        if model == ModelType.XGBOOST:
-            min_required = 60 if frequency == ForecastFrequency.DAILY else (20 if frequency == ForecastFrequency.WEEKLY else 12)
-            if len(ts) < min_required:
-                LOG.warning(f"XGBoost works best with at least {min_required} data points. Current: {len(ts)}")
-
-        forecast_df, evaluation, model_info = generate_forecast(ts, periods_ahead, model, frequency)
-
-        if frequency == ForecastFrequency.DAILY:
-            period_label, date_format = "date", "%Y-%m-%d"
-        elif frequency == ForecastFrequency.WEEKLY:
-            period_label, date_format = "week", "%Y-W%U"
-        else:
-            period_label, date_format = "month", "%b-%Y"
-
-        history_df = ts.reset_index().assign(**{period_label: ts.index.strftime(date_format)})
-        history_df = history_df[[period_label, "total_sales"]].rename(columns={"total_sales": "actual_sales"})
-
-        response = {
-            "customer": customer_name,
-            "product": product_name if product_name else "All Products",
-            f"last_known_{period_label}": ts.index[-1].strftime(date_format),
-            "history": history_df.to_dict(orient="records"),
-            "forecast": forecast_df.to_dict(orient="records"),
-            "evaluation_metrics": evaluation,
-            "model_info": model_info
-        }
-        llm_response = analyze_forecast(json.dumps(response))
-        response["llm_analysis"] = llm_response
-
-        # Prophet often has float precision/NaN issues, so clean
-        return clean_floats(response) if model in [ModelType.PROPHET, ModelType.XGBOOST] else response
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        LOG.error(f"Error generating forecast: {e}", extra={"model_type": model.value})
-        raise HTTPException(status_code=500, detail="Internal server error")
+    key = forecast_key("customer", (customer_name, product_name), periods_ahead, model, frequency, tier)
+    return await serve_forecast(key, model.value, customer_sales_forecast, customer_name, product_name, periods_ahead, model, frequency, tier, deadline_ms, deadline_ms=deadline_ms)
 
 @router.get("/sales/city_wise_forecast")
 async def get_city_sales_forecast(
     city_name: str = Query(..., description="City name to filter"),
-    periods_ahead: int = Query(3, description="Number of periods to forecast (default=3)"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast (default=3)"),
     model: ModelType = Query(ModelType.ARIMA, description="Forecasting model to use (arima or prophet)"),
-    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)")
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
 ):
-    try:
-        LOG.info(f"Running city-wise forecast for {city_name} using {model.value} ({frequency.value})")
-
-        df = run_query(SalesQuery.city_wise_sales(session, frequency).statement)
-        if df.empty:
-            raise HTTPException(status_code=404, detail="No sales data found")
-
-        df["city"] = df["city"].astype(str).str.strip().str.lower()
-        city = city_name.strip().lower()
-
-        df = df[df["city"] == city]
-        if df.empty:
-            raise HTTPException(status_code=404, detail=f"No sales data found for city '{city_name}'")
-
-        df["period"] = pd.to_datetime(df["period"], utc=True).dt.tz_localize(None)
-
-        ts = df.groupby("period")["total_sales"].sum().sort_index()
-        if len(ts) < 3:
-            raise HTTPException(status_code=400, detail="Not enough historical data for forecasting")
-        
-        if model == ModelType.XGBOOST:
-            min_required = 60 if frequency == ForecastFrequency.DAILY else (20 if frequency == ForecastFrequency.WEEKLY else 12)
-            if len(ts) < min_required:
-                LOG.warning(f"XGBoost works best with at least {min_required} data points. Current: {len(ts)}")
-
-        forecast_df, evaluation, model_info = generate_forecast(ts, periods_ahead, model, frequency)
-
-        forecast_df, evaluation, model_info = generate_forecast(ts, periods_ahead, model, frequency)
-
-        if frequency == ForecastFrequency.DAILY:
-            period_label, date_format = "date", "%Y-%m-%d"
-        elif frequency == ForecastFrequency.WEEKLY:
-            period_label, date_format = "week", "%Y-W%U"
-        else:  # MONTHLY
-            period_label, date_format = "month", "%b-%Y"
-
-        history_df = ts.reset_index().assign(**{period_label: ts.index.strftime(date_format)})
-        history_df = history_df[[period_label, "total_sales"]].rename(columns={"total_sales": "actual_sales"})
-
-        response = {
-            "city": city_name,
-            f"last_known_{period_label}": ts.index[-1].strftime(date_format),
-            "history": history_df.to_dict(orient="records"),
-            "forecast": forecast_df.to_dict(orient="records"),
-            "evaluation_metrics": evaluation,
-            "model_info": model_info,     
-        }
-        llm_response = analyze_forecast(json.dumps(response))
-        response["llm_analysis"] = llm_response
-
-        return clean_floats(response) if model in [ModelType.PROPHET, ModelType.XGBOOST] else response
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        LOG.error(f"Error generating city forecast: {e}", extra={"model_type": model.value})
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+    key = forecast_key("city", (city_name,), periods_ahead, model, frequency, tier)
+    return await serve_forecast(key, model.value, city_sales_forecast, city_name, periods_ahead, model, frequency, tier, deadline_ms, deadline_ms=deadline_ms)
+
+@router.get("/sales/hierarchical_forecast")
+async def get_hierarchical_forecast(
+    city_name: str | None = Query(default=None, description="Restrict the hierarchy to one city (default: all cities)"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast (default=3)"),
+    model: ModelType = Query(ModelType.ARIMA, description="Forecasting model used for every node"),
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    reconciliation: ReconciliationMethod = Query(ReconciliationMethod.MINT, description="Reconciliation method (bottom_up or mint)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+):
+    """
+    Forecast city, customer and customer x product series together so the totals add up.
+    """
+    key = forecast_key(f"hierarchy:{reconciliation.value}", (city_name,), periods_ahead, model, frequency, tier)
+    return await serve_forecast(key, "hierarchy", hierarchy_sales_forecast, city_name, periods_ahead, model, frequency, reconciliation, tier)
+
+@router.get("/sales/product_sales_forecast/stream")
+async def stream_product_sales_forecast(
+    product_name: str = Query(..., description="Product name to forecast"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast default = 3"),
+    model: ModelType = Query(ModelType.ARIMA, description="Forecasting model to use (arima or prophet)"),
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
+):
+    """
+    The product forecast as Server-Sent Events, with the LLM analysis streamed section by section after it.
+    """
+    key = forecast_key("product", (product_name,), periods_ahead, model, frequency, tier)
+    return await stream_forecast(key, model.value, SeriesRequest("product", product_name), periods_ahead, model, frequency, tier, deadline_ms)
+
+@router.get("/sales/customer_sales_forecast/stream")
+async def stream_customer_sales_forecast(
+    customer_name: str = Query(..., description="Customer name to filter"),
+    product_name: str | None = Query(default=None, description="Optional product name to filter"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast (default=3)"),
+    model: ModelType = Query(ModelType.ARIMA, description="Forecasting model to use (arima or prophet)"),
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
+):
+    """
+    The customer forecast as Server-Sent Events, with the LLM analysis streamed section by section after it.
+    """
+    key = forecast_key("customer", (customer_name, product_name), periods_ahead, model, frequency, tier)
+    request = SeriesRequest("customer", customer_name, product_name)
+    return await stream_forecast(key, model.value, request, periods_ahead, model, frequency, tier, deadline_ms)
+
+@router.get("/sales/city_wise_forecast/stream")
+async def stream_city_sales_forecast(
+    city_name: str = Query(..., description="City name to filter"),
+    periods_ahead: int = Query(3, ge=1, le=CONFIG.max_periods_ahead, description="Number of periods to forecast (default=3)"),
+    model: ModelType = Query(ModelType.ARIMA, description="Forecasting model to use (arima or prophet)"),
+    frequency: ForecastFrequency = Query(ForecastFrequency.MONTHLY, description="Forecast frequency (daily, weekly, monthly)"),
+    tier: QualityTier = Query(QualityTier.BALANCED, description="Model settings: fast, balanced or accurate"),
+    deadline_ms: int | None = Query(None, ge=1, description="Latency budget; cheaper settings or ARIMA are used when the model cannot finish in time"),
+):
+    """
+    The city forecast as Server-Sent Events, with the LLM analysis streamed section by section after it.
+    """
+    key = forecast_key("city", (city_name,), periods_ahead, model, frequency, tier)
+    return await stream_forecast(key, model.value, SeriesRequest("city", city_name), periods_ahead, model, frequency, tier, deadline_ms)
+
+@router.get("/stats")
+async def get_forecast_stats():
+    """Counters for the forecast pipeline"""
+    return {
+        "coalescing": forecast_flight.stats(),
+        "forecast_store": FORECAST_STORE.stats(),
+        "shared_cache": SHARED_CACHE.stats(),
+        "precompute": PRECOMPUTER.stats(),
+        "model_selection": MODEL_SELECTOR.stats(),
+        "admission": ADMISSION.stats(),
+        "thread_budget": thread_budget_stats(),
+        "feature_store": FEATURE_STORE.stats(),
+        "pipeline": FORECAST_PIPELINE.stats(),
+        "sales_views": SALES_VIEWS.stats(),
+        "order_ingestion": ORDER_INGESTOR.stats(),
+        "snapshot": SALES_SNAPSHOT.stats(),
+        "llm": {"limiter": LLM_LIMITER.stats(), "batches": BATCH_ANALYZER.stats()},
+    }
@@ -0,0 +1,85 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Hashable, Optional
+
+# Forecast stages reported to forecast jobs, in order
+FORECAST_STAGES = ("query", "fit", "predict", "analysis")
+
+# Set by whoever wants to follow a forecast (the job runner). Context variables
+# are copied into tasks and threadpool calls, so the worker thread sees it too.
+_stage_listener: ContextVar[Optional[Callable[[str], None]]] = ContextVar("stage_listener", default=None)
+
+
+def report_stage(stage: str):
+    """Tell the listener of the current context that a forecast stage started; no-op without one"""
+    listener = _stage_listener.get()
+    if listener is not None:
+        listener(stage)
+
+
+@contextmanager
+def stage_listener(callback: Callable[[str], None]):
+    token = _stage_listener.set(callback)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+
+
+class StageBroadcast:
+    """The listener of one in-flight computation: passes each stage on to every caller waiting for it"""
+
+    def __init__(self):
+        self.stage: Optional[str] = None
+        self.users = 0
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str):
+        with self._lock:
+            self.stage = stage
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(stage)
+
+    def add(self, listener: Callable[[str], None]):
+        with self._lock:
+            self._listeners.append(listener)
+            stage = self.stage
+        # A caller joining late hears the stage the computation is in
+        if stage is not None:
+            listener(stage)
+
+    def remove(self, listener: Callable[[str], None]):
+        with self._lock:
+            self._listeners.remove(listener)
+
+
+_broadcasts: dict[Hashable, StageBroadcast] = {}
+
+
+@contextmanager
+def shared_stages(key: Hashable):
+    """
+    For computations coalesced on `key` (see SingleFlight): the computation
+    started in the block reports to one broadcast per key, and every caller
+    in the block, first or joining, hears its stages. Enter on the event loop.
+    """
+    broadcast = _broadcasts.get(key)
+    if broadcast is None:
+        broadcast = _broadcasts[key] = StageBroadcast()
+    broadcast.users += 1
+    listener = _stage_listener.get()
+    if listener is not None:
+        broadcast.add(listener)
+    token = _stage_listener.set(broadcast)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+        if listener is not None:
+            broadcast.remove(listener)
+        broadcast.users -= 1
+        if broadcast.users == 0 and _broadcasts.get(key) is broadcast:
+            del _broadcasts[key]
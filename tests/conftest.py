@@ -0,0 +1,9 @@
+import os
+
+# config.py requires the connection settings; the tests never connect, and the LLM is the stub
+for name, value in {
+    "database_user": "test", "database_password": "test", "database_host": "localhost",
+    "database_port": "5432", "database_name": "test", "groq_api_key": "stub", "model_name": "stub",
+    "llm_provider": "stub",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,65 @@
+import json
+from modules.LLM.batch_analyzer import BatchAnalyzer
+from modules.LLM.rate_limit import LLMLimiter
+from modules.LLM.stub_llm import StubChatModel
+
+
+class ForgetfulStub(StubChatModel):
+    """Leaves f1 out of every reply and fails the first call with a 429"""
+
+    def invoke(self, messages, **kwargs):
+        self.failure_rate = 1.0 if self.calls == 0 else 0.0
+        return super().invoke(messages, **kwargs)
+
+    def _reply(self, messages) -> str:
+        reply = json.loads(super()._reply(messages))
+        reply.pop("f1", None)
+        return json.dumps(reply)
+
+
+def analyzer(stub, max_items=3, max_retries=2, workers=2) -> BatchAnalyzer:
+    return BatchAnalyzer(LLMLimiter(workers, 0, 0), max_tokens=12000, max_items=max_items, max_retries=max_retries,
+                         backoff_seconds=0.0, workers=workers, llm=lambda: stub)
+
+
+def prompts(count: int) -> dict:
+    # Prompts of different sizes, so the stub's reply tells them apart
+    return {("product", f"P{i}"): json.dumps({"product": f"P{i}", "sales": [i] * (i + 1)}) for i in range(count)}
+
+
+def test_batches_respect_item_and_token_limits():
+    batch_analyzer = analyzer(StubChatModel(latency=0.0))
+    assert [len(batch) for batch in batch_analyzer.batches(prompts(7))] == [3, 3, 1]
+    # A prompt over the token budget on its own gets a call to itself
+    assert len(batch_analyzer.batches({"big": "x" * 60000, "small": "{}"})) == 2
+
+
+def test_analyses_are_mapped_back_to_their_prompts():
+    stub = StubChatModel(latency=0.0)
+    requested = prompts(7)
+    analyses = analyzer(stub).analyze_many(requested)
+
+    assert stub.calls == 3
+    assert list(analyses) == list(requested)
+    # The stub quotes the size of the forecast it analysed
+    for key, prompt in requested.items():
+        assert f"prompt of {len(json.dumps(json.loads(prompt)))} characters" in analyses[key]["forecast_quality_assessment"][0]
+
+
+def test_transient_errors_and_missing_ids_are_retried():
+    stub = ForgetfulStub(latency=0.0)
+    batch_analyzer = analyzer(stub, max_retries=1, workers=1)
+    analyses = batch_analyzer.analyze_many({"a": "{}", "b": "{}", "c": "{}"})
+
+    # The 429, the batch without f1, then f1 on its own (still left out)
+    assert stub.calls == 3
+    assert batch_analyzer.retries == 1
+    assert "error" not in analyses["a"] and "error" not in analyses["c"]
+    assert analyses["b"] == {"error": "LLM analysis failed", "details": "Analysis missing from the LLM reply"}
+    assert batch_analyzer.stats()["failed"] == 1
+
+
+def test_no_prompts_make_no_calls():
+    stub = StubChatModel(latency=0.0)
+    assert analyzer(stub).analyze_many({}) == {}
+    assert stub.calls == 0
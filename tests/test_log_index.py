@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timedelta, timezone
+import core.logger.log_viewer_service as log_viewer_service
+from core.logger.log_viewer_service import LogFileIndex, _log_time, get_log_index
+
+
+def entry(time: str, level: str = "INFO", msg: str = "ok") -> str:
+    return json.dumps({"time": time, "level": level, "module": "app", "msg": msg}) + "\n"
+
+
+def test_entries_are_indexed_incrementally(tmp_path):
+    path = tmp_path / "today.log"
+    path.write_text(entry("2024-01-01T10:00:00Z") + entry("2024-01-01T11:00:00Z", "ERROR"))
+    index = LogFileIndex(str(path))
+    index.refresh()
+    assert index.levels == ["INFO", "ERROR"]
+
+    with open(path, "a") as f:
+        f.write(entry("2024-01-01T12:00:00Z", msg="appended"))
+    index.refresh()
+    assert index.read([2]) == [{"time": "2024-01-01T12:00:00Z", "level": "INFO", "module": "app", "msg": "appended"}]
+    assert index.select(levels={"ERROR"}) == [1]
+
+
+def test_pretty_printed_and_partial_entries(tmp_path):
+    path = tmp_path / "today.log"
+    pretty = json.dumps({"time": "2024-01-01T10:00:00Z", "level": "INFO", "msg": {"nested": [1, 2]}}, indent=2) + "\n"
+    path.write_text(pretty + entry("2024-01-01T11:00:00Z")[:20])
+    index = LogFileIndex(str(path))
+    index.refresh()
+    # The half-written last line waits for the rest
+    assert len(index.offsets) == 1
+    assert index.read([0])[0]["msg"] == {"nested": [1, 2]}
+
+    with open(path, "a") as f:
+        f.write(entry("2024-01-01T11:00:00Z")[20:])
+    index.refresh()
+    assert len(index.offsets) == 2
+
+
+def test_a_line_that_never_parses_does_not_stop_indexing(tmp_path):
+    path = tmp_path / "today.log"
+    path.write_text(entry("2024-01-01T10:00:00Z") + '{"time": "2024-01-01T10:30:00Z", "msg": "cut sho\n' + entry("2024-01-01T11:00:00Z"))
+    index = LogFileIndex(str(path))
+    index.refresh()
+    assert len(index.offsets) == 3
+    assert index.read([1]) == [{"msg": '{"time": "2024-01-01T10:30:00Z", "msg": "cut sho'}]
+
+
+def test_time_filters_are_compared_in_utc(tmp_path):
+    path = tmp_path / "today.log"
+    path.write_text(entry("2024-01-01T10:00:00Z") + entry("2024-01-01T12:00:00Z"))
+    index = LogFileIndex(str(path))
+    index.refresh()
+    # 12:30 in UTC+2 is 10:30 UTC
+    start = _log_time(datetime(2024, 1, 1, 12, 30, tzinfo=timezone(timedelta(hours=2))))
+    assert start == "2024-01-01T10:30:00Z"
+    assert index.select(start=start) == [1]
+
+
+def test_rotated_file_is_indexed_again(tmp_path):
+    path = tmp_path / "today.log"
+    path.write_text(entry("2024-01-01T10:00:00Z") + entry("2024-01-01T11:00:00Z"))
+    index = LogFileIndex(str(path))
+    index.refresh()
+    path.unlink()
+    path.write_text(entry("2024-01-02T10:00:00Z"))
+    index.refresh()
+    assert index.times == ["2024-01-02T10:00:00Z"]
+
+
+def test_only_the_most_recently_viewed_files_stay_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_viewer_service, "_INDEXES", type(log_viewer_service._INDEXES)())
+    monkeypatch.setattr(log_viewer_service, "MAX_INDEXED_FILES", 2)
+    paths = [str(tmp_path / f"{day}.log") for day in ("a", "b", "c")]
+    for path in paths:
+        open(path, "w").close()
+    get_log_index(paths[0])
+    get_log_index(paths[1])
+    get_log_index(paths[0])
+    get_log_index(paths[2])
+    assert list(log_viewer_service._INDEXES) == [paths[0], paths[2]]
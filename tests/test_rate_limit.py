@@ -0,0 +1,53 @@
+import types
+import pytest
+import modules.LLM.rate_limit as rate_limit
+from modules.LLM.rate_limit import LLMLimiter, WINDOW_SECONDS
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A time.monotonic for the limiter that only moves when the test advances it"""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(monotonic=lambda: now.value, sleep=None))
+    return now
+
+
+def test_requests_per_minute(clock):
+    limiter = LLMLimiter(concurrency=4, requests_per_minute=2, tokens_per_minute=0)
+    assert limiter._reserve(0) == 0.0
+    clock.value += 10
+    assert limiter._reserve(0) == 0.0
+    # Full until the first call leaves the window
+    assert limiter._reserve(0) == pytest.approx(WINDOW_SECONDS - 10)
+    clock.value += WINDOW_SECONDS - 10
+    assert limiter._reserve(0) == 0.0
+
+
+def test_tokens_per_minute(clock):
+    limiter = LLMLimiter(concurrency=4, requests_per_minute=0, tokens_per_minute=1000)
+    assert limiter._reserve(600) == 0.0
+    assert limiter._reserve(300) == 0.0
+    assert limiter._reserve(200) == pytest.approx(WINDOW_SECONDS)
+    clock.value += WINDOW_SECONDS
+    assert limiter._reserve(200) == 0.0
+
+
+def test_a_call_over_the_whole_token_budget_runs_once_the_window_is_empty(clock):
+    limiter = LLMLimiter(concurrency=4, requests_per_minute=0, tokens_per_minute=1000)
+    assert limiter._reserve(5000) == 0.0
+    assert limiter._reserve(1) > 0
+    clock.value += WINDOW_SECONDS
+    assert limiter._reserve(5000) == 0.0
+
+
+def test_rejected_calls_are_not_recorded(clock):
+    limiter = LLMLimiter(concurrency=4, requests_per_minute=1, tokens_per_minute=0)
+    limiter._reserve(0)
+    for _ in range(3):
+        assert limiter._reserve(0) > 0
+    assert len(limiter._window) == 1
+
+
+def test_no_budget_never_waits(clock):
+    limiter = LLMLimiter(concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    assert all(limiter._reserve(10 ** 6) == 0.0 for _ in range(100))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from modules.models.hierarchy import HIERARCHY_LEVELS, ReconciliationMethod, build_hierarchy, reconcile
+
+
+def hierarchy():
+    bottom = pd.DataFrame({
+        "city": ["Berlin", "Berlin", "Berlin", "London"],
+        "company_name": ["Alfreds", "Alfreds", "Blauer", "Around"],
+        "product_name": ["Chai", "Tofu", "Chai", "Chai"],
+    })
+    return build_hierarchy(bottom, HIERARCHY_LEVELS)
+
+
+def test_summing_matrix():
+    S, nodes = hierarchy()
+    # total, 2 cities, 3 customers, 4 products
+    assert S.shape == (10, 4)
+    np.testing.assert_array_equal(S[-4:], np.eye(4))
+    assert [node["level"] for node in nodes] == ["total"] + ["city"] * 2 + ["customer"] * 3 + ["product"] * 4
+    assert nodes[0]["parent"] is None
+    # Every node's parent is one level up and contains it
+    for i, node in enumerate(nodes[1:], start=1):
+        assert np.all(S[node["parent"]] >= S[i])
+
+
+def test_mint_forecasts_are_coherent():
+    S, _ = hierarchy()
+    rng = np.random.default_rng(0)
+    base = rng.uniform(10, 100, (S.shape[0], 3))
+    reconciled = reconcile(base, S, rng.uniform(0.5, 5, S.shape[0]), ReconciliationMethod.MINT)
+    np.testing.assert_allclose(reconciled, S @ reconciled[-S.shape[1]:])
+
+
+def test_mint_keeps_coherent_forecasts():
+    S, _ = hierarchy()
+    base = S @ np.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0], [7.0, 8.0]])
+    reconciled = reconcile(base, S, np.linspace(1, 3, S.shape[0]), ReconciliationMethod.MINT)
+    np.testing.assert_allclose(reconciled, base)
+
+
+def test_mint_with_equal_variances_is_the_ols_projection():
+    S, _ = hierarchy()
+    base = np.random.default_rng(1).uniform(10, 100, (S.shape[0], 2))
+    reconciled = reconcile(base, S, np.ones(S.shape[0]), ReconciliationMethod.MINT)
+    np.testing.assert_allclose(reconciled, S @ np.linalg.pinv(S) @ base)
+
+
+def test_mint_trusts_the_nodes_with_lower_variance():
+    S, _ = hierarchy()
+    base = S @ np.ones((4, 1))
+    base[0] += 8.0   # the total disagrees with its bottom series
+    variances = np.ones(S.shape[0])
+    confident = variances.copy()
+    confident[0] = 1e-3
+    assert abs(reconcile(base, S, confident, ReconciliationMethod.MINT)[0, 0] - base[0, 0]) < \
+        abs(reconcile(base, S, variances, ReconciliationMethod.MINT)[0, 0] - base[0, 0])
+
+
+def test_bottom_up_sums_the_bottom_forecasts():
+    S, _ = hierarchy()
+    base = np.random.default_rng(2).uniform(10, 100, (S.shape[0], 2))
+    np.testing.assert_allclose(reconcile(base, S, np.ones(S.shape[0]), ReconciliationMethod.BOTTOM_UP), S @ base[-4:])
@@ -0,0 +1,103 @@
+import pandas as pd
+from datetime import datetime, timedelta
+from modules.models.modelSchema import ForecastFrequency
+from modules.models.pipeline import FetchedSeries, merge_order_lines, resample_sales
+
+
+def date_trunc(value: datetime, frequency: ForecastFrequency) -> datetime:
+    """Postgres date_trunc: midnight of the day, of the ISO week's Monday, or of the first of the month"""
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if frequency == ForecastFrequency.WEEKLY:
+        return day - timedelta(days=day.weekday())
+    if frequency == ForecastFrequency.MONTHLY:
+        return day.replace(day=1)
+    return day
+
+
+def daily_sales() -> pd.DataFrame:
+    # Two products over a year boundary, a month boundary and a week starting on a Sunday
+    days = pd.date_range("2023-12-25", "2024-02-05", freq="D")
+    return pd.DataFrame({
+        "product_name": ["Chai", "Tofu"] * len(days),
+        "period": days.repeat(2),
+        "total_sales": [float(i) for i in range(2 * len(days))],
+    })
+
+
+def expected(df: pd.DataFrame, frequency: ForecastFrequency) -> dict:
+    sums = {}
+    for row in df.itertuples():
+        key = (row.product_name, date_trunc(row.period.to_pydatetime(), frequency))
+        sums[key] = sums.get(key, 0.0) + row.total_sales
+    return sums
+
+
+def as_sums(df: pd.DataFrame) -> dict:
+    return {(row.product_name, row.period.to_pydatetime()): row.total_sales for row in df.itertuples()}
+
+
+def test_resample_sales_matches_date_trunc():
+    daily = daily_sales()
+    for frequency in (ForecastFrequency.WEEKLY, ForecastFrequency.MONTHLY):
+        resampled = resample_sales(daily, frequency)
+        assert list(resampled.columns) == list(daily.columns)
+        assert as_sums(resampled) == expected(daily, frequency)
+        assert resampled["period"].is_monotonic_increasing
+
+
+def test_resample_sales_truncates_the_wall_time_of_aware_periods():
+    # 00:00 on the 1st in Berlin is still the previous month in UTC
+    daily = pd.DataFrame({
+        "product_name": ["Chai", "Chai"],
+        "period": pd.to_datetime(["2024-01-31", "2024-02-01"]).tz_localize("Europe/Berlin"),
+        "total_sales": [1.0, 2.0],
+    })
+    resampled = resample_sales(daily, ForecastFrequency.MONTHLY)
+    assert list(resampled["period"]) == list(pd.to_datetime(["2024-01-01", "2024-02-01"]).tz_localize("Europe/Berlin"))
+    assert list(resampled["total_sales"]) == [1.0, 2.0]
+
+
+def order_lines(rows: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=[
+        "order_id", "order_date", "customer_id", "company_name", "city", "product_id", "product_name", "total_sales",
+    ]).assign(order_date=lambda df: pd.to_datetime(df["order_date"]))
+
+
+def product_series(df: pd.DataFrame) -> FetchedSeries:
+    return FetchedSeries(df, ("product", "Chai", ForecastFrequency.DAILY), 1, {"product_id": [1]})
+
+
+def test_merge_order_lines_adds_the_lines_of_the_series_to_their_periods():
+    fetched = product_series(pd.DataFrame({
+        "product_name": ["Chai", "Chai"],
+        "period": pd.to_datetime(["2024-02-01", "2024-02-02"]),
+        "total_sales": [10.0, 20.0],
+    }))
+    lines = order_lines([
+        (1, "2024-02-02 09:30", "ALFKI", "Alfreds", "Berlin", 1, "Chai", 5.0),
+        (2, "2024-02-03 17:00", "ALFKI", "Alfreds", "Berlin", 1, "Chai", 7.0),
+        (2, "2024-02-03 17:00", "ALFKI", "Alfreds", "Berlin", 2, "Tofu", 100.0),   # another product
+    ])
+    merged = merge_order_lines(fetched, lines, ForecastFrequency.DAILY)
+    assert as_sums(merged) == {
+        ("Chai", datetime(2024, 2, 1)): 10.0,
+        ("Chai", datetime(2024, 2, 2)): 25.0,
+        ("Chai", datetime(2024, 2, 3)): 7.0,
+    }
+
+
+def test_merge_order_lines_ignores_lines_of_other_series():
+    fetched = product_series(pd.DataFrame({
+        "product_name": ["Chai"], "period": pd.to_datetime(["2024-02-01"]), "total_sales": [10.0],
+    }))
+    lines = order_lines([(1, "2024-02-02", "ALFKI", "Alfreds", "Berlin", 2, "Tofu", 5.0)])
+    assert merge_order_lines(fetched, lines, ForecastFrequency.DAILY) is None
+
+
+def test_merge_order_lines_skips_orders_without_a_customer_for_customer_series():
+    fetched = FetchedSeries(
+        pd.DataFrame({"company_name": ["Alfreds"], "period": pd.to_datetime(["2024-02-01"]), "total_sales": [10.0]}),
+        ("customer", "Alfreds", None, ForecastFrequency.DAILY), 1, {"customer_id": ["ALFKI", None]},
+    )
+    lines = order_lines([(1, "2024-02-01", None, None, None, 1, "Chai", 5.0)])
+    assert merge_order_lines(fetched, lines, ForecastFrequency.DAILY) is None
@@ -0,0 +1,44 @@
+import json
+from modules.LLM.LLM_analyzer import SectionParser
+
+REPLY = json.dumps({
+    "forecast_quality_assessment": ["RMSE is low, {fine}.", "Quotes \"inside\" and a \\ backslash."],
+    "trend_and_seasonality_analysis": ["Peaks in [Q4]", "Dips, then recovers."],
+    "forecast_outlook_summary": ["Growth of 5%."],
+}, indent=2)
+
+
+def feed_in_chunks(parser: SectionParser, text: str, size: int) -> list[tuple[str, object]]:
+    sections = []
+    for i in range(0, len(text), size):
+        sections += parser.feed(text[i:i + size])
+    return sections
+
+
+def test_sections_match_the_whole_reply_for_any_chunking():
+    for size in (1, 3, 17, len(REPLY)):
+        parser = SectionParser()
+        sections = feed_in_chunks(parser, REPLY, size)
+        assert dict(sections) == json.loads(REPLY)
+        assert parser.finish() == []
+
+
+def test_a_section_is_emitted_once_it_is_complete():
+    parser = SectionParser()
+    end_of_first = REPLY.index("],") + 2
+    assert [name for name, _ in parser.feed(REPLY[:end_of_first])] == ["forecast_quality_assessment"]
+    assert [name for name, _ in parser.feed(REPLY[end_of_first:])] == ["trend_and_seasonality_analysis", "forecast_outlook_summary"]
+
+
+def test_brackets_and_commas_inside_strings_do_not_split_sections():
+    parser = SectionParser()
+    sections = parser.feed('{"a": ["x, ] } [ {", "y\\""], "b": ["z"]}')
+    assert sections == [("a", ["x, ] } [ {", 'y"']), ("b", ["z"])]
+
+
+def test_finish_recovers_sections_the_stream_could_not_parse():
+    parser = SectionParser()
+    # A raw newline inside a string is invalid JSON; only the lenient parse of the whole reply accepts it
+    sections = parser.feed('{"a": ["x"], "b": ["line one\nline two"]}')
+    assert sections == [("a", ["x"])]
+    assert parser.finish() == [("b", ["line oneline two"])]